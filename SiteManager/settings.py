@@ -2,6 +2,8 @@ from pathlib import Path
 from datetime import timedelta
 from decouple import config
 import os
+import sys
+import tempfile
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -35,13 +37,14 @@ INSTALLED_APPS = [
     'daily_records',
     'site_profiles',
     'users',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
+    'api.profiling.RequestProfileMiddleware',
+    'api.db_router.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,6 +54,77 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# debug_toolbar is for local development only; ServerTimingMiddleware covers production
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1, 'debug_toolbar.middleware.DebugToolbarMiddleware')
+
+# N+1 detector (see api/nplusone.py): "raise" fails the request, "log" warns on api.nplusone, "off" is not installed.
+# Test runs set NPLUSONE_MODE=raise in their environment, whatever the runner.
+NPLUSONE_MODE = config('NPLUSONE_MODE', default='log' if DEBUG else 'off')
+NPLUSONE_THRESHOLD = config('NPLUSONE_THRESHOLD', default=5, cast=int)
+if NPLUSONE_MODE != 'off':
+    MIDDLEWARE.insert(MIDDLEWARE.index('api.middleware.ServerTimingMiddleware') + 1, 'api.nplusone.NPlusOneMiddleware')
+
+# staff-only cProfile of flagged requests (see api/profiling.py)
+PROFILE_DIR = config('PROFILE_DIR', default=os.path.join(tempfile.gettempdir(), 'sitemanager-profiles'))
+PROFILE_TOP_N = config('PROFILE_TOP_N', default=40, cast=int)
+PROFILE_MAX_REPORTS = config('PROFILE_MAX_REPORTS', default=200, cast=int)
+
+# sampling profiler (see api/sampler.py); 10 samples/s of the threads serving requests. It runs a
+# thread and writes worker files in every process that serves requests, so production turns it on
+SAMPLER_ENABLED = config('SAMPLER_ENABLED', default=False, cast=bool)
+SAMPLER_INTERVAL = config('SAMPLER_INTERVAL', default=0.1, cast=float)
+SAMPLER_BUCKET_SECONDS = config('SAMPLER_BUCKET_SECONDS', default=60, cast=int)
+SAMPLER_FLUSH_SECONDS = config('SAMPLER_FLUSH_SECONDS', default=10, cast=int)
+SAMPLER_RETENTION_SECONDS = config('SAMPLER_RETENTION_SECONDS', default=3600, cast=int)
+if SAMPLER_ENABLED:
+    MIDDLEWARE.insert(MIDDLEWARE.index('api.profiling.RequestProfileMiddleware') + 1, 'api.sampler.SamplingProfilerMiddleware')
+
+# per request query count / db / view / render timings (see api/middleware.py)
+SERVER_TIMING_HEADER = config('SERVER_TIMING_HEADER', default=True, cast=bool)
+# INFO logs a JSON line of timings for every request on api.performance; off by default
+PERFORMANCE_LOG_LEVEL = config('PERFORMANCE_LOG_LEVEL', default='WARNING')
+
+# shared by the gunicorn workers of a host (replica read-your-writes pins)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=os.path.join(tempfile.gettempdir(), 'sitemanager-cache')),
+    }
+}
+
+# per worker state files (route metrics, sampled stacks), merged by whichever worker serves the read
+WORKER_FILES_DIR = config('WORKER_FILES_DIR', default=os.path.join(tempfile.gettempdir(), 'sitemanager-workers'))
+# rolling route histograms served on api/v1/metrics/ (see api/metrics.py)
+METRICS_WINDOW_SECONDS = config('METRICS_WINDOW_SECONDS', default=300, cast=int)
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=1, cast=float)
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1').split(',')
+# also required when set; needed behind a reverse proxy on the same host, where every client is 127.0.0.1
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.performance': {
+            'handlers': ['console'],
+            'level': PERFORMANCE_LOG_LEVEL,
+            'propagate': False,
+        },
+        'api.nplusone': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'SiteManager.urls'
 
 TEMPLATES = [
@@ -78,10 +152,57 @@ DATABASES = {
         'USER': config('DB_USER'),
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
-        'PORT': config('DB_PORT')
+        'PORT': config('DB_PORT'),
+        # a reused connection is pinged before a request gets it
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# optional read replica (see api/db_router.py); the test database mirrors default
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'USER': config('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'HOST': DB_REPLICA_HOST,
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['api.db_router.PrimaryReplicaRouter']
+# after a write, the user's reads stay on the primary this long (replication lag)
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# DB_CONN_MODE:
+#   "persistent" keeps one connection per worker thread for DB_CONN_MAX_AGE seconds
+#   "pool" uses psycopg's connection pool
+#   "none" opens a new connection for every request (the old behaviour)
+DB_CONN_MODE = config('DB_CONN_MODE', default='persistent')
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+GUNICORN_WORKER_CLASS = config('GUNICORN_WORKER_CLASS', default='sync')
+GUNICORN_THREADS = config('GUNICORN_THREADS', default=1, cast=int)
+# a sync worker serves one request at a time, a gthread worker one per thread; gevent/eventlet
+# workers run many greenlets and share a bigger pool
+DB_POOL_SIZES = {
+    'sync': (1, 2),
+    'gthread': (max(1, GUNICORN_THREADS // 2), GUNICORN_THREADS + 1),
+}.get(GUNICORN_WORKER_CLASS, (2, 10))
+
+for database in DATABASES.values():
+    if DB_CONN_MODE == 'persistent':
+        database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    elif DB_CONN_MODE == 'pool':
+        database['OPTIONS'] = {
+            'pool': {
+                'min_size': config('DB_POOL_MIN_SIZE', default=DB_POOL_SIZES[0], cast=int),
+                'max_size': config('DB_POOL_MAX_SIZE', default=DB_POOL_SIZES[1], cast=int),
+                # seconds a request waits for a free connection before failing
+                'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+                'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+            },
+        }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -122,29 +243,75 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # Media Files
 # ===============
 MEDIA_URL = '/demo-media/'
+MEDIA_ROOT = config("MEDIA_ROOT", default=os.path.join(BASE_DIR, 'media'))
+# "cloudinary" or "local" (plain filesystem under MEDIA_ROOT, no Cloudinary account needed)
+MEDIA_STORAGE = config("MEDIA_STORAGE", default="cloudinary")
+MEDIA_STORAGE_BACKENDS = {
+    "cloudinary": "cloudinary_storage.storage.MediaCloudinaryStorage",
+    "local": "django.core.files.storage.FileSystemStorage",
+}
 CLOUDINARY_STORAGE = {
-    "CLOUD_NAME": config("CLOUDINARY_CLOUD_NAME"),
-    "API_KEY": config("CLOUDINARY_API_KEY"),
-    "API_SECRET": config("CLOUDINARY_API_SECRET"),
+    "CLOUD_NAME": config("CLOUDINARY_CLOUD_NAME", default=""),
+    "API_KEY": config("CLOUDINARY_API_KEY", default=""),
+    "API_SECRET": config("CLOUDINARY_API_SECRET", default=""),
 }
 STORAGES = {
     "default": {
-        "BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage",
+        "BACKEND": MEDIA_STORAGE_BACKENDS[MEDIA_STORAGE],
+    },
+    # raw profile uploads wait here (always local) until the image worker resizes them
+    "profile_uploads": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": os.path.join(MEDIA_ROOT, "profile_uploads")},
     },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
 }
 
+# profile image pipeline (see users/services/profile_images.py)
+PROFILE_IMAGE_SIZES = {
+    "profile_image": 512,
+    "profile_image_medium": 256,
+    "profile_image_small": 64,
+}
+PROFILE_IMAGE_MAX_ATTEMPTS = config("PROFILE_IMAGE_MAX_ATTEMPTS", default=3, cast=int)
+# a running task whose worker has not finished after this long is picked up again
+PROFILE_IMAGE_CLAIM_SECONDS = config("PROFILE_IMAGE_CLAIM_SECONDS", default=600, cast=int)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'users.CustomUser'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
-    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
+    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    # orjson instead of the stdlib json, MessagePack for the mobile clients (see api/renderers.py, api/parsers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'api.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# list endpoints read values() rows instead of model instances (api/values_reader.py)
+VALUES_READER_ENABLED = config('VALUES_READER_ENABLED', default=True, cast=bool)
+
+# ETag / 304 Not Modified on the polled GETs from per table and site write counters (api/conditional_get.py)
+CONDITIONAL_GET_ENABLED = config('CONDITIONAL_GET_ENABLED', default=True, cast=bool)
+
+# delta sync (api/delta_sync.py): rows per model and page, how far cursors stay behind the
+# clock for transactions still in flight, and how long deletes are remembered
+SYNC_PAGE_SIZE = config('SYNC_PAGE_SIZE', default=500, cast=int)
+SYNC_SETTLE_SECONDS = config('SYNC_SETTLE_SECONDS', default=10, cast=int)
+SYNC_TOMBSTONE_DAYS = config('SYNC_TOMBSTONE_DAYS', default=30, cast=int)
+
 SIMPLE_JWT = {
    'AUTH_HEADER_TYPES': ('JWT',),
    "ACCESS_TOKEN_LIFETIME": timedelta(days=30),
@@ -160,6 +327,11 @@ EMAIL_USE_TLS = config("EMAIL_USE_TLS", cast=bool)
 EMAIL_HOST_USER = config("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL")
-FAIL_SILENTLY = config("FAIL_SILENTLY")
+
+# email outbox worker (see users/services/email_outbox.py)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config("EMAIL_OUTBOX_MAX_ATTEMPTS", default=5, cast=int)
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = config("EMAIL_OUTBOX_RETRY_BASE_SECONDS", default=30, cast=int)
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = config("EMAIL_OUTBOX_RETRY_MAX_SECONDS", default=3600, cast=int)
+EMAIL_OUTBOX_CLAIM_SECONDS = config("EMAIL_OUTBOX_CLAIM_SECONDS", default=600, cast=int)
 
 FRONTEND_URL = config("FRONTEND_URL")
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""
+Batch loading for serializer fields that need a query per object.
+
+    class CustomUserIDsSerializer(serializers.ModelSerializer):
+        last_session_end_date = BatchField(last_session_end_dates)
+
+        class Meta:
+            model = CustomUser
+            fields = ['id', 'first_name', 'last_name', 'last_session_end_date']
+            list_serializer_class = BatchListSerializer
+
+The loader takes a set of keys (by default the objects' primary keys) and returns {key: value};
+keys it leaves out get the field's default. With many=True the list serializer hands every object of
+the list / page to the field first, so the loader runs once per page; a single object is loaded on
+its own.
+"""
+from operator import attrgetter
+from django.db import models
+from rest_framework import serializers
+
+
+class BatchField(serializers.Field):
+
+    def __init__(self, loader, key=attrgetter('pk'), default=None, **kwargs):
+        kwargs['read_only'] = True
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+        self.loader = loader
+        self.key = key
+        self.default = default
+        self._loaded = {}
+
+    def prime(self, objs):
+        keys = {self.key(obj) for obj in objs} - self._loaded.keys()
+        if not keys:
+            return
+        loaded = self.loader(keys)
+        self._loaded.update((key, loaded.get(key, self.default)) for key in keys)
+
+    def to_representation(self, obj):
+        key = self.key(obj)
+        if key not in self._loaded:
+            self.prime([obj])
+        return self._loaded[key]
+
+
+class BatchListSerializer(serializers.ListSerializer):
+    """
+    list_serializer_class of the serializers with BatchFields: loads them for the whole list first.
+    """
+
+    def to_representation(self, data):
+        objs = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        for field in self.child._readable_fields:
+            if isinstance(field, BatchField):
+                field.prime(objs)
+        return super().to_representation(objs)
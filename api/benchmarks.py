@@ -0,0 +1,172 @@
+"""
+Latency benchmark of the API over real HTTP, against a running server (gunicorn / runserver), so
+connection handling, middleware and rendering are all part of the numbers.
+
+Endpoints are built from the seeded benchmark data (`manage.py seed_benchmark_data`); tokens are
+minted locally, so the server must share this SECRET_KEY.
+
+benchmark_codecs() sizes and times the renderers / parsers alone, in process, on the serialized list responses.
+"""
+import gzip
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from io import BytesIO
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from django.utils.timezone import localdate
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+from users.models import CustomUser
+from users.serializers import CustomUserGetSerializer
+from daily_records.models import DailyRecord, WorkSession
+from daily_records.serializers import DailyRecordAccessSerializer, WorkSessionListSerializer
+from api.parsers import ORJSONParser, MessagePackParser
+from api.query_plans import HotPathContext
+from api.renderers import ORJSONRenderer, MessagePackRenderer
+
+CODECS = {
+    # name: (renderer, parser, media type)
+    'json': (JSONRenderer, JSONParser, 'application/json'),
+    'orjson': (ORJSONRenderer, ORJSONParser, 'application/json'),
+    'msgpack': (MessagePackRenderer, MessagePackParser, 'application/msgpack'),
+    'msgpack-columnar': (MessagePackRenderer, MessagePackParser, 'application/msgpack; layout=columnar'),
+}
+
+
+@dataclass
+class Endpoint:
+    name: str
+    path: str
+    user: CustomUser
+
+
+def benchmark_endpoints(ctx=None):
+    """
+    {group: [Endpoint]} for the attendance and summary workloads of the busiest site.
+    """
+    ctx = ctx or HotPathContext.from_database(localdate() - timedelta(days=45))
+    site_manager = CustomUser.objects.filter(user_type='site_manager', current_site_id=ctx.site_id).first()
+    viewer = CustomUser.objects.filter(user_type='viewer').first()
+    if site_manager is None or viewer is None:
+        raise LookupError("The benchmark needs a site manager of the busiest site and a viewer; run `manage.py seed_benchmark_data`.")
+    return {
+        'attendance': [
+            Endpoint('daily-records', '/api/v1/daily-records/', site_manager),
+            Endpoint('current-work-session', f'/api/v1/current-worksession/{ctx.employee_id}/', site_manager),
+        ],
+        'summary': [
+            Endpoint('site-summary', f'/api/v1/site-summary/{ctx.site_id}/{ctx.date}/', viewer),
+            Endpoint('total-site-summary', f'/api/v1/total-site-summary/{ctx.site_id}/', viewer),
+        ],
+    }
+
+
+def _timed_request(url, headers):
+    start = perf_counter()
+    try:
+        with urlopen(Request(url, headers=headers)) as response:
+            response.read()
+            ok = response.status < 400
+    except HTTPError as e:
+        e.read()
+        ok = False
+    return perf_counter() - start, ok
+
+
+def run_benchmark(base_url, endpoint, requests=200, concurrency=1, warmup=10, headers=None):
+    """
+    Latency stats in milliseconds of `requests` GETs of one endpoint.
+    """
+    url = base_url.rstrip('/') + endpoint.path
+    headers = {'Authorization': f'JWT {AccessToken.for_user(endpoint.user)}', **(headers or {})}
+    for _ in range(warmup):
+        _timed_request(url, headers)
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: _timed_request(url, headers), range(requests)))
+    elapsed = perf_counter() - start
+
+    latencies = sorted(duration * 1000 for duration, _ in results)
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        "endpoint": endpoint.name,
+        "requests": requests,
+        "errors": sum(1 for _, ok in results if not ok),
+        "rps": requests / elapsed,
+        "mean": statistics.fmean(latencies),
+        "p50": percentiles[49],
+        "p95": percentiles[94],
+        "p99": percentiles[98],
+    }
+
+
+def format_results(results):
+    lines = [f"{'endpoint':<24}{'req':>6}{'err':>5}{'rps':>9}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}"]
+    for r in results:
+        lines.append(
+            f"{r['endpoint']:<24}{r['requests']:>6}{r['errors']:>5}{r['rps']:>9.1f}"
+            f"{r['mean']:>9.2f}{r['p50']:>9.2f}{r['p95']:>9.2f}{r['p99']:>9.2f}"
+        )
+    return lines
+
+
+def list_payloads(ctx=None):
+    """
+    {name: data} of the list responses of the busiest site as the views serialize them, plus a bulk
+    attendance POST body (with Bangla comments) of the same rows.
+    """
+    ctx = ctx or HotPathContext.from_database(localdate() - timedelta(days=45))
+    records = DailyRecordAccessSerializer(DailyRecord.objects.filter(site_id=ctx.site_id).order_by('date'), many=True).data
+    bulk_fields = ['employee', 'date', 'present', 'khoraki', 'advance']
+    return {
+        'daily-records': records,
+        'work-sessions': WorkSessionListSerializer(WorkSession.objects.filter(site_id=ctx.site_id), many=True).data,
+        'users': CustomUserGetSerializer(CustomUser.objects.filter(is_staff=False), many=True).data,
+        'bulk-attendance': [{**{name: record[name] for name in bulk_fields}, 'comment': "অর্ধেক দিন কাজ"} for record in records],
+    }
+
+
+def _best_of(func, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        start = perf_counter()
+        func()
+        best = min(best, perf_counter() - start)
+    return best * 1000
+
+
+def benchmark_codecs(payloads, codecs=CODECS, rounds=20):
+    """
+    Body sizes (plain and gzipped) and best-of-`rounds` render and parse times in milliseconds of
+    every payload with every codec.
+    """
+    results = []
+    for name, data in payloads.items():
+        for codec, (renderer_class, parser_class, media_type) in codecs.items():
+            renderer, parser = renderer_class(), parser_class()
+            body = renderer.render(data, media_type)
+            results.append({
+                "payload": name,
+                "codec": codec,
+                "rows": len(data),
+                "bytes": len(body),
+                "gzip": len(gzip.compress(body)),
+                "render": _best_of(lambda: renderer.render(data, media_type), rounds),
+                "parse": _best_of(lambda: parser.parse(BytesIO(body), media_type), rounds),
+            })
+    return results
+
+
+def format_codec_results(results):
+    lines = [f"{'payload':<18}{'codec':<18}{'rows':>7}{'bytes':>10}{'gzip':>9}{'render':>9}{'parse':>9}"]
+    for r in results:
+        lines.append(
+            f"{r['payload']:<18}{r['codec']:<18}{r['rows']:>7}{r['bytes']:>10}{r['gzip']:>9}"
+            f"{r['render']:>9.2f}{r['parse']:>9.2f}"
+        )
+    return lines
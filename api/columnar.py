@@ -0,0 +1,53 @@
+"""
+Columnar layout of list payloads: the field names once, then one array of values per row.
+
+    [{"id": 1, "present": 1.0}, {"id": 2, "present": 0.5}]
+    <-> {"fields": ["id", "present"], "rows": [[1, 1.0], [2, 0.5]]}
+
+Paginated responses keep their envelope and only get their "results" converted. Lists whose rows do
+not all share the same keys are left as they are.
+"""
+
+LAYOUT_PARAM = 'layout'
+COLUMNAR = 'columnar'
+
+
+def is_columnar(media_type):
+    # `application/msgpack; layout=columnar`
+    params = (param.split('=', 1) for param in (media_type or '').split(';')[1:] if '=' in param)
+    return any(name.strip() == LAYOUT_PARAM and value.strip() == COLUMNAR for name, value in params)
+
+
+def _rows_to_columns(rows):
+    if not rows or not all(isinstance(row, dict) for row in rows):
+        return None
+    fields = list(rows[0])
+    if any(len(row) != len(fields) or row.keys() != rows[0].keys() for row in rows):
+        return None
+    return {"fields": fields, "rows": [[row[field] for field in fields] for row in rows]}
+
+
+def to_columns(data):
+    if isinstance(data, list):
+        return _rows_to_columns(data) or data
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        columns = _rows_to_columns(data['results'])
+        if columns:
+            return {**data, 'results': columns}
+    return data
+
+
+def _columns_to_rows(data):
+    if isinstance(data, dict) and data.keys() == {'fields', 'rows'}:
+        fields = data['fields']
+        return [dict(zip(fields, row, strict=True)) for row in data['rows']]
+    return data
+
+
+def from_columns(data):
+    """
+    Inverse of to_columns(); raises ValueError when a row does not have one value per field.
+    """
+    if isinstance(data, dict) and isinstance(data.get('results'), dict):
+        return {**data, 'results': _columns_to_rows(data['results'])}
+    return _columns_to_rows(data)
@@ -0,0 +1,86 @@
+"""
+Conditional GET for the polled read endpoints.
+
+    class SiteCostViewSet(ConditionalGetMixin, ...):
+        def etag_dependencies(self):
+            return [(SiteCost, self.kwargs.get('site_pk'))]
+
+The ETag is a hash of the table versions (api/table_versions.py) the response is built from, plus
+everything else it depends on: the URL with its query string, the media type and who is asking
+(the querysets are scoped by user type and site). Computing it is one small query, after the
+authentication and permission checks and before the handler; a matching If-None-Match gets
+304 Not Modified without the main query.
+"""
+import hashlib
+from django.conf import settings
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+from api.table_versions import current_versions
+
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+
+def request_etag(request, dependencies, extra=()):
+    user = request.user
+    key = [
+        request.get_full_path(),
+        getattr(request, 'accepted_media_type', None),
+        user.pk, getattr(user, 'user_type', None), getattr(user, 'current_site_id', None),
+        *extra,
+        *current_versions(dependencies),
+    ]
+    return '"%s"' % hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+
+def etag_matches(request, etag):
+    # If-None-Match uses the weak comparison
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in etags or any(tag.removeprefix('W/') == etag for tag in etags)
+
+
+def not_modified(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    return response
+
+
+class _NotModified(Exception):
+    pass
+
+
+class ConditionalGetMixin:
+    """
+    APIView mixin: GET / HEAD answers carry an ETag of etag_dependencies(); a request that
+    already has it gets 304 Not Modified and the handler does not run.
+    """
+    etag = None
+
+    def etag_dependencies(self):
+        """
+        [(model, site id or None for the whole table)] the response is read from.
+        """
+        raise NotImplementedError
+
+    def etag_extra(self):
+        # what else the response depends on, e.g. today's date
+        return ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        if request.method not in CONDITIONAL_METHODS or not settings.CONDITIONAL_GET_ENABLED:
+            return
+        self.etag = request_etag(request, self.etag_dependencies(), self.etag_extra())
+        if etag_matches(request, self.etag):
+            raise _NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _NotModified):
+            return not_modified(self.etag)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.etag and response.status_code == 200:
+            response['ETag'] = self.etag
+        return response
@@ -0,0 +1,129 @@
+"""
+Primary / replica routing.
+
+Reads go to the `replica` alias (when DATABASES has one) inside a replica scope: every safe-method
+request (ReplicaRoutingMiddleware) and every call of a @replica_reads report function. Writes,
+reads inside a transaction on the primary, and every read of a user who did an unsafe request in
+the last REPLICA_PIN_SECONDS (read-your-writes across workers, kept in the cache) use `default`.
+"""
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+
+REPLICA = 'replica'
+PRIMARY = 'default'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replica = ContextVar('use_replica', default=False)
+_pinned = ContextVar('pinned_to_primary', default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def _pin_key(user_id):
+    return f"db-primary-pin:{user_id}"
+
+
+def request_user_id(request):
+    # DRF authenticates inside the view; the token is only decoded here (no DB hit)
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = header and auth.get_raw_token(header)
+    if not raw_token:
+        return None
+    try:
+        return auth.get_validated_token(raw_token).get(settings.SIMPLE_JWT.get('USER_ID_CLAIM', 'user_id'))
+    except (AuthenticationFailed, TokenError):
+        return None
+
+
+def pin_to_primary(user_id):
+    cache.set(_pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(_pin_key(user_id), False)
+
+
+class replica_reads:
+    """
+    Decorator / context manager: reads inside go to the replica unless the current request is
+    pinned to the primary.
+
+        @replica_reads()
+        def get_total_site_summary(site): ...
+    """
+
+    def __enter__(self):
+        self._token = _use_replica.set(replica_configured() and not _pinned.get())
+        return self
+
+    def __exit__(self, *exc_info):
+        _use_replica.reset(self._token)
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # a fresh instance per call: the reset token must not be shared between threads
+            with replica_reads():
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        # inside an atomic block the primary has data the replica does not have yet
+        if _use_replica.get() and not connections[PRIMARY].in_atomic_block:
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # same data on both aliases
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Safe requests read from the replica; an unsafe request pins its user to the primary for
+    REPLICA_PIN_SECONDS so the next reads see the write despite replication lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_configured():
+            return self.get_response(request)
+
+        user_id = request_user_id(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if user_id is not None:
+                pin_to_primary(user_id)
+            return response
+
+        pinned = is_pinned(user_id)
+        pinned_token = _pinned.set(pinned)
+        replica_token = _use_replica.set(not pinned)
+        try:
+            return self.get_response(request)
+        finally:
+            _use_replica.reset(replica_token)
+            _pinned.reset(pinned_token)
@@ -0,0 +1,225 @@
+"""
+Delta sync for the offline-capable site manager clients.
+
+    GET /api/v1/sync/                                   every model, from the start
+    GET /api/v1/sync/?users=<cursor>&daily_records=<cursor>&site=3
+
+Each model named in the query (all of them when none is) answers
+
+    {"changed": [rows as the list endpoint sends them], "deleted": [ids], "cursor": "...", "more": false}
+
+"changed" are the rows in the user's scope written after the cursor, in keyset order of
+(updated_at, id). "deleted" are the ids of tombstones after the cursor, in (deleted_at, id) order:
+rows that were deleted or left the scope (a user moved to another site), unless they are in the
+scope again. With "more" a page limit was hit and the client asks again with the new cursor.
+
+A row can be written with an updated_at a little before its transaction commits, so a cursor never
+moves past SYNC_SETTLE_SECONDS ago, not even after a full page: rows of the last seconds may come
+twice (clients upsert by id), but a late commit is not skipped. Tombstones are kept SYNC_TOMBSTONE_DAYS; an older cursor gets
+cursor_expired and the client downloads everything again.
+"""
+import base64
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from rest_framework.exceptions import PermissionDenied
+from api.models import Tombstone
+from api.table_versions import table_label
+from api.values_reader import ValuesReader, UnsupportedSerializer
+from daily_records.models import DailyRecord
+from daily_records.serializers import DailyRecordAccessSerializer
+from site_profiles.models import SiteCost, SiteCash
+from site_profiles.serializers import SiteCostSerializer, SiteCashSerializer
+from users.models import CustomUser
+from users.serializers import CustomUserGetSerializer
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def _users_scope(user):
+    if user.user_type in ('viewer', 'main_manager'):
+        return Q(is_staff=False)
+    if user.user_type == 'site_manager' and user.current_site_id:
+        return Q(is_staff=False, current_site=user.current_site_id)
+    if user.user_type == 'employee':
+        return Q(pk=user.pk)
+    return None
+
+
+def _daily_records_scope(user):
+    if user.user_type in ('viewer', 'main_manager'):
+        return Q()
+    if user.user_type == 'site_manager' and user.current_site_id:
+        return Q(site=user.current_site_id)
+    if user.user_type == 'employee':
+        return Q(employee=user.pk)
+    return None
+
+
+def _ledger_scope(user):
+    if user.user_type in ('viewer', 'main_manager'):
+        return Q()
+    if user.user_type == 'site_manager' and user.current_site_id:
+        return Q(site=user.current_site_id)
+    return None
+
+
+@dataclass(frozen=True)
+class SyncModel:
+    model: type
+    serializer_class: type
+    scope: object  # user -> Q of the rows the user may read, None for nothing
+    site_field: str  # the column that puts a row at a site, also stored on its tombstones
+
+
+SYNC_MODELS = {
+    'users': SyncModel(CustomUser, CustomUserGetSerializer, _users_scope, 'current_site'),
+    'daily_records': SyncModel(DailyRecord, DailyRecordAccessSerializer, _daily_records_scope, 'site'),
+    'costs': SyncModel(SiteCost, SiteCostSerializer, _ledger_scope, 'site'),
+    'cash': SyncModel(SiteCash, SiteCashSerializer, _ledger_scope, 'site'),
+}
+
+
+def write_tombstone(instance, site):
+    """
+    `instance` left `site` (None: no site): sync clients of that site drop it.
+    """
+    Tombstone.objects.create(table=table_label(type(instance)), object_id=instance.pk, site=site)
+
+
+def _encode_position(position):
+    return [position[0].isoformat(), str(position[1])] if position else ['', '']
+
+
+def _decode_position(at, pk):
+    if not at:
+        return None
+    at = datetime.fromisoformat(at)
+    if at.tzinfo is None:
+        raise ValueError("naive cursor time")
+    return at, int(pk)
+
+
+def encode_cursor(rows_position, tombstones_position):
+    text = '|'.join(_encode_position(rows_position) + _encode_position(tombstones_position))
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    cursor -> ((updated_at, id) or None, (deleted_at, id) or None); an empty cursor starts over.
+    """
+    if not cursor:
+        return None, None
+    try:
+        text = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        rows_at, rows_pk, tombstones_at, tombstones_pk = text.split('|')
+        return _decode_position(rows_at, rows_pk), _decode_position(tombstones_at, tombstones_pk)
+    except ValueError:
+        raise InvalidCursor()
+
+
+def _after(queryset, field, position):
+    # keyset: (field, id) > position; the plain >= lets the index do the range
+    if position is None:
+        return queryset
+    at, pk = position
+    return queryset.filter(**{f'{field}__gte': at}).exclude(**{field: at, 'pk__lte': pk})
+
+
+def _read_page(queryset, serializer, limit):
+    """
+    (representations, (updated_at, id) of the last row or None, more) of the first `limit` rows.
+    """
+    try:
+        reader = ValuesReader(serializer) if settings.VALUES_READER_ENABLED else None
+    except UnsupportedSerializer:
+        reader = None
+    if reader is not None and {'updated_at', 'id'} <= set(reader.columns):
+        rows = list(reader.values(queryset)[:limit + 1])
+        more, rows = len(rows) > limit, rows[:limit]
+        at, pk = reader.columns.index('updated_at'), reader.columns.index('id')
+        return reader.read(rows), (rows[-1][at], rows[-1][pk]) if rows else None, more
+
+    objs = list(queryset[:limit + 1])
+    more, objs = len(objs) > limit, objs[:limit]
+    data = type(serializer)(objs, many=True, context=serializer.context).data
+    return data, (objs[-1].updated_at, objs[-1].pk) if objs else None, more
+
+
+def _next_position(position, last, more, settled):
+    """
+    (cursor position, more) after a page that ended at `last`. A full page goes on after its last
+    row while that is settled; otherwise all settled rows were read and the cursor stays at
+    `settled`, so a transaction still in flight is not skipped. The rest of the page comes again
+    with the next sync.
+    """
+    if more and last < settled:
+        return last, True
+    return (max(position, settled) if position else settled), False
+
+
+def sync_model(name, request, cursor, site=None):
+    """
+    The answer for one of SYNC_MODELS (see the module docstring).
+    """
+    synced = SYNC_MODELS[name]
+    model = synced.model
+    user = request.user
+    now = timezone.now()
+    settled = (now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS), 0)
+
+    rows_position, tombstones_position = decode_cursor(cursor)
+    if tombstones_position and tombstones_position[0] < now - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+        raise CursorExpired()
+    if rows_position is None:
+        # a full download has nothing to delete yet
+        tombstones_position = tombstones_position or settled
+
+    scope = synced.scope(user)
+    if scope is None:
+        return {"changed": [], "deleted": [], "cursor": encode_cursor(rows_position, tombstones_position), "more": False}
+    scope_site = user.current_site_id if user.user_type == 'site_manager' else None
+    if site is not None:
+        if scope_site is not None and site != scope_site:
+            raise PermissionDenied('Site Manager Only can see his Site Records.')
+        scope &= Q(**{synced.site_field: site})
+        scope_site = site
+    limit = settings.SYNC_PAGE_SIZE
+
+    rows = _after(model.objects.filter(scope), 'updated_at', rows_position).order_by('updated_at', 'pk')
+    changed, last_row, more_rows = _read_page(rows, synced.serializer_class(context={'request': request}), limit)
+
+    tombstones = _after(Tombstone.objects.filter(table=table_label(model)), 'deleted_at', tombstones_position)
+    if scope_site is not None:
+        tombstones = tombstones.filter(site=scope_site)
+    # back in the scope (moved back, or another site's tombstone for a viewer): not deleted
+    tombstones = tombstones.filter(~Exists(model.objects.filter(scope, pk=OuterRef('object_id'))))
+    page = list(tombstones.order_by('deleted_at', 'pk').values_list('deleted_at', 'pk', 'object_id')[:limit + 1])
+    more_tombstones, page = len(page) > limit, page[:limit]
+    last_tombstone = page[-1][:2] if page else None
+
+    rows_position, more_rows = _next_position(rows_position, last_row, more_rows, settled)
+    tombstones_position, more_tombstones = _next_position(tombstones_position, last_tombstone, more_tombstones, settled)
+    return {
+        "changed": changed,
+        "deleted": list(dict.fromkeys(object_id for _, _, object_id in page)),
+        "cursor": encode_cursor(rows_position, tombstones_position),
+        "more": more_rows or more_tombstones,
+    }
+
+
+def prune_tombstones():
+    """
+    Drop tombstones older than SYNC_TOMBSTONE_DAYS. Returns how many.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    return Tombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.benchmarks import CODECS, list_payloads, benchmark_codecs, format_codec_results
+
+
+class Command(BaseCommand):
+    help = "Size and time the JSON / MessagePack renderers and parsers on the list responses of the seeded data (best of N, in ms)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--codec', choices=list(CODECS), action='append', help="Only these codecs (repeatable).")
+        parser.add_argument('--rounds', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            payloads = list_payloads()
+        except LookupError as e:
+            raise CommandError(str(e))
+        codecs = {name: CODECS[name] for name in options['codec'] or CODECS}
+        for line in format_codec_results(benchmark_codecs(payloads, codecs, rounds=options['rounds'])):
+            self.stdout.write(line)
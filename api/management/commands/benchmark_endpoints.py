@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.benchmarks import benchmark_endpoints, run_benchmark, format_results
+
+
+class Command(BaseCommand):
+    help = "Benchmark the attendance and summary endpoints of a running server over HTTP (latencies in ms)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--group', choices=['attendance', 'summary'], action='append', help="Only these groups (repeatable).")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint.")
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--header', action='append', default=[], help="Extra request header, e.g. 'Accept: application/json'.")
+
+    def handle(self, *args, **options):
+        try:
+            groups = benchmark_endpoints()
+        except LookupError as e:
+            raise CommandError(str(e))
+        headers = dict(header.split(':', 1) for header in options['header'])
+        headers = {name.strip(): value.strip() for name, value in headers.items()}
+
+        results = []
+        for group in options['group'] or groups:
+            for endpoint in groups[group]:
+                results.append(run_benchmark(
+                    options['base_url'], endpoint, requests=options['requests'],
+                    concurrency=options['concurrency'], warmup=options['warmup'], headers=headers,
+                ))
+        for line in format_results(results):
+            self.stdout.write(line)
@@ -0,0 +1,35 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from api.query_plans import HOT_PATHS, HotPathContext, capture_hot_path, explain, format_plan, sequential_scans, large_tables
+
+
+class Command(BaseCommand):
+    help = "Run the API's hot query paths and print the PostgreSQL plan of every SELECT they issue."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', choices=sorted(HOT_PATHS), action='append', help="Only these paths (repeatable).")
+        parser.add_argument('--date', help="YYYY-MM-DD, defaults to today.")
+        parser.add_argument('--analyze', action='store_true', help="EXPLAIN ANALYZE: executes the queries and shows real timings.")
+        parser.add_argument('--large-table-rows', type=int, default=10000, help="Flag sequential scans on tables at least this big.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("explain_hot_queries needs the PostgreSQL database.")
+        date = datetime.strptime(options['date'], "%Y-%m-%d").date() if options['date'] else None
+        try:
+            ctx = HotPathContext.from_database(date)
+        except LookupError as e:
+            raise CommandError(str(e))
+
+        big_tables = large_tables(options['large_table_rows'])
+        self.stdout.write(f"site={ctx.site_id} employee={ctx.employee_id} date={ctx.date}")
+        for name in options['path'] or HOT_PATHS:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {name}"))
+            for sql, params in capture_hot_path(name, ctx):
+                plan = explain(sql, params, analyze=options['analyze'])
+                self.stdout.write(f"\n{sql[:160]}{'...' if len(sql) > 160 else ''}")
+                for line in format_plan(plan):
+                    self.stdout.write(f"  {line}")
+                for table in sequential_scans(plan, big_tables):
+                    self.stdout.write(self.style.WARNING(f"  ! sequential scan on large table {table}"))
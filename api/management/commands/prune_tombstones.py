@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from api.delta_sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = "Delete delta sync tombstones older than SYNC_TOMBSTONE_DAYS (cursors that old get cursor_expired)."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"deleted {prune_tombstones()} tombstone(s)")
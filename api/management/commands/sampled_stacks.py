@@ -0,0 +1,22 @@
+from time import time
+from django.core.management.base import BaseCommand
+from api.sampler import collapsed_stacks, render_collapsed
+
+
+class Command(BaseCommand):
+    help = "Print the collapsed stacks sampled by the API workers (input for flamegraph.pl / speedscope)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=float, default=15, help="Window ending now.")
+        parser.add_argument('--route', help="Only requests of this route name, e.g. site-summary.")
+        parser.add_argument('--output', help="Write to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        stacks = collapsed_stacks(time() - options['minutes'] * 60, label=options['route'])
+        text = render_collapsed(stacks)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(text)
+            self.stdout.write(f"{len(stacks)} stacks, {sum(stacks.values())} samples written to {options['output']}")
+        else:
+            self.stdout.write(text, ending='')
@@ -0,0 +1,147 @@
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.timezone import localdate, make_aware
+from site_profiles.models import Site, SiteCost, SiteCash, SiteBill
+from users.models import CustomUser, Promotion
+from daily_records.models import DailyRecord, WorkSession, SiteWorkRecord, DailyRecordSnapshot
+from api.table_versions import bump_versions
+
+SESSION_DAYS = 30
+BATCH_SIZE = 5000
+
+
+@contextmanager
+def _manual_created_dates():
+    # the seed writes historical sessions, so auto_now_add must not stamp them with today
+    fields = [WorkSession._meta.get_field('created_date'), SiteWorkRecord._meta.get_field('created_date')]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "Fill an empty database with a deterministic benchmark dataset (sites, workers, attendance history, ledgers)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sites', type=int, default=5)
+        parser.add_argument('--employees', type=int, default=40, help="Workers per site.")
+        parser.add_argument('--days', type=int, default=365, help="Days of history up to today.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if Site.objects.exists():
+            raise CommandError("Database already has sites; seed into an empty database.")
+
+        rng = random.Random(options['seed'])
+        today = localdate()
+        first_day = today - timedelta(days=options['days'] - 1)
+
+        with transaction.atomic(), _manual_created_dates():
+            sites = Site.objects.bulk_create([
+                Site(name=f"Site {n}", description="benchmark", location="Dhaka", start_at=first_day)
+                for n in range(options['sites'])
+            ])
+            self._seed_ledgers(rng, sites, first_day, today)
+            employees = self._seed_users(rng, sites, first_day, options['employees'])
+            self._seed_attendance(rng, employees, first_day, today)
+            # bulk_create skips the signals; ETags from before a reseed must not match
+            site_ids = [site.pk for site in sites]
+            for model in [Site, DailyRecord, DailyRecordSnapshot, WorkSession, SiteWorkRecord, SiteCost, SiteCash, SiteBill]:
+                bump_versions(model, site_ids)
+            bump_versions(CustomUser, [None])
+            bump_versions(Promotion, [None])
+
+        for model in [Site, CustomUser, DailyRecord, DailyRecordSnapshot, WorkSession, SiteWorkRecord, SiteCost, SiteCash, SiteBill]:
+            self.stdout.write(f"{model.__name__}: {model.objects.count()}")
+
+    def _seed_ledgers(self, rng, sites, first_day, today):
+        costs, cashes, bills = [], [], []
+        for site in sites:
+            day = first_day
+            while day <= today:
+                for _ in range(rng.randint(1, 5)):
+                    costs.append(SiteCost(site=site, date=day, title="cost", amount=rng.randint(50, 5000), type=rng.choice(['st', 'ot'])))
+                cashes.append(SiteCash(site=site, date=day, title="cash", amount=rng.randint(1000, 20000)))
+                if day.weekday() == 4:
+                    bills.append(SiteBill(site=site, date=day, title="bill", amount=rng.randint(50000, 200000)))
+                day += timedelta(days=1)
+        SiteCost.objects.bulk_create(costs, batch_size=BATCH_SIZE)
+        SiteCash.objects.bulk_create(cashes, batch_size=BATCH_SIZE)
+        SiteBill.objects.bulk_create(bills, batch_size=BATCH_SIZE)
+
+    def _seed_users(self, rng, sites, first_day, per_site):
+        # one shared unusable password: hashing is not what this dataset measures
+        users = [
+            CustomUser(username=f"bench_manager_{site.pk}", user_type='site_manager', current_site=site, current_salary=1000)
+            for site in sites
+        ]
+        users.append(CustomUser(username="bench_viewer", user_type='viewer', current_site=sites[0]))
+        for site in sites:
+            users += [
+                CustomUser(
+                    username=f"bench_{site.pk}_{n}",
+                    first_name=f"Worker {n}",
+                    current_site=site,
+                    designation=rng.choice(['MISTRI', 'RAJMISTRI', 'HELPER']),
+                    current_salary=rng.randint(400, 1200),
+                )
+                for n in range(per_site)
+            ]
+        joined = make_aware(datetime.combine(first_day, time()))
+        for user in users:
+            user.set_unusable_password()
+            user.date_joined = joined
+        CustomUser.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        Promotion.objects.bulk_create(
+            [Promotion(employee=user, date=first_day, current_salary=user.current_salary) for user in users],
+            batch_size=BATCH_SIZE,
+        )
+        return [user for user in users if user.user_type == 'employee']
+
+    def _seed_attendance(self, rng, employees, first_day, today):
+        sessions, snapshots, records, work_records = [], [], [], []
+        for employee in employees:
+            site = employee.current_site
+            start = first_day
+            # closed sessions every SESSION_DAYS, the open tail stays as DailyRecords
+            while start + timedelta(days=SESSION_DAYS) <= today:
+                end = start + timedelta(days=SESSION_DAYS - 1)
+                days = [start + timedelta(days=n) for n in range(SESSION_DAYS)]
+                rows = [(day, rng.choice([0, 1, 1, 1, 1.5]), rng.choice([0, 50, 100]), rng.choice([0, 0, 0, 500])) for day in days]
+                present = sum(row[1] for row in rows)
+                khoraki = sum(row[2] for row in rows)
+                advance = sum(row[3] for row in rows)
+                session = WorkSession(
+                    employee=employee, site=site, start_date=start, end_date=end, created_date=end + timedelta(days=1),
+                    present=present, session_salary=employee.current_salary, khoraki=khoraki, advance=advance,
+                )
+                sessions.append(session)
+                work_records.append(SiteWorkRecord(
+                    work_session=session, site=site, session_owner=True, created_date=session.created_date,
+                    present=present, session_salary=employee.current_salary, khoraki=khoraki, advance=advance,
+                ))
+                snapshots += [
+                    DailyRecordSnapshot(site=site, employee=employee, date=day, present=p, khoraki=k, advance=a, current_salary=employee.current_salary)
+                    for day, p, k, a in rows
+                ]
+                start = end + timedelta(days=1)
+
+            day = start
+            while day <= today:
+                records.append(DailyRecord(
+                    employee=employee, site=site, date=day, present=rng.choice([0, 1, 1, 1.5]),
+                    khoraki=rng.choice([0, 50, 100]), advance=rng.choice([0, 0, 200]),
+                ))
+                day += timedelta(days=1)
+
+        WorkSession.objects.bulk_create(sessions, batch_size=BATCH_SIZE)
+        SiteWorkRecord.objects.bulk_create(work_records, batch_size=BATCH_SIZE)
+        DailyRecordSnapshot.objects.bulk_create(snapshots, batch_size=BATCH_SIZE)
+        DailyRecord.objects.bulk_create(records, batch_size=BATCH_SIZE)
@@ -0,0 +1,166 @@
+"""
+Rolling per-route latency and query-count histograms.
+
+Every worker counts its requests into one-minute slots and publishes the slots of the last
+METRICS_WINDOW_SECONDS to its worker file (at most once per METRICS_FLUSH_SECONDS), together with
+its database connection counters. The metrics endpoint merges the files of all workers and renders
+them in the Prometheus text format.
+"""
+import copy
+import threading
+from bisect import bisect_left
+from collections import Counter
+from time import time
+from django.conf import settings
+from django.db import connections
+from api.worker_files import write_worker_file, read_worker_files
+
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+QUERY_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200]
+QUANTILES = [0.5, 0.95, 0.99]
+SLOT_SECONDS = 60
+HISTOGRAMS = {
+    # name: (buckets, help)
+    "latency": (LATENCY_BUCKETS_MS, "Request latency in milliseconds"),
+    "queries": (QUERY_BUCKETS, "SQL queries per request"),
+}
+
+_lock = threading.Lock()
+_slots = {}  # slot -> {"route method": {"latency": [...], "latency_sum": .., "queries": [...], "queries_sum": .., "count": ..}}
+_last_flush = 0.0
+_connections_created = Counter()  # alias -> connection_created signals of this worker (pool checkouts in pool mode)
+
+
+def _empty_entry():
+    entry = {"count": 0}
+    for name, (buckets, _) in HISTOGRAMS.items():
+        entry[name] = [0] * (len(buckets) + 1)  # last one is +Inf
+        entry[f"{name}_sum"] = 0
+    return entry
+
+
+def _current_slots(slots, now):
+    oldest = int(now // SLOT_SECONDS) - settings.METRICS_WINDOW_SECONDS // SLOT_SECONDS
+    return {slot: routes for slot, routes in slots.items() if int(slot) > oldest}
+
+
+def observe(route, method, duration_ms, queries):
+    global _slots, _last_flush
+    now = time()
+    key = f"{route} {method}"
+    with _lock:
+        entry = _slots.setdefault(int(now // SLOT_SECONDS), {}).setdefault(key, _empty_entry())
+        entry["count"] += 1
+        for name, value in (("latency", duration_ms), ("queries", queries)):
+            entry[name][bisect_left(HISTOGRAMS[name][0], value)] += 1
+            entry[f"{name}_sum"] += value
+        if now - _last_flush < settings.METRICS_FLUSH_SECONDS:
+            return
+        _slots = _current_slots(_slots, now)
+        _last_flush = now
+    flush()
+
+
+def count_connection(alias):
+    # connection_created receiver (api/signals.py)
+    _connections_created[alias] += 1
+
+
+def db_stats():
+    """
+    {alias: {"connections_created": .., <psycopg pool stats>}} of this worker.
+    """
+    stats = {}
+    for alias in connections:
+        stats[alias] = {"connections_created": _connections_created[alias]}
+        # only the psycopg 3 backend with DB_CONN_MODE=pool has one; get_stats() counters are cumulative
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            stats[alias].update(pool.get_stats())
+    return stats
+
+
+def flush():
+    global _last_flush
+    with _lock:
+        # observe() keeps changing the entries; the file is written outside the lock
+        routes = copy.deepcopy({str(slot): entries for slot, entries in _current_slots(_slots, time()).items()})
+        _last_flush = time()
+    write_worker_file('metrics', {"routes": routes, "db": db_stats()})
+
+
+def read_merged():
+    """
+    ({"route method": entry}, {alias: {stat: value}}) summed over every worker; route entries only
+    count the slots still inside the window.
+    """
+    flush()
+    now = time()
+    merged, db = {}, {}
+    for worker in read_worker_files('metrics', max_age=settings.METRICS_WINDOW_SECONDS):
+        for alias, stats in worker.get("db", {}).items():
+            totals = db.setdefault(alias, Counter())
+            totals.update(stats)
+        for routes in _current_slots(worker.get("routes", {}), now).values():
+            for key, entry in routes.items():
+                total = merged.setdefault(key, _empty_entry())
+                total["count"] += entry["count"]
+                for name in HISTOGRAMS:
+                    total[name] = [a + b for a, b in zip(total[name], entry[name])]
+                    total[f"{name}_sum"] += entry[f"{name}_sum"]
+    return merged, db
+
+
+def quantile(buckets, counts, q):
+    # linear interpolation inside the bucket holding the q-th observation
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if count and seen + count >= rank:
+            lower = buckets[i - 1] if i else 0
+            if i == len(buckets):
+                return float(lower)
+            return lower + (buckets[i] - lower) * (rank - seen) / count
+        seen += count
+    return float(buckets[-1])
+
+
+def _labels(key, **extra):
+    route, method = key.rsplit(" ", 1)
+    labels = {"route": route, "method": method, **extra}
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def render_prometheus(merged, db):
+    window = settings.METRICS_WINDOW_SECONDS
+    lines = []
+    for name, (buckets, help_text) in HISTOGRAMS.items():
+        metric = f"api_request_{name}"
+        lines += [f"# HELP {metric} {help_text}, last {window}s.", f"# TYPE {metric} histogram"]
+        for key in sorted(merged):
+            entry = merged[key]
+            cumulative = 0
+            for bound, count in zip([*buckets, "+Inf"], entry[name]):
+                cumulative += count
+                lines.append(f"{metric}_bucket{{{_labels(key, le=bound)}}} {cumulative}")
+            lines.append(f"{metric}_sum{{{_labels(key)}}} {round(entry[f'{name}_sum'], 3)}")
+            lines.append(f"{metric}_count{{{_labels(key)}}} {entry['count']}")
+
+        lines += [f"# HELP {metric}_quantile {help_text}, p50/p95/p99 of the last {window}s.", f"# TYPE {metric}_quantile gauge"]
+        for key in sorted(merged):
+            for q in QUANTILES:
+                value = quantile(buckets, merged[key][name], q)
+                lines.append(f"{metric}_quantile{{{_labels(key, quantile=q)}}} {value:.3f}")
+
+    # database connections, summed over the live workers: the sum drops when a worker's file
+    # expires, so even the per-worker counters are exported as gauges
+    for stat in sorted({stat for stats in db.values() for stat in stats}):
+        metric = f"api_db_{stat}"
+        lines.append(f"# TYPE {metric} gauge")
+        for alias in sorted(db):
+            if stat in db[alias]:
+                lines.append(f'{metric}{{alias="{alias}"}} {db[alias][stat]}')
+    return "\n".join(lines) + "\n"
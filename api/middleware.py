@@ -0,0 +1,109 @@
+import json
+import logging
+from contextlib import ExitStack
+from time import perf_counter
+from django.conf import settings
+from django.db import connections
+from api import metrics as route_metrics
+
+logger = logging.getLogger('api.performance')
+
+
+class RequestTimings:
+    """
+    Counters of one request. Everything is in seconds until it is reported.
+    """
+    __slots__ = ('queries', 'db', 'view_start', 'view', 'render_start', 'render')
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.view_start = None
+        self.view = 0.0
+        self.render_start = None
+        self.render = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # django execute_wrapper: time every query sent on the connection
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += perf_counter() - start
+            self.queries += 1
+
+
+class ServerTimingMiddleware:
+    """
+    Query count, DB time, view time and DRF render time of every request, sent back as
+    `Server-Timing` headers and logged as one JSON line on the `api.performance` logger.
+
+    View time runs from process_view until the view returned its response (for DRF responses
+    that is process_template_response, just before rendering), render time is the
+    TemplateResponse.render() of DRF's Response. Keep it first in MIDDLEWARE so total covers
+    the other middleware too.
+    """
+    # the execute_wrapper only sees the queries of the thread it runs on
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = request._timings = RequestTimings()
+        start = perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timings))
+            response = self.get_response(request)
+        end = perf_counter()
+
+        if timings.view_start is not None and timings.render_start is None:
+            # plain HttpResponse: no render step, the view ran until the response came back
+            timings.view = end - timings.view_start
+        self._report(request, response, timings, end - start)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timings.view_start = perf_counter()
+
+    def process_template_response(self, request, response):
+        timings = request._timings
+        timings.render_start = perf_counter()
+        if timings.view_start is not None:
+            timings.view = timings.render_start - timings.view_start
+
+        def finish_render(response):
+            timings.render = perf_counter() - timings.render_start
+
+        response.add_post_render_callback(finish_render)
+        return response
+
+    def _report(self, request, response, timings, total):
+        durations = {
+            "total": total * 1000,
+            "view": timings.view * 1000,
+            "render": timings.render * 1000,
+            "db": timings.db * 1000,
+        }
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = ", ".join([
+                f'db;dur={durations["db"]:.1f};desc="{timings.queries} queries"',
+                f'view;dur={durations["view"]:.1f}',
+                f'render;dur={durations["render"]:.1f}',
+                f'total;dur={durations["total"]:.1f}',
+            ])
+        match = request.resolver_match
+        if match:
+            # named routes group list/detail of a viewset; unnamed ones fall back to the pattern
+            route_metrics.observe(match.view_name or match.route, request.method, durations["total"], timings.queries)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "method": request.method,
+                "path": request.path,
+                "route": match.route if match else None,
+                "status": response.status_code,
+                "queries": timings.queries,
+                **{f"{name}_ms": round(value, 2) for name, value in durations.items()},
+            }))
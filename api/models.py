@@ -1,3 +1,38 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class TableVersion(models.Model):
+    """
+    Write counter per table and site, bumped with every write (see api/table_versions.py).
+    """
+    table = models.CharField(max_length=100)  # model label, e.g. "daily_records.dailyrecord"
+    site = models.PositiveIntegerField(default=0)  # 0: rows that belong to no site
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['table', 'site'], name='table_version_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.table} | site {self.site} | v{self.version}"
+
+
+class Tombstone(models.Model):
+    """
+    A row that left a site's sync scope: deleted, or a user moved to another site (see api/delta_sync.py).
+    """
+    table = models.CharField(max_length=100)  # model label, e.g. "daily_records.dailyrecord"
+    object_id = models.PositiveBigIntegerField()
+    site = models.PositiveIntegerField(null=True, blank=True)  # the site the row was in
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # keyset reads of one table after a cursor
+            models.Index(fields=['table', 'deleted_at'], name='tombstone_table_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.table} #{self.object_id} | {self.deleted_at}"
@@ -0,0 +1,113 @@
+"""
+N+1 query detector.
+
+Every SQL statement of a request is reduced to a fingerprint (placeholders, literals and IN lists
+collapsed); a fingerprint executed more than NPLUSONE_THRESHOLD times is reported together with
+the application stack that issued it. NPLUSONE_MODE picks what happens: "raise" (tests), "log"
+(staging) or "off".
+"""
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('api.nplusone')
+
+PROJECT_ROOT = str(Path(settings.BASE_DIR))
+# the entry point and the execute_wrapper / middleware frames add nothing to the report
+SKIPPED_FILES = {str(Path(settings.BASE_DIR) / name) for name in ('manage.py', 'api/middleware.py', 'api/nplusone.py')}
+_IN_LIST = re.compile(r"IN \((?:%s|\?)(?:, (?:%s|\?))*\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _STRING.sub("?", sql)
+    return _NUMBER.sub("?", sql)
+
+
+def application_stack():
+    # frames of this project only; django / DRF / site-packages frames are noise here
+    return [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(PROJECT_ROOT) and 'site-packages' not in frame.filename
+        and frame.filename not in SKIPPED_FILES
+    ]
+
+
+class QueryRepeats:
+    """
+    execute_wrapper counting fingerprints; keeps the stack of the first repeat of each one.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.stacks = {}
+        self.samples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        key = fingerprint(sql)
+        self.counts[key] += 1
+        if self.counts[key] == 2:
+            self.stacks[key] = application_stack()
+            self.samples[key] = sql
+        return execute(sql, params, many, context)
+
+    def problems(self):
+        return [
+            {"sql": self.samples[key], "count": count, "stack": self.stacks[key]}
+            for key, count in self.counts.most_common() if count > self.threshold
+        ]
+
+
+def format_problem(problem, label=None):
+    lines = [f"N+1 query{f' in {label}' if label else ''}: executed {problem['count']} times", f"    {problem['sql']}"]
+    lines += [line.rstrip() for line in traceback.format_list(problem['stack'])]
+    return "\n".join(lines)
+
+
+def report(problems, mode, label=None):
+    if not problems or mode == 'off':
+        return
+    message = "\n\n".join(format_problem(problem, label) for problem in problems)
+    if mode == 'raise':
+        raise NPlusOneError(message)
+    logger.warning(message)
+
+
+@contextmanager
+def detect_nplusone(mode=None, threshold=None, label=None):
+    """
+    with detect_nplusone(mode='raise'):
+        serializer.data
+    """
+    mode = mode or settings.NPLUSONE_MODE
+    repeats = QueryRepeats(settings.NPLUSONE_THRESHOLD if threshold is None else threshold)
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(repeats))
+        yield repeats
+    report(repeats.problems(), mode, label)
+
+
+class NPlusOneMiddleware:
+    """
+    Runs every request inside detect_nplusone. Only installed when NPLUSONE_MODE is not "off".
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with detect_nplusone(label=f"{request.method} {request.path}"):
+            return self.get_response(request)
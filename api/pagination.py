@@ -0,0 +1,40 @@
+from functools import partial
+from django.core.paginator import Paginator
+from django.db.models import Count
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+
+class CountedPaginator(Paginator):
+    # the count is already known (aggregated with the ledger totals), so no COUNT query of its own
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+class LedgerPagination(PageNumberPagination):
+    # opt-in: lists stay plain arrays unless the client sends ?page_size=
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_with_totals(self, rows, queryset, totals, request, view=None):
+        """
+        paginate_queryset() for `rows` plus the `totals` aggregates over `queryset` (the filtered
+        rows). The row count comes from the same aggregate query. Returns (page, totals), or
+        (None, None) when the client did not ask for pages.
+        """
+        if not self.get_page_size(request):
+            return None, None
+        totals = queryset.aggregate(ledger_count=Count('pk'), **totals)
+        self.django_paginator_class = partial(CountedPaginator, count=totals.pop('ledger_count'))
+        return self.paginate_queryset(rows, request, view), totals
+
+    def get_paginated_response(self, data, totals=None):
+        return Response({
+            'count': self.page.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'totals': totals,
+            'results': data,
+        })
@@ -0,0 +1,31 @@
+"""
+orjson parser for the JSON request bodies (bulk attendance POSTs), and a MessagePack parser that
+also takes the columnar layout (`Content-Type: application/msgpack; layout=columnar`).
+"""
+import msgpack
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from api.columnar import is_columnar, from_columns
+
+
+class ORJSONParser(BaseParser):
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        # orjson takes the UTF-8 bytes as they are and rejects NaN/Infinity like DRF's strict parser
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            data = msgpack.unpackb(stream.read(), raw=False)
+            return from_columns(data) if is_columnar(media_type) else data
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
@@ -0,0 +1,114 @@
+"""
+Opt-in cProfile of single requests for staff users.
+
+Send `X-Profile: 1` (or add `?_profile=1`) to any API request; when the caller is staff the
+request runs under cProfile and <PROFILE_DIR>/<id>.prof (pstats dump) and .txt (top
+PROFILE_TOP_N functions by cumulative time) are written. The id (the request id plus a random
+suffix) comes back in the `X-Profile-Id` header and the report is served on
+api/v1/profiles/<id>/. Only the newest PROFILE_MAX_REPORTS reports are kept.
+
+Only one profiler can run per interpreter (cProfile uses sys.monitoring on 3.12), so while one
+request is profiled an overlapping one is served unprofiled, without an X-Profile-Id.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import uuid
+from pathlib import Path
+from time import perf_counter
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+REQUEST_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+PROFILE_ID = re.compile(r"^[A-Za-z0-9_-]{1,80}$")
+
+_profiler_lock = threading.Lock()
+
+
+def profile_path(profile_id, suffix):
+    return Path(settings.PROFILE_DIR) / f"{profile_id}{suffix}"
+
+
+def _wants_profile(request):
+    return 'HTTP_X_PROFILE' in request.META or '_profile' in request.GET
+
+
+def _is_staff(request):
+    # DRF authenticates inside the view, so the JWT is checked here for the profiled request only
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return bool(result and result[0].is_staff)
+
+
+def _profile_id(request):
+    # the caller's / proxy's request id when it is safe to put in a file name, made unique so two
+    # requests with the same id do not overwrite each other's reports
+    given = request.META.get('HTTP_X_REQUEST_ID', '')
+    suffix = uuid.uuid4().hex[:12]
+    return f"{given}-{suffix}" if REQUEST_ID.match(given) else uuid.uuid4().hex
+
+
+def prune_reports():
+    # keep the newest PROFILE_MAX_REPORTS reports
+    dumps = sorted(Path(settings.PROFILE_DIR).glob('*.prof'), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in dumps[settings.PROFILE_MAX_REPORTS:]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.txt').unlink(missing_ok=True)
+
+
+def write_report(profile_id, profiler, request, duration):
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(profile_path(profile_id, '.prof'))
+
+    stream = io.StringIO()
+    stream.write(f"{request.method} {request.get_full_path()}  {duration * 1000:.1f} ms\n")
+    pstats.Stats(profiler, stream=stream).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(settings.PROFILE_TOP_N)
+    tmp_path = profile_path(profile_id, '.txt.tmp')
+    tmp_path.write_text(stream.getvalue())
+    os.replace(tmp_path, profile_path(profile_id, '.txt'))
+    prune_reports()
+
+
+class RequestProfileMiddleware:
+    """
+    Everything but flagged staff requests passes straight through.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _wants_profile(request) or not _is_staff(request):
+            return self.get_response(request)
+
+        # another profiled request is running: serve this one unprofiled
+        if not _profiler_lock.acquire(blocking=False):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiling tool (a debugger, coverage) holds sys.monitoring
+            _profiler_lock.release()
+            return self.get_response(request)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            _profiler_lock.release()
+
+        profile_id = _profile_id(request)
+        write_report(profile_id, profiler, request, perf_counter() - start)
+        response['X-Profile-Id'] = profile_id
+        return response
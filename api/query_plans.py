@@ -0,0 +1,157 @@
+"""
+Hot query paths of the API and helpers to EXPLAIN them on PostgreSQL.
+
+Every hot path runs the real code (service function or view) while the executed SELECTs are
+recorded, so the plans shown are the plans of the SQL the API actually sends.
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date as date_cls
+from django.db import connection
+from django.db.models import Count
+from django.utils.timezone import localdate
+from rest_framework.test import APIRequestFactory, force_authenticate
+from users.models import CustomUser
+from site_profiles.services.site_summary import get_date_based_site_summary, get_total_site_summary
+from site_profiles.views import SiteCostViewSet, SiteCashViewSet, SiteBillViewSet
+from daily_records.models import DailyRecord
+from daily_records.views import DailyRecordViewSet, DailyRecordSnapshotViewset, CurrentWorkSession
+from users.services.promotion_timeline import last_session_end_date
+
+
+@dataclass
+class HotPathContext:
+    site_id: int
+    employee_id: int
+    date: date_cls
+
+    @classmethod
+    def from_database(cls, date=None):
+        # the busiest site and one of its workers, so plans reflect the largest row counts
+        busiest = (
+            DailyRecord.objects.values('site').annotate(rows=Count('id')).order_by('-rows').first()
+        )
+        if busiest is None:
+            raise LookupError("No daily records found; run `manage.py seed_benchmark_data` first.")
+        employee_id = DailyRecord.objects.filter(site=busiest['site']).values_list('employee', flat=True).first()
+        return cls(site_id=busiest['site'], employee_id=employee_id, date=date or localdate())
+
+
+def _get(view, user, path='/', data=None, **kwargs):
+    # in-memory users: permissions only look at user_type / site, nothing is written
+    request = APIRequestFactory().get(path, data or {})
+    force_authenticate(request, user=user)
+    return view(request, **kwargs)
+
+
+def _main_manager():
+    return CustomUser(user_type='main_manager')
+
+
+def _site_manager(ctx):
+    return CustomUser(user_type='site_manager', current_site_id=ctx.site_id)
+
+
+def _ledger(viewset):
+    def run(ctx):
+        return _get(
+            viewset.as_view({'get': 'list'}), _main_manager(), site_pk=str(ctx.site_id),
+            data={'date_after': ctx.date.replace(day=1), 'date_before': ctx.date, 'page_size': 50},
+        )
+    return run
+
+
+HOT_PATHS = {
+    'date_based_site_summary': lambda ctx: get_date_based_site_summary(ctx.site_id, ctx.date, 'viewer'),
+    'total_site_summary': lambda ctx: get_total_site_summary(ctx.site_id),
+    'daily_records_site_manager': lambda ctx: _get(DailyRecordViewSet.as_view({'get': 'list'}), _site_manager(ctx)),
+    'daily_records_site_date': lambda ctx: _get(
+        DailyRecordViewSet.as_view({'get': 'list'}), _main_manager(), data={'site': ctx.site_id, 'date': ctx.date},
+    ),
+    'snapshots_site_date': lambda ctx: _get(DailyRecordSnapshotViewset.as_view({'get': 'list'}), _site_manager(ctx)),
+    'snapshots_employee_date': lambda ctx: _get(
+        DailyRecordSnapshotViewset.as_view({'get': 'list'}), CustomUser(pk=ctx.employee_id, user_type='employee'),
+    ),
+    'current_work_session': lambda ctx: _get(CurrentWorkSession.as_view(), _main_manager(), emp_id=ctx.employee_id),
+    'last_session_end_date': lambda ctx: last_session_end_date(ctx.employee_id),
+    'cost_records': _ledger(SiteCostViewSet),
+    'cash_records': _ledger(SiteCashViewSet),
+    'bill_records': _ledger(SiteBillViewSet),
+}
+
+
+@contextmanager
+def record_selects():
+    """
+    Collect (sql, params) of every SELECT executed inside the block.
+    """
+    statements = []
+
+    def recorder(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(recorder):
+        yield statements
+
+
+def capture_hot_path(name, ctx):
+    with record_selects() as statements:
+        HOT_PATHS[name](ctx)
+    return statements
+
+
+def explain(sql, params, analyze=False):
+    if connection.vendor != 'postgresql':
+        raise RuntimeError("EXPLAIN (FORMAT JSON) plans need PostgreSQL.")
+    options = "FORMAT JSON, ANALYZE, BUFFERS" if analyze else "FORMAT JSON"
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN ({options}) {sql}", params)
+        return cursor.fetchone()[0][0]
+
+
+def plan_nodes(plan):
+    # depth first walk over the plan tree, yields (depth, node)
+    stack = [(0, plan['Plan'] if 'Plan' in plan else plan)]
+    while stack:
+        depth, node = stack.pop()
+        yield depth, node
+        stack.extend((depth + 1, child) for child in reversed(node.get('Plans', [])))
+
+
+def large_tables(min_rows):
+    # planner row estimates from pg_class; run ANALYZE after seeding so they are current
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname FROM pg_class WHERE relkind = 'r' AND reltuples >= %s",
+            [min_rows],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def sequential_scans(plan, tables=None):
+    """
+    Relation names read with a Seq Scan; limited to `tables` when given.
+    """
+    return [
+        node['Relation Name'] for _, node in plan_nodes(plan)
+        if node['Node Type'] == 'Seq Scan' and (tables is None or node['Relation Name'] in tables)
+    ]
+
+
+def format_plan(plan):
+    lines = []
+    for depth, node in plan_nodes(plan):
+        label = node['Node Type']
+        if node.get('Index Name'):
+            label += f" using {node['Index Name']}"
+        if node.get('Relation Name'):
+            label += f" on {node['Relation Name']}"
+        cost = f"cost={node['Startup Cost']:.2f}..{node['Total Cost']:.2f} rows={node['Plan Rows']}"
+        if 'Actual Total Time' in node:
+            cost += f" actual={node['Actual Total Time']:.3f}ms rows={node['Actual Rows']}"
+        lines.append(f"{'  ' * depth}-> {label} ({cost})")
+    if 'Execution Time' in plan:
+        lines.append(f"Execution Time: {plan['Execution Time']:.3f} ms")
+    return lines
@@ -0,0 +1,47 @@
+"""
+orjson renderer: same output as DRF's JSONRenderer (compact, UTF-8, Bangla text unescaped), several
+times faster on the large lists.
+
+MessagePack renderer for the mobile clients (`Accept: application/msgpack`, or `?format=msgpack`);
+`Accept: application/msgpack; layout=columnar` sends lists in the columnar layout (api/columnar.py).
+"""
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from api.columnar import is_columnar, to_columns
+
+_encoder = JSONEncoder()
+# datetimes go through DRF's encoder too: it drops microseconds to milliseconds and writes UTC as "Z"
+_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        options = _OPTIONS
+        # `Accept: application/json; indent=4` or the browsable API's indent, read like DRF's
+        # (indent=0 is compact); orjson only indents by 2
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        # Decimal, lazy translations, timedelta, querysets ... -> DRF's conversions
+        ret = orjson.dumps(data, default=_encoder.default, option=options)
+        # DRF escapes these two, they end a line in JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if is_columnar(accepted_media_type):
+            data = to_columns(data)
+        # dates, Decimals ... become the same strings / numbers as in the JSON responses
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True)
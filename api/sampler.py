@@ -0,0 +1,139 @@
+"""
+Always-on statistical profiler.
+
+A daemon thread per worker process wakes every SAMPLER_INTERVAL seconds, reads the stacks of the
+threads currently serving a request (sys._current_frames) and counts them as collapsed stacks
+("route;frame;frame..."), in SAMPLER_BUCKET_SECONDS buckets. Buckets are published to the worker
+files every SAMPLER_FLUSH_SECONDS and merged on read; the output feeds flamegraph.pl or speedscope.
+"""
+import os
+import sys
+import threading
+from collections import Counter
+from time import sleep, time
+from django.conf import settings
+from api.worker_files import write_worker_file, read_worker_files
+
+MAX_DEPTH = 80
+
+_active = {}  # thread id -> label (route name) of the request it is serving
+_buckets = {}  # bucket start -> Counter(collapsed stack -> samples)
+_lock = threading.Lock()
+_started_pid = None
+
+
+def _frame_name(frame, roots):
+    code = frame.f_code
+    filename = code.co_filename
+    for root in roots:
+        if filename.startswith(root):
+            filename = filename[len(root):].lstrip(os.sep)
+            break
+    return f"{filename}:{code.co_qualname}"
+
+
+def _roots():
+    # shortest readable file names: project relative, then relative to site-packages / stdlib
+    roots = [str(settings.BASE_DIR)]
+    roots += sorted({path for path in sys.path if path and path != str(settings.BASE_DIR)}, key=len, reverse=True)
+    return roots
+
+
+def collapse(frame, label, roots):
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        names.append(_frame_name(frame, roots))
+        frame = frame.f_back
+    names.append(label)
+    return ";".join(reversed(names))
+
+
+def _sample_loop(interval):
+    roots = _roots()
+    own_id = threading.get_ident()
+    last_flush = time()
+    while True:
+        sleep(interval)
+        now = time()
+        if _active:
+            frames = sys._current_frames()
+            bucket_start = int(now // settings.SAMPLER_BUCKET_SECONDS) * settings.SAMPLER_BUCKET_SECONDS
+            with _lock:
+                counter = _buckets.setdefault(bucket_start, Counter())
+                for thread_id, label in list(_active.items()):
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != own_id:
+                        counter[collapse(frame, label, roots)] += 1
+        if now - last_flush >= settings.SAMPLER_FLUSH_SECONDS:
+            flush(now)
+            last_flush = now
+
+
+def flush(now=None):
+    now = now or time()
+    oldest = now - settings.SAMPLER_RETENTION_SECONDS
+    with _lock:
+        for bucket_start in [start for start in _buckets if start < oldest]:
+            del _buckets[bucket_start]
+        snapshot = {str(start): dict(counter) for start, counter in _buckets.items()}
+    write_worker_file('samples', snapshot)
+
+
+def ensure_started():
+    # one thread per process, started on the first request so forked gunicorn workers get their own
+    global _started_pid
+    pid = os.getpid()
+    if _started_pid == pid:
+        return
+    with _lock:
+        if _started_pid == pid:
+            return
+        _buckets.clear()
+        _active.clear()
+        threading.Thread(target=_sample_loop, args=(settings.SAMPLER_INTERVAL,), name='api-sampler', daemon=True).start()
+        _started_pid = pid
+
+
+def collapsed_stacks(since, until=None, label=None):
+    """
+    Counter of collapsed stacks sampled by every worker in [since, until].
+    """
+    until = until or time()
+    total = Counter()
+    for worker in read_worker_files('samples', max_age=settings.SAMPLER_RETENTION_SECONDS):
+        for bucket_start, stacks in worker.items():
+            start = int(bucket_start)
+            if start + settings.SAMPLER_BUCKET_SECONDS < since or start > until:
+                continue
+            for stack, count in stacks.items():
+                if label is None or stack.split(";", 1)[0] == label:
+                    total[stack] += count
+    return total
+
+
+def render_collapsed(stacks):
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class SamplingProfilerMiddleware:
+    """
+    Marks the current thread as serving a request so the sampler looks at it. Only installed
+    when SAMPLER_ENABLED is on.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        ensure_started()
+        thread_id = threading.get_ident()
+        # relabelled with the route name once the URL is resolved
+        _active[thread_id] = 'unresolved'
+        try:
+            return self.get_response(request)
+        finally:
+            _active.pop(thread_id, None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        _active[threading.get_ident()] = match.view_name or match.route
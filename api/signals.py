@@ -0,0 +1,71 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from api.metrics import count_connection
+from api.table_versions import bump_versions
+from api.delta_sync import write_tombstone
+from site_profiles.models import Site, SiteCost, SiteCash, SiteBill
+from users.models import CustomUser, Promotion
+from daily_records.models import DailyRecord, WorkSession, SiteWorkRecord, DailyRecordSnapshot
+
+
+@receiver(connection_created)
+def count_new_connection(sender, connection, **kwargs):
+    count_connection(connection.alias)
+
+
+# Table versions for the conditional GETs. bulk_create, queryset update() and raw deletes skip
+# these, so those call bump_versions() themselves.
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def bump_site_version(sender, instance, **kwargs):
+    bump_versions(sender, [instance.pk])
+
+
+@receiver(post_save, sender=SiteCost)
+@receiver(post_save, sender=SiteCash)
+@receiver(post_save, sender=SiteBill)
+@receiver(post_save, sender=DailyRecord)
+@receiver(post_save, sender=WorkSession)
+@receiver(post_save, sender=SiteWorkRecord)
+@receiver(post_save, sender=DailyRecordSnapshot)
+@receiver(post_delete, sender=SiteCost)
+@receiver(post_delete, sender=SiteCash)
+@receiver(post_delete, sender=SiteBill)
+@receiver(post_delete, sender=DailyRecord)
+@receiver(post_delete, sender=WorkSession)
+@receiver(post_delete, sender=SiteWorkRecord)
+@receiver(post_delete, sender=DailyRecordSnapshot)
+def bump_site_record_version(sender, instance, **kwargs):
+    bump_versions(sender, [instance.site_id])
+
+
+# users move between sites, so they are versioned as one table (site 0)
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=Promotion)
+def bump_user_version(sender, instance, **kwargs):
+    bump_versions(sender, [None])
+
+
+# Delta sync tombstones (api/delta_sync.py). The daily records CurrentWorkSession.post removes
+# skip the signals and get theirs there, in one bulk_create.
+@receiver(post_delete, sender=DailyRecord)
+@receiver(post_delete, sender=SiteCost)
+@receiver(post_delete, sender=SiteCash)
+def tombstone_site_record(sender, instance, **kwargs):
+    write_tombstone(instance, instance.site_id)
+
+
+@receiver(post_delete, sender=CustomUser)
+def tombstone_user(sender, instance, **kwargs):
+    write_tombstone(instance, instance.current_site_id)
+
+
+@receiver(post_save, sender=CustomUser)
+def tombstone_moved_user(sender, instance, created, **kwargs):
+    # gone from the old site's list; _previous_site_id comes from users.signals' pre_save
+    previous_site_id = getattr(instance, '_previous_site_id', None)
+    if not created and previous_site_id and previous_site_id != instance.current_site_id:
+        write_tombstone(instance, previous_site_id)
@@ -0,0 +1,119 @@
+"""
+Sparse fieldsets for the read endpoints.
+
+    GET /api/v1/daily-records/?fields=id,date,present
+    GET /api/v1/daily-records/?omit=comment,created_at,updated_at
+    GET /api/v1/users/12/worksessions/3/?fields=site_records.site,site_records.present
+
+SparseFieldsSerializerMixin drops the fields that were not asked for (dotted names select the fields
+of a nested serializer). SparseFieldsViewMixin narrows the SELECT of list / retrieve to the columns of
+the remaining fields with .only(), so a client that asks for three fields only pays for three columns.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import ListSerializer
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+SPARSE_METHODS = ('GET', 'HEAD')
+
+
+def _param_names(request, param):
+    names = [name.strip() for name in request.query_params.get(param, '').split(',') if name.strip()]
+    return names or None
+
+
+def _names_at(names, path):
+    # names of `path` itself: "site_records.present" -> "present" at path "site_records"
+    prefix = f"{path}." if path else ''
+    return [name[len(prefix):] for name in names if name.startswith(prefix)]
+
+
+def _sparse_request(context):
+    request = context.get('request')
+    if request is None or request.method not in SPARSE_METHODS:
+        return None
+    if request.query_params.get(FIELDS_PARAM) is None and request.query_params.get(OMIT_PARAM) is None:
+        return None
+    return request
+
+
+class SparseFieldsSerializerMixin:
+    """
+    ModelSerializer mixin for ?fields= / ?omit= on GET requests. Nested serializers use the dotted
+    names under their field name and keep all their fields when none are given for them.
+    """
+
+    def _field_path(self):
+        path, node = [], self
+        while node.parent is not None:
+            # the child of a many=True ListSerializer has no field name of its own
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return '.'.join(reversed(path))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = _sparse_request(self.context)
+        if request is None:
+            return fields
+
+        path = self._field_path()
+        keep = _param_names(request, FIELDS_PARAM)
+        keep = _names_at(keep, path) if keep is not None else None
+        omit = _names_at(_param_names(request, OMIT_PARAM) or [], path)
+        if path and not keep:
+            keep = None
+        if keep is not None:
+            keep = {name.split('.', 1)[0] for name in keep}
+        omit = {name for name in omit if '.' not in name}
+
+        unknown = ((keep or set()) | omit) - set(fields)
+        if unknown:
+            param = FIELDS_PARAM if keep and unknown & keep else OMIT_PARAM
+            raise ValidationError({param: [f"Unknown field(s): {', '.join(sorted(unknown))}."]})
+        return {
+            name: field for name, field in fields.items()
+            if (keep is None or name in keep) and name not in omit
+        }
+
+
+def _model_columns(serializer, model):
+    # concrete model fields behind the serializer fields; None when some field needs the whole row
+    concrete = {field.name for field in model._meta.concrete_fields}
+    many_to_many = {field.name for field in model._meta.many_to_many}
+    columns = set()
+    for field in serializer.fields.values():
+        if isinstance(field, ListSerializer) or field.source == '*':
+            return None
+        name = field.source_attrs[0]
+        if name in many_to_many:
+            # its own query, by primary key
+            continue
+        if name not in concrete:
+            return None
+        columns.add(name)
+    return columns
+
+
+class SparseFieldsViewMixin:
+    """
+    ViewSet mixin: list / retrieve load only the columns of the fields ?fields= / ?omit= left in the
+    serializer (the primary key always). Fields built from properties or methods keep the full row.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    # not get_queryset(): the viewsets override that; list() and get_object() both filter
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.sparse_actions:
+            return queryset
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, SparseFieldsSerializerMixin):
+            return queryset
+        if _sparse_request(self.get_serializer_context()) is None:
+            return queryset
+        columns = _model_columns(serializer_class(context=self.get_serializer_context()), queryset.model)
+        if columns is None:
+            return queryset
+        return queryset.only(queryset.model._meta.pk.name, *columns)
@@ -0,0 +1,54 @@
+"""
+Write counters per table and site, for the conditional GETs (api/conditional_get.py).
+
+Every write to a versioned model adds one to its TableVersion(table, site) row in the same
+transaction: post_save / post_delete do it per object (api/signals.py), the paths that skip the
+signals (bulk_create, queryset update()) call bump_versions() themselves. The counter commits with
+the rows it counts, so a read sees the version that belongs to the data it reads, on the replica too.
+"""
+from django.db import connections, router
+from api.models import TableVersion
+
+
+def _site_id(site):
+    # ids from URL kwargs / query params come in as strings; anything else means "whole table"
+    try:
+        return int(site)
+    except (TypeError, ValueError):
+        return None
+
+
+def table_label(model):
+    return model._meta.label_lower
+
+
+def bump_versions(model, sites):
+    """
+    Count a write to `model` for each of `sites` (site ids; None for rows without a site).
+    """
+    keys = sorted({(table_label(model), _site_id(site) or 0) for site in sites})
+    if not keys:
+        return
+    connection = connections[router.db_for_write(model)]
+    table = connection.ops.quote_name(TableVersion._meta.db_table)
+    # sorted keys, so concurrent writers lock the counter rows in the same order
+    rows = ', '.join(['(%s, %s, 1)'] * len(keys))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ("table", "site", "version") VALUES {rows} '
+            f'ON CONFLICT ("table", "site") DO UPDATE SET "version" = {table}."version" + 1',
+            [value for key in keys for value in key],
+        )
+
+
+def current_versions(dependencies):
+    """
+    [(model, site id or None)] -> the counter of each in one query. None sums the whole table: the
+    counters only ever grow, so the sum changes with every write to any site.
+    """
+    tables = {table_label(model) for model, _ in dependencies}
+    counters = {}
+    for table, site, version in TableVersion.objects.filter(table__in=tables).values_list('table', 'site', 'version'):
+        counters[table, site] = version
+        counters[table, None] = counters.get((table, None), 0) + version
+    return [counters.get((table_label(model), _site_id(site)), 0) for model, site in dependencies]
@@ -1,3 +1,563 @@
-from django.test import TestCase
+import cProfile
+import json
+import logging
+import sys
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import Http404, HttpResponse
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase, TestCase, RequestFactory, override_settings
+from django.utils.timezone import localdate
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+from users.models import CustomUser
+from users.serializers import CustomUserGetDetailSerializer, CustomUserIDsSerializer
+from daily_records.models import DailyRecord, DailyRecordSnapshot, WorkSession
+from daily_records.serializers import DailyRecordAccessSerializer, DailyRecordSnapshotSerializer, WorkSessionListSerializer
+from site_profiles.models import Site, SiteCost, SiteCash
+from site_profiles.serializers import SiteCostSerializer, SiteCashSerializer, SiteSerializerDetails
+from api.models import Tombstone
+from api.parsers import ORJSONParser, MessagePackParser
+from api.renderers import ORJSONRenderer, MessagePackRenderer
+from api.sparse_fields import _model_columns
+from api.table_versions import table_label
+from api.values_reader import ValuesReader
+from api.middleware import ServerTimingMiddleware
+from api.nplusone import NPlusOneError, detect_nplusone, fingerprint
+from api.db_router import PrimaryReplicaRouter, ReplicaRoutingMiddleware, replica_configured, replica_reads
+from api import metrics, profiling, sampler
+from api.worker_files import write_worker_file
+from api.views import metrics_view
+from api.query_plans import HOT_PATHS, HotPathContext, capture_hot_path, explain, format_plan, large_tables, sequential_scans
 
-# Create your tests here.
+LARGE_TABLE_ROWS = 10000
+
+
+@skipUnless(connection.vendor == 'postgresql', "query plans are only checked on PostgreSQL")
+class HotPathPlanTests(TestCase):
+    """
+    Fails when a queryset change makes one of the hot paths read a large table with a sequential scan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # ~10% of the rows per site, enough for the planner to prefer the indexes when they apply
+        call_command('seed_benchmark_data', sites=10, employees=20, days=120, stdout=StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        cls.big_tables = large_tables(LARGE_TABLE_ROWS)
+        # a day inside the closed sessions, so the snapshot queries have rows to find
+        cls.ctx = HotPathContext.from_database(localdate() - timedelta(days=45))
+
+    def test_large_tables_seeded(self):
+        self.assertIn('daily_records_dailyrecordsnapshot', self.big_tables)
+
+    def test_no_sequential_scans_on_large_tables(self):
+        for name in HOT_PATHS:
+            with self.subTest(path=name):
+                statements = capture_hot_path(name, self.ctx)
+                self.assertTrue(statements, f"{name} ran no queries")
+                for sql, params in statements:
+                    plan = explain(sql, params)
+                    scans = sequential_scans(plan, self.big_tables)
+                    self.assertFalse(scans, "\n".join([f"Seq Scan on {', '.join(scans)}", sql, *format_plan(plan)]))
+
+
+@skipUnless(replica_configured(), "set DB_REPLICA_HOST to test replica routing")
+class ReplicaRoutingTests(SimpleTestCase):
+    # not TestCase: its per-test transaction keeps every read on the primary
+    databases = {'default'}
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        # tokens only need the pk
+        self.writer = CustomUser(pk=1, username='writer')
+        self.reader = CustomUser(pk=2, username='reader')
+
+    def _read_alias(self, method, user):
+        # database the router picks for a read made while the request is served
+        aliases = []
+
+        def view(request):
+            aliases.append(PrimaryReplicaRouter().db_for_read(CustomUser))
+            return HttpResponse()
+
+        request = getattr(self.factory, method)('/', HTTP_AUTHORIZATION=f'JWT {AccessToken.for_user(user)}')
+        ReplicaRoutingMiddleware(view)(request)
+        return aliases[0]
+
+    def test_safe_request_reads_replica(self):
+        self.assertEqual(self._read_alias('get', self.reader), 'replica')
+
+    def test_unsafe_request_reads_primary(self):
+        self.assertEqual(self._read_alias('post', self.writer), 'default')
+
+    def test_reads_after_write_stay_on_primary_for_that_user(self):
+        self._read_alias('post', self.writer)
+        self.assertEqual(self._read_alias('get', self.writer), 'default')
+        self.assertEqual(self._read_alias('get', self.reader), 'replica')
+
+    def test_replica_reads_outside_request(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(CustomUser), 'default')
+        with replica_reads():
+            self.assertEqual(router.db_for_read(CustomUser), 'replica')
+
+    def test_atomic_block_reads_primary(self):
+        with replica_reads(), transaction.atomic():
+            self.assertEqual(PrimaryReplicaRouter().db_for_read(CustomUser), 'default')
+
+
+class ORJSONCodecTests(SimpleTestCase):
+    data = {
+        "date": date(2025, 7, 1),
+        "created_at": datetime(2025, 7, 1, 9, 30, 15, 123456, tzinfo=timezone.utc),
+        "time": time(8, 0),
+        "amount": Decimal("1250.50"),
+        "duration": timedelta(hours=8),
+        "comment": "অর্ধেক দিন কাজ",
+        "detail": gettext_lazy("Not found."),
+        "present": 0.5,
+        "rows": [{"id": 1, "khoraki": None}],
+        "separator": "a\u2028b",
+    }
+
+    def test_renders_like_drf(self):
+        self.assertEqual(ORJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_indent(self):
+        indented = b'{\n  "id": 1\n}'
+        self.assertEqual(ORJSONRenderer().render({"id": 1}, 'application/json; indent=4'), indented)
+        self.assertEqual(ORJSONRenderer().render({"id": 1}, 'application/json', {'indent': 4}), indented)
+        self.assertEqual(ORJSONRenderer().render({"id": 1}, 'application/json; indent=0', {'indent': 4}), b'{"id":1}')
+        self.assertEqual(ORJSONRenderer().render({"id": 1}, 'application/json; indent=x'), b'{"id":1}')
+
+    def test_parse_roundtrip(self):
+        body = JSONRenderer().render(self.data)
+        self.assertEqual(ORJSONParser().parse(BytesIO(body))["comment"], "অর্ধেক দিন কাজ")
+
+    def test_parse_error(self):
+        for body in [b'{"id": 1', b'{"present": NaN}']:
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                ORJSONParser().parse(BytesIO(body))
+
+
+class MessagePackCodecTests(SimpleTestCase):
+    rows = [
+        {"id": 1, "date": date(2025, 7, 1), "present": 1.0, "comment": "অর্ধেক দিন কাজ"},
+        {"id": 2, "date": date(2025, 7, 1), "present": 0.5, "comment": None},
+    ]
+    columnar = 'application/msgpack; layout=columnar'
+
+    def _roundtrip(self, data, media_type='application/msgpack'):
+        body = MessagePackRenderer().render(data, media_type)
+        return MessagePackParser().parse(BytesIO(body), media_type)
+
+    def test_values_match_json(self):
+        expected = ORJSONParser().parse(BytesIO(ORJSONRenderer().render(self.rows)))
+        self.assertEqual(self._roundtrip(self.rows), expected)
+        self.assertEqual(self._roundtrip(self.rows, self.columnar), expected)
+
+    def test_columnar_layout(self):
+        body = MessagePackRenderer().render(self.rows, self.columnar)
+        data = MessagePackParser().parse(BytesIO(body), 'application/msgpack')
+        self.assertEqual(data["fields"], ["id", "date", "present", "comment"])
+        self.assertEqual(data["rows"][1], [2, "2025-07-01", 0.5, None])
+
+    def test_columnar_keeps_pagination_envelope(self):
+        page = {"count": 2, "next": None, "previous": None, "results": self.rows}
+        body = MessagePackRenderer().render(page, self.columnar)
+        data = MessagePackParser().parse(BytesIO(body), 'application/msgpack')
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["results"]["fields"], ["id", "date", "present", "comment"])
+
+    def test_mixed_rows_stay_rows(self):
+        rows = [{"id": 1}, {"id": 2, "extra": True}]
+        body = MessagePackRenderer().render(rows, self.columnar)
+        self.assertEqual(MessagePackParser().parse(BytesIO(body), 'application/msgpack'), rows)
+
+    def test_parse_error(self):
+        bodies = [b'\x92\x01', MessagePackRenderer().render({"fields": ["id"], "rows": [[1, 2]]})]
+        for body in bodies:
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                MessagePackParser().parse(BytesIO(body), self.columnar)
+
+
+class SparseFieldsTests(SimpleTestCase):
+    record = DailyRecord(id=1, employee_id=2, site_id=3, date=date(2025, 7, 1), present=1.0, khoraki=50, advance=0)
+
+    def _serializer(self, query, method='get', serializer_class=DailyRecordAccessSerializer, instance=record):
+        request = Request(getattr(APIRequestFactory(), method)(f'/{query}'))
+        return serializer_class(instance, context={'request': request})
+
+    def test_fields(self):
+        self.assertEqual(self._serializer('?fields=id,present').data, {"id": 1, "present": 1.0})
+
+    def test_omit(self):
+        data = self._serializer('?omit=comment,created_at,updated_at').data
+        self.assertEqual(set(data), {"id", "date", "present", "khoraki", "advance", "permission_level", "employee", "site"})
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValidationError):
+            self._serializer('?fields=id,salary').data
+
+    def test_only_on_safe_methods(self):
+        self.assertIn("comment", self._serializer('?fields=id', method='post').data)
+
+    def test_columns(self):
+        serializer = self._serializer('?fields=id,employee,date')
+        self.assertEqual(_model_columns(serializer, DailyRecord), {"id", "employee", "date"})
+
+    def test_user_detail_has_no_password(self):
+        user = CustomUser(id=1, username='worker', password='pbkdf2_sha256$hash')
+        self.assertNotIn("password", self._serializer('', serializer_class=CustomUserGetDetailSerializer, instance=user).fields)
+
+
+class ValuesReaderTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_benchmark_data', sites=1, employees=3, days=40, stdout=StringIO())
+
+    def test_same_output_as_serializers(self):
+        cases = [
+            (DailyRecordAccessSerializer, DailyRecord),
+            (DailyRecordSnapshotSerializer, DailyRecordSnapshot),
+            (WorkSessionListSerializer, WorkSession),
+            (SiteCostSerializer, SiteCost),
+            (SiteCashSerializer, SiteCash),
+        ]
+        for serializer_class, model in cases:
+            with self.subTest(serializer=serializer_class.__name__):
+                queryset = model.objects.order_by('pk')
+                self.assertTrue(queryset.exists())
+                reader = ValuesReader(serializer_class())
+                self.assertEqual(reader.read(reader.values(queryset)), serializer_class(queryset, many=True).data)
+
+
+class BatchLoadingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_benchmark_data', sites=3, employees=4, days=40, stdout=StringIO())
+
+    def test_last_session_end_dates_in_one_query(self):
+        users = list(CustomUser.objects.order_by('pk'))
+        expected = [user.last_session_end_date for user in users]
+        self.assertTrue(any(expected))
+        with self.assertNumQueries(1):
+            data = CustomUserIDsSerializer(users, many=True).data
+        self.assertEqual([row['last_session_end_date'] for row in data], expected)
+
+    def test_site_managers_in_one_query(self):
+        sites = list(Site.objects.order_by('pk'))
+        managers = [site.employees.filter(user_type='site_manager').first() for site in sites]
+        expected = [manager and {"id": manager.id, "first_name": manager.first_name, "last_name": manager.last_name} for manager in managers]
+        with self.assertNumQueries(1):
+            data = SiteSerializerDetails(sites, many=True).data
+        self.assertEqual([row['site_manager'] for row in data], expected)
+
+    def test_single_object(self):
+        site = Site.objects.order_by('pk').first()
+        self.assertEqual(SiteSerializerDetails(site).data['site_manager']['id'], site.employees.filter(user_type='site_manager').first().id)
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_benchmark_data', sites=2, employees=2, days=10, stdout=StringIO())
+        cls.viewer = CustomUser.objects.create(username='viewer', user_type='viewer')
+        cls.site, cls.other_site = Site.objects.order_by('pk')
+
+    def setUp(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'JWT {AccessToken.for_user(self.viewer)}'
+
+    def _etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_not_modified_without_the_main_query(self):
+        url = f'/api/v1/total-site-summary/{self.site.pk}/'
+        etag = self._etag(url)
+        # the user and the table versions
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_writes_change_the_etag_of_their_site(self):
+        urls = [f'/api/v1/sites/{site.pk}/cost-records/' for site in (self.site, self.other_site)] + ['/api/v1/sites/']
+        before = [self._etag(url) for url in urls]
+        SiteCost.objects.create(site=self.site, title='cement', amount=100)
+        after = [self._etag(url) for url in urls]
+        self.assertNotEqual(after[0], before[0])
+        self.assertEqual(after[1:], before[1:])
+
+    def test_queryset_delete_changes_the_etag(self):
+        url = f'/api/v1/daily-records/?site={self.site.pk}'
+        etag = self._etag(url)
+        DailyRecord.objects.filter(site=self.site).delete()
+        self.assertNotEqual(self._etag(url), etag)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0, SYNC_PAGE_SIZE=50)
+class DeltaSyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_benchmark_data', sites=2, employees=3, days=10, stdout=StringIO())
+        cls.site, cls.other_site = Site.objects.order_by('pk')
+        cls.manager = CustomUser.objects.get(user_type='site_manager', current_site=cls.site)
+        cls.viewer = CustomUser.objects.get(user_type='viewer')
+
+    def _sync(self, user, cursors=None):
+        # every page; returns ({model: changed ids}, {model: deleted ids}, cursors)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'JWT {AccessToken.for_user(user)}'
+        cursors, changed, deleted = dict(cursors or {}), {}, {}
+        while True:
+            response = self.client.get('/api/v1/sync/', cursors)
+            self.assertEqual(response.status_code, 200)
+            for name, part in response.json().items():
+                changed.setdefault(name, []).extend(row['id'] for row in part['changed'])
+                deleted.setdefault(name, []).extend(part['deleted'])
+                cursors[name] = part['cursor']
+            if not any(part['more'] for part in response.json().values()):
+                return changed, deleted, cursors
+
+    def test_full_then_changes_only(self):
+        changed, deleted, cursors = self._sync(self.manager)
+        self.assertEqual(sorted(changed['costs']), list(SiteCost.objects.filter(site=self.site).order_by('pk').values_list('pk', flat=True)))
+        self.assertEqual(sorted(changed['daily_records']), list(DailyRecord.objects.filter(site=self.site).order_by('pk').values_list('pk', flat=True)))
+        self.assertEqual(sorted(changed['users']), list(CustomUser.objects.filter(current_site=self.site).order_by('pk').values_list('pk', flat=True)))
+
+        self.assertEqual(self._sync(self.manager, cursors)[:2], ({name: [] for name in cursors}, {name: [] for name in cursors}))
+
+        cost = SiteCost.objects.create(site=self.site, title='cement', amount=100)
+        SiteCost.objects.create(site=self.other_site, title='sand', amount=50)
+        employee = DailyRecord.objects.filter(site=self.site).values_list('employee', flat=True).first()
+        removed = sorted(DailyRecord.objects.filter(employee=employee).values_list('pk', flat=True))
+        DailyRecord.objects.filter(employee=employee).delete()
+        changed, deleted, _ = self._sync(self.manager, cursors)
+        self.assertEqual(changed['costs'], [cost.pk])
+        self.assertEqual(sorted(deleted['daily_records']), removed)
+
+    def test_moved_user_leaves_the_old_site_only(self):
+        _, _, manager_cursors = self._sync(self.manager)
+        _, _, viewer_cursors = self._sync(self.viewer, {'users': ''})
+        employee = CustomUser.objects.filter(user_type='employee', current_site=self.site).first()
+        employee.current_site = self.other_site
+        employee.save()
+
+        changed, deleted, _ = self._sync(self.manager, manager_cursors)
+        self.assertEqual((changed['users'], deleted['users']), ([], [employee.pk]))
+        changed, deleted, _ = self._sync(self.viewer, viewer_cursors)
+        self.assertEqual((changed['users'], deleted['users']), ([employee.pk], []))
+
+    @override_settings(SYNC_PAGE_SIZE=2, SYNC_SETTLE_SECONDS=60)
+    def test_full_page_stops_at_the_settle_window(self):
+        an_hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+        SiteCost.objects.update(updated_at=an_hour_ago)
+        Tombstone.objects.update(deleted_at=an_hour_ago)
+        _, _, cursors = self._sync(self.manager, {'costs': ''})
+
+        costs = [SiteCost.objects.create(site=self.site, title=f'cost {n}', amount=n) for n in range(3)]
+        changed, _, next_cursors = self._sync(self.manager, cursors)
+        self.assertEqual(changed['costs'], [cost.pk for cost in costs[:2]])
+        # committed late, with an updated_at before the last row sent
+        late = SiteCost.objects.create(site=self.site, title='late', amount=1)
+        SiteCost.objects.filter(pk=late.pk).update(updated_at=costs[1].updated_at - timedelta(seconds=1))
+        changed, _, _ = self._sync(self.manager, next_cursors)
+        self.assertIn(late.pk, changed['costs'])
+        # the rest of the window once it has settled
+        with override_settings(SYNC_SETTLE_SECONDS=0):
+            changed, _, _ = self._sync(self.manager, next_cursors)
+        self.assertEqual(set(changed['costs']), {cost.pk for cost in costs} | {late.pk})
+
+        ids, late_id = [cost.pk for cost in costs], late.pk
+        for cost in costs:
+            cost.delete()
+        _, deleted, next_cursors = self._sync(self.manager, cursors)
+        self.assertEqual(deleted['costs'], ids[:2])
+        late_tombstone = Tombstone.objects.create(table=table_label(SiteCost), object_id=late_id, site=self.site.pk)
+        Tombstone.objects.filter(pk=late_tombstone.pk).update(deleted_at=datetime.now(timezone.utc) - timedelta(seconds=30))
+        late.delete()
+        _, deleted, _ = self._sync(self.manager, next_cursors)
+        self.assertIn(late_id, deleted['costs'])
+        with override_settings(SYNC_SETTLE_SECONDS=0):
+            _, deleted, _ = self._sync(self.manager, next_cursors)
+        self.assertEqual(set(deleted['costs']), {*ids, late_id})
+
+    def test_bad_cursor(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'JWT {AccessToken.for_user(self.manager)}'
+        self.assertEqual(self.client.get('/api/v1/sync/', {'users': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/sync/', {'site': self.other_site.pk}).status_code, 403)
+
+
+class NPlusOneTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [CustomUser.objects.create(username=f'worker{n}') for n in range(4)]
+
+    def _lookups(self):
+        for user in self.users:
+            CustomUser.objects.filter(pk=user.pk, username=user.username).exists()
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT \"t1\".\"id\" FROM \"t1\" WHERE (\"t1\".\"id\" = 12 AND \"t1\".\"name\" = 'it''s' AND \"t1\".\"rate\" > 1.5)"),
+            "SELECT \"t1\".\"id\" FROM \"t1\" WHERE (\"t1\".\"id\" = ? AND \"t1\".\"name\" = ? AND \"t1\".\"rate\" > ?)",
+        )
+        self.assertEqual(fingerprint('SELECT 1 FROM t WHERE id IN (%s, %s, %s)'), fingerprint('SELECT 1 FROM t WHERE id IN (%s)'))
+
+    def test_raise_reports_the_repeated_query(self):
+        with self.assertRaises(NPlusOneError) as raised, detect_nplusone(mode='raise', threshold=3, label='lookups'):
+            self._lookups()
+        message = str(raised.exception)
+        self.assertIn("N+1 query in lookups: executed 4 times", message)
+        self.assertIn("in _lookups", message)
+
+    def test_under_the_threshold_and_log_mode(self):
+        with detect_nplusone(mode='raise', threshold=4) as repeats:
+            self._lookups()
+        self.assertEqual(repeats.problems(), [])
+        with self.assertLogs('api.nplusone', 'WARNING'), detect_nplusone(mode='log', threshold=3):
+            self._lookups()
+
+
+class ServerTimingTests(SimpleTestCase):
+
+    def _request(self):
+        return ServerTimingMiddleware(lambda request: HttpResponse('ok'))(RequestFactory().get('/'))
+
+    def test_header_and_opt_in_log_line(self):
+        self.assertIn('total;dur=', self._request()['Server-Timing'])
+        self.assertFalse(logging.getLogger('api.performance').isEnabledFor(logging.INFO))
+        # PERFORMANCE_LOG_LEVEL=INFO
+        with self.assertLogs('api.performance', 'INFO') as logs:
+            self._request()
+        self.assertEqual(json.loads(logs.records[0].getMessage())["status"], 200)
+
+
+class SamplerTests(SimpleTestCase):
+
+    def test_collapse(self):
+        def inner():
+            return sampler.collapse(sys._getframe(), 'api/v1/sites/', sampler._roots())
+
+        names = inner().split(';')
+        self.assertEqual(names[0], 'api/v1/sites/')
+        self.assertEqual(names[-2:], ['api/tests.py:SamplerTests.test_collapse', 'api/tests.py:SamplerTests.test_collapse.<locals>.inner'])
+        with mock.patch.object(sampler, 'MAX_DEPTH', 2):
+            self.assertEqual(len(inner().split(';')), 3)
+
+    def test_collapsed_stacks_merges_workers(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        bucket = settings.SAMPLER_BUCKET_SECONDS
+        now = int(datetime.now().timestamp() // bucket) * bucket
+        with override_settings(WORKER_FILES_DIR=directory.name):
+            write_worker_file('samples', {str(now): {"sites;a.py:view": 2, "users;b.py:view": 1}, str(now - 10 * bucket): {"sites;a.py:view": 5}})
+            (Path(directory.name) / 'samples-1.json').write_text(json.dumps({str(now): {"sites;a.py:view": 3}}))
+            self.assertEqual(sampler.collapsed_stacks(since=now - bucket), {"sites;a.py:view": 5, "users;b.py:view": 1})
+            self.assertEqual(sampler.collapsed_stacks(since=0, label='sites'), {"sites;a.py:view": 10})
+            self.assertEqual(sampler.render_collapsed(sampler.collapsed_stacks(since=0, label='users')), "users;b.py:view 1\n")
+
+
+class MetricsTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        worker_files = override_settings(WORKER_FILES_DIR=directory.name)
+        worker_files.enable()
+        self.addCleanup(worker_files.disable)
+
+    def test_flush_writes_a_copy(self):
+        written = []
+        with mock.patch.object(metrics, 'write_worker_file', lambda kind, data: written.append(data)):
+            metrics.observe('api/v1/sites/', 'GET', 12.0, 3)
+            metrics.flush()
+            routes = written[-1]["routes"]
+            # other tests' requests can sit in slots of their own
+            count = sum(entries['api/v1/sites/ GET']["count"] for entries in routes.values() if 'api/v1/sites/ GET' in entries)
+            metrics.observe('api/v1/sites/', 'GET', 12.0, 3)
+        self.assertEqual(sum(entries['api/v1/sites/ GET']["count"] for entries in routes.values() if 'api/v1/sites/ GET' in entries), count)
+
+    def test_db_stats_are_gauges(self):
+        body = metrics.render_prometheus({}, {"default": {"connections_created": 3}})
+        self.assertIn("# TYPE api_db_connections_created gauge", body)
+
+    @override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'], METRICS_TOKEN='scrape-me')
+    def test_token(self):
+        factory = RequestFactory()
+        self.assertEqual(metrics_view(factory.get('/', HTTP_AUTHORIZATION='Bearer scrape-me')).status_code, 200)
+        for request in [factory.get('/'), factory.get('/', HTTP_AUTHORIZATION='Bearer wrong'), factory.get('/', REMOTE_ADDR='10.0.0.9', HTTP_AUTHORIZATION='Bearer scrape-me')]:
+            with self.subTest(headers=request.META.get('HTTP_AUTHORIZATION')), self.assertRaises(Http404):
+                metrics_view(request)
+
+
+class RequestProfileTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        profile_settings = override_settings(PROFILE_DIR=directory.name, PROFILE_MAX_REPORTS=2)
+        profile_settings.enable()
+        self.addCleanup(profile_settings.disable)
+        self.directory = directory.name
+        self.middleware = profiling.RequestProfileMiddleware(lambda request: HttpResponse('ok'))
+
+    def _profiled(self, **headers):
+        request = RequestFactory().get('/', HTTP_X_PROFILE='1', **headers)
+        request.user = CustomUser(username='admin', is_staff=True)
+        return self.middleware(request)
+
+    def test_reports_get_unique_ids(self):
+        ids = [self._profiled(HTTP_X_REQUEST_ID='abc')['X-Profile-Id'] for _ in range(2)]
+        self.assertTrue(all(profile_id.startswith('abc-') for profile_id in ids))
+        self.assertNotEqual(ids[0], ids[1])
+        self.assertTrue(profiling.profile_path(ids[1], '.txt').exists())
+
+    def test_old_reports_are_pruned(self):
+        for _ in range(3):
+            self._profiled()
+        self.assertEqual(len(list(Path(self.directory).glob('*.prof'))), 2)
+        self.assertEqual(len(list(Path(self.directory).glob('*.txt'))), 2)
+
+    def test_busy_profiler_serves_unprofiled(self):
+        with profiling._profiler_lock:
+            response = self._profiled()
+        self.assertEqual(response.content, b'ok')
+        self.assertNotIn('X-Profile-Id', response)
+
+        other = cProfile.Profile()
+        other.enable()
+        try:
+            response = self._profiled()
+        finally:
+            other.disable()
+        self.assertEqual(response.content, b'ok')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertIn('X-Profile-Id', self._profiled())
+
+    def test_only_staff(self):
+        request = RequestFactory().get('/', HTTP_X_PROFILE='1')
+        request.user = AnonymousUser()
+        self.assertNotIn('X-Profile-Id', self.middleware(request))
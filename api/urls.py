@@ -1,10 +1,11 @@
+from django.conf import settings
 from django.urls import path, include
-from debug_toolbar.toolbar import debug_toolbar_urls
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested.routers import NestedDefaultRouter
 from users.views import CustomUserViewSet, PromotionViewSet, ChangePasswordView, ResetPasswordView, ResetPasswordConfirmView
-from site_profiles.views import SiteViewSet, SiteCostViewSet, SiteCashViewSet, SiteBillViewSet, DateBasedSiteSummaryView, TotalSiteSummaryView
+from site_profiles.views import SiteViewSet, SiteCostViewSet, SiteCashViewSet, SiteBillViewSet, DateBasedSiteSummaryView, TotalSiteSummaryView, SiteLedgerRollupView
 from daily_records.views import DailyRecordViewSet, WorkSessionViewSet, CurrentWorkSession, DailyRecordSnapshotViewset
+from api.views import metrics_view, RequestProfileView, SampledStacksView, DeltaSyncView
 
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -34,10 +35,16 @@ urlpatterns = [
     path('', include(site_router.urls)),
     path('current-worksession/<int:emp_id>/', CurrentWorkSession.as_view(), name='current-work-session'),
 
-    path('site-summary/<int:site_id>/<str:date>/', DateBasedSiteSummaryView.as_view()),
-    path('total-site-summary/<int:site_id>/', TotalSiteSummaryView.as_view()),
+    path('site-summary/<int:site_id>/<str:date>/', DateBasedSiteSummaryView.as_view(), name='site-summary'),
+    path('total-site-summary/<int:site_id>/', TotalSiteSummaryView.as_view(), name='total-site-summary'),
+    path('site-rollup/<int:site_id>/', SiteLedgerRollupView.as_view(), name='site-rollup'),
+    path('sync/', DeltaSyncView.as_view(), name='delta-sync'),
 
 
+    path('metrics/', metrics_view, name='metrics'),
+    path('profiles/<str:profile_id>/', RequestProfileView.as_view(), name='request-profile'),
+    path('sampled-stacks/', SampledStacksView.as_view(), name='sampled-stacks'),
+
     path('token/create/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
@@ -46,4 +53,9 @@ urlpatterns = [
     path('reset-password/', ResetPasswordView.as_view(), name='reset_password'),
     path('reset-password-confirm/<uidb64>/<token>/', ResetPasswordConfirmView.as_view(), name='reset-password-confirm'
     ),
-] + debug_toolbar_urls()
\ No newline at end of file
+]
+
+# debug_toolbar is only installed with DEBUG on (see settings)
+if settings.DEBUG:
+    from debug_toolbar.toolbar import debug_toolbar_urls
+    urlpatterns += debug_toolbar_urls()
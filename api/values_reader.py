@@ -0,0 +1,179 @@
+"""
+Read-only list path that skips ModelSerializer.to_representation.
+
+ValuesReader looks at a serializer's fields once and turns each into a column of a values_list()
+query plus a converter: nothing for the fields whose DRF to_representation would return the database
+value unchanged (ints, floats, strings, booleans, primary keys), the ISO formatting of DRF's
+DateField / DateTimeField with the format and time zone looked up once, the bound DRF
+to_representation for decimals, and a memo of it for choices (a handful of distinct values).
+SerializerMethodFields are called with a lightweight row object that carries the model's properties,
+so WorkSession's payables come out of the same code as on the model. The output is the serializer's
+output, field for field.
+
+Serializers with anything else (nested serializers, source='*', related lookups, files) are not
+supported; ValuesListMixin then falls back to the serializer.
+"""
+from datetime import date
+from django.conf import settings
+from django.db import models
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+# DRF fields whose to_representation of the value the database driver returns is that same value
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField, serializers.FloatField, serializers.CharField,
+    serializers.BooleanField, serializers.PrimaryKeyRelatedField,
+)
+CONVERTED_FIELDS = (serializers.DecimalField,)
+
+
+class UnsupportedSerializer(Exception):
+    pass
+
+
+def _memoized(to_representation):
+    # ChoiceField maps str(value) back to the choice key, e.g. "1.0" stays 1.0 but "1" becomes 1
+    cache = {}
+
+    def convert(value):
+        try:
+            return cache[value]
+        except KeyError:
+            cache[value] = result = to_representation(value)
+            return result
+    return convert
+
+
+def _date_converter(field):
+    if getattr(field, 'format', api_settings.DATE_FORMAT).lower() != ISO_8601:
+        return field.to_representation
+    return date.isoformat
+
+
+def _datetime_converter(field):
+    # DateTimeField.to_representation of the aware datetimes the database returns with USE_TZ
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None or getattr(field, 'format', api_settings.DATETIME_FORMAT).lower() != ISO_8601:
+        return field.to_representation
+
+    def convert(value):
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _row_class(model):
+    # the model's own properties (earned_salary, ...) on a plain class, without Model.__init__
+    properties = {}
+    for klass in reversed(model.__mro__):
+        if issubclass(klass, models.Model) and klass is not models.Model:
+            properties.update({name: value for name, value in vars(klass).items() if isinstance(value, property)})
+    return type(f'{model.__name__}Row', (), properties)
+
+
+class ValuesReader:
+
+    def __init__(self, serializer):
+        model = serializer.Meta.model
+        model_fields = {field.name: field for field in model._meta.concrete_fields}
+        columns = {}
+        # (key, column name or None, converter or None, method or None)
+        plan = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                plan.append((name, None, None, getattr(serializer, field.method_name)))
+                continue
+            model_field = model_fields.get(field.source) if len(field.source_attrs) == 1 else None
+            if model_field is None:
+                raise UnsupportedSerializer(f"{type(serializer).__name__}.{name}")
+            if type(field) in PASSTHROUGH_FIELDS and getattr(field, 'pk_field', None) is None:
+                converter = None
+            elif type(field) is serializers.DateField:
+                converter = _date_converter(field)
+            elif type(field) is serializers.DateTimeField:
+                converter = _datetime_converter(field)
+            elif type(field) in CONVERTED_FIELDS:
+                converter = field.to_representation
+            elif type(field) is serializers.ChoiceField:
+                converter = _memoized(field.to_representation)
+            else:
+                raise UnsupportedSerializer(f"{type(serializer).__name__}.{name}")
+            columns[model_field.attname] = None
+            plan.append((name, model_field.attname, converter, None))
+
+        self.row_class = None
+        if any(method for *_, method in plan):
+            # the methods may read any column
+            self.row_class = _row_class(model)
+            columns.update((field.attname, None) for field in model._meta.concrete_fields)
+        self.columns = list(columns)
+        index = {column: i for i, column in enumerate(self.columns)}
+        self.plan = [(name, index.get(column), converter, method) for name, column, converter, method in plan]
+        self.keys = [name for name, *_ in self.plan]
+        # every field a plain column in the right order: dict(zip()) is all there is to do
+        self.passthrough = (
+            self.row_class is None
+            and all(converter is None for _, _, converter, _ in self.plan)
+            and [i for _, i, _, _ in self.plan] == list(range(len(self.columns)))
+        )
+
+    def values(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def read(self, rows):
+        """
+        Representations of values() tuples (of self.values(queryset)).
+        """
+        keys = self.keys
+        if self.passthrough:
+            return [dict(zip(keys, row)) for row in rows]
+
+        plan, row_class, columns = self.plan, self.row_class, self.columns
+        data = []
+        for row in rows:
+            if row_class is not None:
+                obj = row_class()
+                obj.__dict__.update(zip(columns, row))
+            item = {}
+            for name, index, converter, method in plan:
+                if method is not None:
+                    item[name] = method(obj)
+                    continue
+                value = row[index]
+                item[name] = value if converter is None or value is None else converter(value)
+            data.append(item)
+        return data
+
+
+class ValuesListMixin:
+    """
+    ViewSet mixin: list() reads values() rows through a ValuesReader of the view's serializer
+    instead of serializing model instances. Falls back to the serializer when it is not supported
+    or VALUES_READER_ENABLED is off.
+    """
+
+    def values_reader(self):
+        if not settings.VALUES_READER_ENABLED:
+            return None
+        try:
+            return ValuesReader(self.get_serializer())
+        except UnsupportedSerializer:
+            return None
+
+    def represent_rows(self, reader, rows):
+        # rows: reader.values() rows with a reader, model instances without one
+        if reader is None:
+            return self.get_serializer(rows, many=True).data
+        return reader.read(rows)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        reader = self.values_reader()
+        rows = queryset if reader is None else reader.values(queryset)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.represent_rows(reader, page))
+        return Response(self.represent_rows(reader, rows))
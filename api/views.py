@@ -1,3 +1,82 @@
-from django.shortcuts import render
+from time import time
+from django.conf import settings
+from django.http import Http404, HttpResponse, FileResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from api.delta_sync import SYNC_MODELS, CursorExpired, InvalidCursor, sync_model
+from api.metrics import read_merged, render_prometheus
+from api.profiling import PROFILE_ID, profile_path
+from api.sampler import collapsed_stacks, render_collapsed
 
-# Create your views here.
+
+def metrics_view(request):
+    # plain django view: no JWT, only reachable from the scraper's addresses. Behind a reverse
+    # proxy on the same host every request comes from 127.0.0.1, so set METRICS_TOKEN there too:
+    # the scraper then sends "Authorization: Bearer <token>".
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    if settings.METRICS_TOKEN and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'):
+        raise Http404
+    return HttpResponse(render_prometheus(*read_merged()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class RequestProfileView(APIView):
+    """
+    Top-N report of a profiled request; ?download=prof returns the pstats dump for snakeviz etc.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, profile_id):
+        if not PROFILE_ID.match(profile_id):
+            raise Http404
+        if request.query_params.get('download') == 'prof':
+            path = profile_path(profile_id, '.prof')
+            if not path.exists():
+                raise Http404
+            return FileResponse(path.open('rb'), as_attachment=True, filename=path.name)
+        path = profile_path(profile_id, '.txt')
+        if not path.exists():
+            raise Http404
+        return HttpResponse(path.read_text(), content_type='text/plain; charset=utf-8')
+
+
+class SampledStacksView(APIView):
+    """
+    Collapsed stacks of the last ?minutes= (default 15) from every worker, optionally only one
+    ?route=. Feed it to flamegraph.pl or open it in speedscope.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            minutes = float(request.query_params.get('minutes', 15))
+        except ValueError:
+            minutes = 15
+        stacks = collapsed_stacks(time() - minutes * 60, label=request.query_params.get('route'))
+        return HttpResponse(render_collapsed(stacks), content_type='text/plain; charset=utf-8')
+
+
+class DeltaSyncView(APIView):
+    """
+    Rows changed and deleted since the client's per-model cursors, see api/delta_sync.py.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        names = [name for name in SYNC_MODELS if name in request.query_params] or list(SYNC_MODELS)
+        site = request.query_params.get('site')
+        if site is not None:
+            try:
+                site = int(site)
+            except ValueError:
+                return Response({"error": "site must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return Response({name: sync_model(name, request, request.query_params.get(name), site) for name in names})
+        except InvalidCursor:
+            return Response({"error": "invalid_cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        except CursorExpired:
+            # tombstones that old are pruned: download everything again
+            return Response({"error": "cursor_expired"}, status=status.HTTP_410_GONE)
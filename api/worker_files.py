@@ -0,0 +1,45 @@
+"""
+Small JSON state files, one per worker process, so every gunicorn worker can publish what it
+collected and whichever worker serves the read merges them.
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+from time import time
+from django.conf import settings
+
+
+def _directory():
+    path = Path(settings.WORKER_FILES_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def write_worker_file(kind, data):
+    # write + rename so readers never see a half written file
+    directory = _directory()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{kind}-", suffix=".tmp")
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, directory / f"{kind}-{os.getpid()}.json")
+
+
+def read_worker_files(kind, max_age=None):
+    """
+    Data of every worker's `kind` file. Files older than max_age seconds belong to workers
+    that are gone (restarted, max_requests) and are removed.
+    """
+    now = time()
+    results = []
+    for path in _directory().glob(f"{kind}-*.json"):
+        try:
+            if max_age is not None and now - path.stat().st_mtime > max_age:
+                path.unlink(missing_ok=True)
+                continue
+            with path.open() as f:
+                results.append(json.load(f))
+        except (OSError, ValueError):
+            # removed or replaced by its worker between glob and open
+            continue
+    return results
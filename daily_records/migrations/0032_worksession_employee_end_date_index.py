@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('daily_records', '0031_siteworkrecord_siteworkrecord_worksession_unique_and_more'),
+        ('site_profiles', '0011_alter_site_start_at_alter_sitebill_date_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='worksession',
+            index=models.Index(fields=['employee', 'end_date'], name='worksession_emp_end_date_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('daily_records', '0032_worksession_employee_end_date_index'),
+        ('site_profiles', '0013_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailyrecordsnapshot',
+            index=models.Index(fields=['site', 'date'], include=('employee', 'present', 'khoraki', 'advance', 'current_salary'), name='snapshot_site_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyrecordsnapshot',
+            index=models.Index(fields=['employee', 'date'], name='snapshot_employee_date_idx'),
+        ),
+    ]
@@ -61,6 +61,10 @@ class WorkSession(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['employee', 'created_date'], name='employee_created_date_unique')
         ]
+        indexes = [
+            # last session end date lookups (promotion and daily record validation)
+            models.Index(fields=['employee', 'end_date'], name='worksession_emp_end_date_idx'),
+        ]
     
     @property
     def earned_salary(self):
@@ -134,6 +138,17 @@ class DailyRecordSnapshot(models.Model):
     comment = models.CharField(max_length=150, blank=True, null=True)
     current_salary =  models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # equality column first so the same index serves "date = d" and "date >= d";
+            # the included columns let the site summary aggregate with an index-only scan
+            models.Index(
+                fields=['site', 'date'], name='snapshot_site_date_idx',
+                include=['employee', 'present', 'khoraki', 'advance', 'current_salary'],
+            ),
+            models.Index(fields=['employee', 'date'], name='snapshot_employee_date_idx'),
+        ]
     
     def __str__(self):
         return f"Employee: {self.employee.first_name + "" + self.employee.last_name} | {self.site} | {self.date}"
\ No newline at end of file
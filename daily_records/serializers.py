@@ -3,8 +3,9 @@ from daily_records.models import DailyRecord, DailyRecordSnapshot
 from rest_framework import serializers
 from daily_records.models import WorkSession, SiteWorkRecord
 from api.validators import to_date, validate_today_or_yesterday
+from api.sparse_fields import SparseFieldsSerializerMixin
 
-class DailyRecordAccessSerializer(ModelSerializer):
+class DailyRecordAccessSerializer(SparseFieldsSerializerMixin, ModelSerializer):
     # today_salary = serializers.IntegerField(read_only=True)
 
     class Meta:
@@ -96,7 +97,7 @@ class DailyRecordUpdatePermissionSerializer(ModelSerializer):
         fields = ['permission_level']
         
 
-class SiteWorkRecordSerializer(ModelSerializer):
+class SiteWorkRecordSerializer(SparseFieldsSerializerMixin, ModelSerializer):
     class Meta:
         model = SiteWorkRecord
         fields = "__all__"
@@ -134,7 +135,7 @@ class WorkSessionDetailsSerializer(WorkSessionBaseSerializer):
     site_records = SiteWorkRecordSerializer(source='records', many=True, read_only=True)
 
 
-class DailyRecordSnapshotSerializer(serializers.ModelSerializer):
+class DailyRecordSnapshotSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = DailyRecordSnapshot
         fields = '__all__'
\ No newline at end of file
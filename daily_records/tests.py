@@ -1,3 +1,56 @@
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import localdate
+from rest_framework.test import APIClient
+from api.models import Tombstone
+from api.table_versions import table_label
+from daily_records.models import DailyRecord, DailyRecordSnapshot, SiteWorkRecord, WorkSession
+from site_profiles.models import Site
+from users.models import CustomUser
 
-# Create your tests here.
+
+class CurrentWorkSessionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site = Site.objects.create(name='Mirpur', description='-', location='Dhaka', start_at=date(2025, 1, 1))
+        cls.manager = CustomUser.objects.create(username='manager', user_type='site_manager', current_site=cls.site)
+        cls.employee = CustomUser.objects.create(username='worker', user_type='employee', current_site=cls.site, current_salary=500)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+        self.url = f'/api/v1/current-worksession/{self.employee.pk}/'
+
+    def test_close_writes_once_per_table(self):
+        rows = settings.NPLUSONE_THRESHOLD + 3
+        start = localdate() - timedelta(days=rows)
+        records = DailyRecord.objects.bulk_create([
+            DailyRecord(employee=self.employee, site=self.site, date=start + timedelta(days=n), present=1, khoraki=10)
+            for n in range(rows)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {"pay_or_return": 1000}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["daily_records_deleted"], response.data["total_present"]), (rows, rows))
+        self.assertFalse(DailyRecord.objects.exists())
+        self.assertEqual(DailyRecordSnapshot.objects.count(), rows)
+        self.assertEqual(SiteWorkRecord.objects.get().present, rows)
+        self.assertEqual(WorkSession.objects.get().rest_payable, rows * 500 - rows * 10 - 1000)
+        # work session, site work records, snapshots and daily records: one counter bump each
+        bumps = [query for query in queries if query["sql"].startswith('INSERT INTO "api_tableversion"')]
+        self.assertEqual(len(bumps), 4)
+        # one tombstone INSERT; the rows are read once, for the snapshots, not again by the DELETE
+        self.assertEqual(len([query for query in queries if query["sql"].startswith('INSERT INTO "api_tombstone"')]), 1)
+        self.assertEqual(len([query for query in queries if query["sql"].startswith('SELECT "daily_records_dailyrecord"."id"')]), 1)
+        self.assertEqual(
+            sorted(Tombstone.objects.filter(table=table_label(DailyRecord), site=self.site.pk).values_list('object_id', flat=True)),
+            [record.pk for record in records],
+        )
+
+    def test_nothing_to_close(self):
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual((response.status_code, response.data), (400, {"error": "no_daily_records_and_no_payment"}))
@@ -14,10 +14,24 @@ from daily_records.models import DailyRecord, WorkSession, DailyRecordSnapshot,
 from daily_records.serializers import DailyRecordAccessSerializer, DailyRecordCreateSerializer, DailyRecordUpdatePermissionSerializer, WorkSessionDetailsSerializer,  WorkSessionListSerializer,DailyRecordSnapshotSerializer
 from daily_records.permissions import DailyRecordPermission, WorkSessionAccessPermission, CurrentWorkSessionPermission
 from users.models import CustomUser
+from api.sparse_fields import SparseFieldsViewMixin
+from api.values_reader import ValuesListMixin
+from api.conditional_get import ConditionalGetMixin
+from api.models import Tombstone
+from api.table_versions import bump_versions, table_label
 
-class DailyRecordViewSet(ModelViewSet):    
+class DailyRecordViewSet(ConditionalGetMixin, SparseFieldsViewMixin, ValuesListMixin, ModelViewSet):    
     permission_classes = [IsAuthenticated, DailyRecordPermission]
     filterset_fields = ['site', 'employee__current_site', 'date', 'employee']
+
+    def etag_dependencies(self):
+        # ?site= narrows the records to one site's counter
+        site = self.request.query_params.get('site') if self.action == 'list' else None
+        dependencies = [(DailyRecord, site)]
+        if self.request.user.user_type == 'site_manager' or 'employee__current_site' in self.request.query_params:
+            # records of the employees now at a site: an employee moving changes the list
+            dependencies.append((CustomUser, None))
+        return dependencies
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -54,11 +68,12 @@ class DailyRecordViewSet(ModelViewSet):
 
         with transaction.atomic():
             DailyRecord.objects.bulk_create(records)
+            bump_versions(DailyRecord, [site.pk])
 
         return Response({"created": len(records)}, status=status.HTTP_201_CREATED)
     
 
-class WorkSessionViewSet(ModelViewSet):
+class WorkSessionViewSet(ValuesListMixin, ModelViewSet):
     http_method_names = ['get']
     permission_classes = [IsAuthenticated, WorkSessionAccessPermission]
     filter_backends = [OrderingFilter]
@@ -87,27 +102,37 @@ class WorkSessionViewSet(ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+def _current_session_totals(emp_id):
+    return DailyRecord.objects.filter(employee_id=emp_id).aggregate(
+        present=Sum('present', default=0),
+        khoraki=Sum('khoraki', default=0),
+        advance=Sum('advance', default=0)
+        )
+
+
+def _last_worksession(emp_id):
+    return WorkSession.objects.filter(employee_id=emp_id).order_by("-created_date").first()
+
+
+def _current_session_payload(employee, current_session, last_worksession):
+    current_salary = employee.current_salary
+    prev_payable = last_worksession.rest_payable if last_worksession else 0
+
+    current_session["salary"] = current_salary
+    current_session['total_salary'] = current_session["present"] * current_salary
+    current_session["prev_payable"] = prev_payable
+    return current_session
+
+
 class CurrentWorkSession(APIView):
     permission_classes = [IsAuthenticated, CurrentWorkSessionPermission]
     
     def get(self, request, *args, **kwargs):
         emp_id = self.kwargs['emp_id']
         employee = get_object_or_404(CustomUser, id=emp_id)
-        current_session = DailyRecord.objects.filter(employee_id=emp_id).aggregate(
-            present=Sum('present', default=0),
-            khoraki=Sum('khoraki', default=0),
-            advance=Sum('advance', default=0)
-            )
-        last_worksession = WorkSession.objects.filter(employee_id=emp_id).order_by("-created_date").first()
-
-        current_salary = employee.current_salary
-        prev_payable = last_worksession.rest_payable if last_worksession else 0
-
-        current_session["salary"] = current_salary
-        current_session['total_salary'] = current_session["present"] * current_salary
-        current_session["prev_payable"] = prev_payable
-
-        return Response(current_session)
+        current_session = _current_session_totals(emp_id)
+        last_worksession = _last_worksession(emp_id)
+        return Response(_current_session_payload(employee, current_session, last_worksession))
 
 
     def post(self, request, *args, **kwargs):
@@ -200,6 +225,7 @@ class CurrentWorkSession(APIView):
                     site_work_records.append(site_work_record)
                 
                 SiteWorkRecord.objects.bulk_create(site_work_records)
+                bump_versions(SiteWorkRecord, [record.site_id for record in site_work_records])
                 
                 # 7. Create DailyRecordSnapshot for today and yesterday
                 # records_to_snapshot = daily_records.filter(date__in=[today, yesterday])
@@ -209,8 +235,8 @@ class CurrentWorkSession(APIView):
                 snapshots = []
                 for record in records_to_snapshot:
                     snapshot = DailyRecordSnapshot(
-                        site=record.site,
-                        employee=record.employee,
+                        site_id=record.site_id,
+                        employee_id=record.employee_id,
                         date=record.date,
                         present=record.present,
                         khoraki=record.khoraki,
@@ -221,9 +247,18 @@ class CurrentWorkSession(APIView):
                     snapshots.append(snapshot)
                 
                 DailyRecordSnapshot.objects.bulk_create(snapshots)
+                bump_versions(DailyRecordSnapshot, [snapshot.site_id for snapshot in snapshots])
                 
-                # 8. Delete all daily records for this employee
-                deleted_count = daily_records.delete()[0]
+                # 8. Delete all daily records for this employee. Nothing references a daily record, so
+                # one plain DELETE does: the post_delete receivers would write a sync tombstone and bump
+                # the version once per row, here they are written in bulk.
+                deleted = list(records_to_snapshot)
+                Tombstone.objects.bulk_create([
+                    Tombstone(table=table_label(DailyRecord), object_id=record.pk, site=record.site_id)
+                    for record in deleted
+                ])
+                bump_versions(DailyRecord, [record.site_id for record in deleted])
+                deleted_count = DailyRecord.objects.filter(pk__in=[record.pk for record in deleted])._raw_delete(DailyRecord.objects.db)
                 
                 # 9. Return success response
                 return Response({
@@ -248,13 +283,22 @@ class CurrentWorkSession(APIView):
             )
     
     
-class DailyRecordSnapshotViewset(ModelViewSet):
+class DailyRecordSnapshotViewset(ConditionalGetMixin, SparseFieldsViewMixin, ValuesListMixin, ModelViewSet):
     http_method_names = ['get']
     permission_classes = [IsAuthenticated]
     queryset = DailyRecordSnapshot.objects.all()
     serializer_class = DailyRecordSnapshotSerializer
     filterset_fields = ['site']
 
+    def etag_dependencies(self):
+        user = self.request.user
+        site = user.current_site_id if user.user_type == 'site_manager' else self.request.query_params.get('site')
+        return [(DailyRecordSnapshot, site)]
+
+    def etag_extra(self):
+        # the list is today's snapshots
+        return (datetime.today().date(),)
+
     def get_queryset(self):
         user = self.request.user
         if user.user_type in ['main_manager', 'viewer']:
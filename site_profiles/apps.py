@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SiteProfilesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'site_profiles'
+    
+    def ready(self):
+        import site_profiles.signals
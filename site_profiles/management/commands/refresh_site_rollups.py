@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from site_profiles.models import Site
+from site_profiles.services.site_rollup import PERIODS, refresh_site_rollups
+
+
+class Command(BaseCommand):
+    help = "Precompute monthly/weekly cost, cash and bill totals of closed periods for the site rollup endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, action='append', help="Site id (repeatable). Defaults to every site.")
+        parser.add_argument('--period', choices=PERIODS + ['all'], default='all')
+
+    def handle(self, *args, **options):
+        periods = PERIODS if options['period'] == 'all' else [options['period']]
+        site_ids = options['site'] or Site.objects.values_list('pk', flat=True)
+        for site_id in site_ids:
+            for period in periods:
+                written = refresh_site_rollups(site_id, period)
+                self.stdout.write(f"site {site_id}: {written} {period} rollup(s)")
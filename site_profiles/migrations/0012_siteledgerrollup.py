@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_profiles', '0011_alter_site_start_at_alter_sitebill_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteLedgerRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('month', 'Month'), ('week', 'Week')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('st', models.PositiveBigIntegerField(default=0)),
+                ('ot', models.PositiveBigIntegerField(default=0)),
+                ('cash', models.PositiveBigIntegerField(default=0)),
+                ('bill', models.PositiveBigIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_rollups', to='site_profiles.site')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('site', 'period', 'period_start'), name='unique_site_ledger_rollup')],
+            },
+        ),
+    ]
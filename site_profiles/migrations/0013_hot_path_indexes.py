@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_profiles', '0012_siteledgerrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sitebill',
+            index=models.Index(fields=['site', 'date'], include=('amount',), name='sitebill_site_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sitecash',
+            index=models.Index(fields=['site', 'date'], include=('amount',), name='sitecash_site_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sitecost',
+            index=models.Index(fields=['site', 'date'], include=('type', 'amount'), name='sitecost_site_date_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-19 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_profiles', '0013_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sitecash',
+            index=models.Index(fields=['site', 'updated_at'], name='sitecash_site_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sitecost',
+            index=models.Index(fields=['site', 'updated_at'], name='sitecost_site_updated_idx'),
+        ),
+    ]
@@ -41,6 +41,14 @@ class SiteCost(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     permission_level = models.IntegerField(choices=PERMISSION_CHOICES, default=0)
 
+    class Meta:
+        indexes = [
+            # date range lists and totals per site (index-only with the included columns)
+            models.Index(fields=['site', 'date'], name='sitecost_site_date_idx', include=['type', 'amount']),
+            # delta sync keyset (api/delta_sync.py)
+            models.Index(fields=['site', 'updated_at'], name='sitecost_site_updated_idx'),
+        ]
+
     def __str__(self):
         return self.title
     
@@ -53,8 +61,14 @@ class SiteCash(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     permission_level = models.IntegerField(choices=PERMISSION_CHOICES, default=0)
 
+    class Meta:
+        indexes = [
+            # date range lists and totals per site (index-only with the included columns)
+            models.Index(fields=['site', 'date'], name='sitecash_site_date_idx', include=['amount']),
+            # delta sync keyset (api/delta_sync.py)
+            models.Index(fields=['site', 'updated_at'], name='sitecash_site_updated_idx'),
+        ]
 
-    
     def __str__(self):
         return self.title
     
@@ -66,6 +80,38 @@ class SiteBill(models.Model):
     amount = models.PositiveIntegerField()
     updated_at = models.DateTimeField(auto_now=True)
 
-    
+    class Meta:
+        indexes = [
+            # date range lists and totals per site (index-only with the included columns)
+            models.Index(fields=['site', 'date'], name='sitebill_site_date_idx', include=['amount']),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class SiteLedgerRollup(models.Model):
+    """
+    Precomputed per-period ledger totals for a site, written by `manage.py refresh_site_rollups`.
+    Rows are dropped whenever a cost, cash or bill entry in that period changes.
+    """
+    PERIOD_CHOICES = [
+        ('month', 'Month'),
+        ('week', 'Week'),
+    ]
+    site = models.ForeignKey(Site, related_name='ledger_rollups', on_delete=models.CASCADE)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    st = models.PositiveBigIntegerField(default=0)
+    ot = models.PositiveBigIntegerField(default=0)
+    cash = models.PositiveBigIntegerField(default=0)
+    bill = models.PositiveBigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['site', 'period', 'period_start'], name='unique_site_ledger_rollup')
+        ]
+
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f"{self.site} | {self.period} {self.period_start}"
@@ -2,6 +2,8 @@ from rest_framework.serializers import ModelSerializer
 from rest_framework import serializers
 from site_profiles.models import Site, SiteCost, SiteCash, SiteBill
 from api.validators import validate_today_or_yesterday
+from api.batch_loading import BatchField, BatchListSerializer
+from site_profiles.services.site_managers import site_managers
 
 class SiteSerializerList(ModelSerializer):
     class Meta:
@@ -9,20 +11,12 @@ class SiteSerializerList(ModelSerializer):
         fields = ['id', 'name', 'start_at','handover']
 
 class SiteSerializerDetails(ModelSerializer):
-    site_manager = serializers.SerializerMethodField()
+    # {"id", "first_name", "last_name"} or None, one query for a whole list of sites
+    site_manager = BatchField(site_managers)
     class Meta:
         model = Site
         fields = '__all__'
-        
-    def get_site_manager(self, obj):
-        result = obj.employees.filter(user_type='site_manager').first()
-        if result:
-            return {
-                "id": result.id,
-                "first_name": result.first_name,
-                "last_name" : result.last_name
-            }
-        return None        
+        list_serializer_class = BatchListSerializer
     
 # serializers for SiteCost model
 class SiteCostSerializer(ModelSerializer):
@@ -0,0 +1,17 @@
+from users.models import CustomUser
+
+
+def site_managers(site_ids):
+    """
+    {site_id: {"id", "first_name", "last_name"}} of the site manager of each site, in one query.
+    A site with several picks the lowest id, like `site.employees.filter(user_type='site_manager').first()`.
+    """
+    managers = (
+        CustomUser.objects.filter(current_site_id__in=site_ids, user_type='site_manager')
+        .order_by('current_site_id', 'id').values('id', 'first_name', 'last_name', 'current_site_id')
+    )
+    result = {}
+    for manager in managers:
+        site_id = manager.pop('current_site_id')
+        result.setdefault(site_id, manager)
+    return result
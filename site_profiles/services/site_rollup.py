@@ -0,0 +1,136 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Sum, Q, Value
+from django.db.models.functions import Coalesce, Trunc
+from django.utils.timezone import localdate
+from site_profiles.models import SiteCost, SiteCash, SiteBill, SiteLedgerRollup
+from api.db_router import replica_reads
+from api.models import TableVersion
+from api.table_versions import bump_versions, table_label
+
+PERIODS = ['month', 'week']
+SERIES_FIELDS = ['st', 'ot', 'cash', 'bill']
+
+
+def period_start(date, period):
+    if period == 'week':
+        return date - timedelta(days=date.weekday())  # monday, same as date_trunc('week')
+    return date.replace(day=1)
+
+
+def _grouped(queryset, period, aggregates, date_after=None, date_before=None, skip_periods=()):
+    if date_after:
+        queryset = queryset.filter(date__gte=date_after)
+    if date_before:
+        queryset = queryset.filter(date__lte=date_before)
+    queryset = queryset.annotate(period_start=Trunc('date', period))
+    if skip_periods:
+        queryset = queryset.exclude(period_start__in=skip_periods)
+    return queryset.values('period_start').annotate(**aggregates).order_by()
+
+
+def live_rollup(site, period, date_after=None, date_before=None, skip_periods=()):
+    """
+    {period_start: {"st", "ot", "cash", "bill"}} computed with three GROUP BY date_trunc queries.
+    """
+    filters = dict(date_after=date_after, date_before=date_before, skip_periods=skip_periods)
+    rows = {}
+
+    def bucket(start):
+        return rows.setdefault(start, dict.fromkeys(SERIES_FIELDS, 0))
+
+    for row in _grouped(SiteCost.objects.filter(site=site), period, {
+        "st": Coalesce(Sum("amount", filter=Q(type="st")), Value(0)),
+        "ot": Coalesce(Sum("amount", filter=Q(type="ot")), Value(0)),
+    }, **filters):
+        bucket(row['period_start']).update(st=row['st'], ot=row['ot'])
+
+    for row in _grouped(SiteCash.objects.filter(site=site), period, {"cash": Sum("amount")}, **filters):
+        bucket(row['period_start'])['cash'] = row['cash']
+
+    for row in _grouped(SiteBill.objects.filter(site=site), period, {"bill": Sum("amount")}, **filters):
+        bucket(row['period_start'])['bill'] = row['bill']
+
+    return rows
+
+
+@replica_reads()
+def get_site_rollup(site, period, date_after=None, date_before=None):
+    """
+    Columnar series for charts. Closed periods come from SiteLedgerRollup when it has them;
+    the current period and anything not yet rolled up is aggregated live.
+    """
+    stored = SiteLedgerRollup.objects.filter(site=site, period=period)
+    # partially covered edge periods are only correct when aggregated live
+    if date_after:
+        first_start = period_start(date_after, period)
+        stored = stored.filter(period_start__gte=first_start) if date_after == first_start else stored.filter(period_start__gt=first_start)
+    if date_before:
+        stored = stored.filter(period_start__lt=period_start(date_before, period))
+
+    rows = {
+        rollup['period_start']: {field: rollup[field] for field in SERIES_FIELDS}
+        for rollup in stored.values('period_start', *SERIES_FIELDS)
+    }
+    rows.update(live_rollup(site, period, date_after, date_before, skip_periods=list(rows)))
+
+    starts = sorted(rows)
+    series = {"site": int(site), "period": period, "periods": starts}
+    for field in SERIES_FIELDS:
+        series[field] = [rows[start][field] for start in starts]
+    return series
+
+
+def _rollup_generation(site, lock=False):
+    # the site's invalidation counter (a TableVersion row, see invalidate_rollups)
+    versions = TableVersion.objects.filter(table=table_label(SiteLedgerRollup), site=site)
+    if lock:
+        versions = versions.select_for_update()
+    return versions.values_list('version', flat=True).first()
+
+
+def refresh_site_rollups(site, period):
+    """
+    Store every closed period (the current one keeps changing) for one site. Returns rows written.
+
+    An entry written while the totals are computed would leave stale totals stored, so the site's
+    invalidation counter is read before and compared again, locked, when storing: if an
+    invalidation ran in between nothing is stored (0) and the next refresh picks the site up.
+    """
+    # make sure the counter row exists, so there is a row to lock; only invalidations bump it, so
+    # concurrent refreshes of a site don't discard each other's work
+    TableVersion.objects.bulk_create([TableVersion(table=table_label(SiteLedgerRollup), site=site)], ignore_conflicts=True)
+    generation = _rollup_generation(site)
+
+    current_start = period_start(localdate(), period)
+    rows = live_rollup(site, period, date_before=current_start - timedelta(days=1))
+    rollups = [
+        SiteLedgerRollup(site_id=site, period=period, period_start=start, **values)
+        for start, values in rows.items()
+    ]
+    with transaction.atomic():
+        # invalidations bump the counter before deleting, so they wait for this lock and then
+        # drop what is stored here
+        if _rollup_generation(site, lock=True) != generation:
+            return 0
+        SiteLedgerRollup.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['site', 'period', 'period_start'],
+            update_fields=[*SERIES_FIELDS, 'refreshed_at'],
+        )
+    return len(rollups)
+
+
+def invalidate_rollups(site, dates=None):
+    # dates=None drops every stored period of the site (used when an entry's date may have moved)
+    rollups = SiteLedgerRollup.objects.filter(site=site)
+    if dates is not None:
+        starts = Q()
+        for period in PERIODS:
+            starts |= Q(period=period, period_start__in={period_start(date, period) for date in dates})
+        rollups = rollups.filter(starts)
+    with transaction.atomic():
+        # counter first: a refresh that computed its totals before this write sees it and stores nothing
+        bump_versions(SiteLedgerRollup, [site])
+        rollups.delete()
@@ -1,18 +1,38 @@
+from functools import partial
 from django.db.models import Sum, Count, Value, F, Q
 from django.db.models.functions import Coalesce
 from site_profiles.models import SiteCost, SiteCash, SiteBill
 from daily_records.models import DailyRecord, DailyRecordSnapshot, SiteWorkRecord
+from users.models import CustomUser
+from api.db_router import replica_reads
+
+def summary_dependencies(site):
+    # the tables the summaries aggregate, for their ETag; salaries come from employee__current_salary
+    models = [SiteCash, SiteCost, SiteBill, DailyRecord, DailyRecordSnapshot, SiteWorkRecord]
+    return [(model, site) for model in models] + [(CustomUser, None)]
+
+
+def _date_based_fetchers(site, date, isViewer):
+    fetchers = {
+        "cash_agg": partial(_get_cash_aggregates, site, date, date_based=True),
+        "cost_agg": partial(_get_cost_aggregates, site, date, date_based=True),
+        "records_agg": partial(_get_records_aggregates, site, date, date_based=True, isViewer=isViewer),
+        "snapshot_agg": partial(_get_snapshot_aggregates, site, date, date_based=True, isViewer=isViewer),
+        "sitework_agg": partial(_get_sitework_aggregates, site, date, date_based=True, isViewer=isViewer),
+    }
+    if isViewer:
+        fetchers["bill_agg"] = partial(_get_bill_aggregates, site, date, date_based=True)
+    return fetchers
 
+
+@replica_reads()
 def get_date_based_site_summary(site, date, user_type):
     isViewer = user_type == "viewer"
-    
-    # Fetch all aggregates
-    cash_agg = _get_cash_aggregates(site, date, date_based=True)
-    cost_agg = _get_cost_aggregates(site, date, date_based=True)
-    records_agg = _get_records_aggregates(site, date, date_based=True, isViewer=isViewer)
-    snapshot_agg = _get_snapshot_aggregates(site, date, date_based=True, isViewer=isViewer)
-    sitework_agg = _get_sitework_aggregates(site, date, date_based=True, isViewer=isViewer)
-    
+    aggregates = {name: fetch() for name, fetch in _date_based_fetchers(site, date, isViewer).items()}
+    return _combine_date_based_summary(date, isViewer, **aggregates)
+
+
+def _combine_date_based_summary(date, isViewer, cash_agg, cost_agg, records_agg, snapshot_agg, sitework_agg, bill_agg=None):
     # this day values
     cash_of_date = cash_agg["cash_of_date"]
     st_of_date = cost_agg["st_of_date"] # st -> equipment_cost
@@ -76,7 +96,6 @@ def get_date_based_site_summary(site, date, user_type):
     }
         
     if isViewer:
-        bill_agg = _get_bill_aggregates(site, date, date_based=True)
         emp_salary_of_date = records_agg["emp_salary_of_date"] + snapshot_agg["emp_salary_of_date"]
         
         today_summary["emp_salary_of_date"] = emp_salary_of_date
@@ -86,16 +105,24 @@ def get_date_based_site_summary(site, date, user_type):
     return today_summary
 
 
+def _total_fetchers(site):
+    # isViewer=true, because only viewer can call this api/function
+    return {
+        "bill_agg": partial(_get_bill_aggregates, site, date=None),
+        "cash_agg": partial(_get_cash_aggregates, site, date=None, date_based=False),
+        "cost_agg": partial(_get_cost_aggregates, site, date=None, date_based=False),
+        "records_agg": partial(_get_records_aggregates, site, date=None, date_based=False, isViewer=True),
+        "sitework_agg": partial(_get_sitework_aggregates, site, date=None, date_based=False, isViewer=True),
+    }
+
+
+@replica_reads()
 def get_total_site_summary(site):
+    aggregates = {name: fetch() for name, fetch in _total_fetchers(site).items()}
+    return _combine_total_summary(**aggregates)
 
-    # Fetch all aggregates
-    bill_agg = _get_bill_aggregates(site, date=None)
-    cash_agg = _get_cash_aggregates(site, date=None, date_based=False)
-    cost_agg = _get_cost_aggregates(site, date=None, date_based=False)
-    # isViewer=true, because only viewer can call this api/function
-    records_agg = _get_records_aggregates(site, date=None, date_based=False, isViewer=True) 
-    sitework_agg = _get_sitework_aggregates(site, date=None, date_based=False, isViewer=True)
-    
+
+def _combine_total_summary(bill_agg, cash_agg, cost_agg, records_agg, sitework_agg):
     # extract values from aggregation
     total_bill = bill_agg["total_bill"]
     total_cash = cash_agg["total_cash"]
@@ -235,7 +262,11 @@ def _get_snapshot_aggregates(site, date, date_based=True, isViewer=True):
                 "emp_salary_of_date":Coalesce(Sum(F("present") * F("current_salary"), filter=Q(date=date)), Value(0.0)),
             })
     
-    return DailyRecordSnapshot.objects.filter(site=site).aggregate(**agg_fields)
+    snapshots = DailyRecordSnapshot.objects.filter(site=site)
+    if date_based:
+        # every date based aggregate looks at date >= `date`; lets the (site, date) index skip older rows
+        snapshots = snapshots.filter(date__gte=date)
+    return snapshots.aggregate(**agg_fields)
 
 def _get_sitework_aggregates(site, date, date_based=True, isViewer=True):
     agg_fields = {}
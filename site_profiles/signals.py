@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import SiteCost, SiteCash, SiteBill
+from .services.site_rollup import invalidate_rollups
+
+
+# Stored ledger rollups must never serve stale totals: drop the periods an entry touches.
+@receiver(post_save, sender=SiteCost)
+@receiver(post_save, sender=SiteCash)
+@receiver(post_save, sender=SiteBill)
+def invalidate_rollups_on_save(sender, instance, created, **kwargs):
+    # an update may have moved the entry to another date, so every stored period of the site goes
+    invalidate_rollups(instance.site_id, [instance.date] if created else None)
+
+
+@receiver(post_delete, sender=SiteCost)
+@receiver(post_delete, sender=SiteCash)
+@receiver(post_delete, sender=SiteBill)
+def invalidate_rollups_on_delete(sender, instance, **kwargs):
+    invalidate_rollups(instance.site_id, [instance.date])
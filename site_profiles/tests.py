@@ -1,3 +1,184 @@
+from datetime import date, timedelta
+from unittest import mock
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import localdate
+from rest_framework.test import APIClient
+from site_profiles.models import Site, SiteCost, SiteCash, SiteBill, SiteLedgerRollup
+from site_profiles.services import site_rollup
+from site_profiles.services.site_rollup import get_site_rollup, refresh_site_rollups
+from users.models import CustomUser
 
-# Create your tests here.
+
+class SiteRecordBulkCreateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site = Site.objects.create(name='Mirpur', description='-', location='Dhaka', start_at=date(2025, 1, 1))
+        cls.manager = CustomUser.objects.create(username='manager', user_type='site_manager', current_site=cls.site)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+        self.url = f'/api/v1/sites/{self.site.pk}/cost-records/'
+
+    def test_list_creates_every_row(self):
+        today, yesterday = localdate(), localdate() - timedelta(days=1)
+        rows = [
+            {"date": today.isoformat(), "title": "cement", "amount": 1200, "type": "st"},
+            {"date": yesterday.isoformat(), "title": "overtime", "amount": 300, "type": "ot"},
+        ]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([(row["title"], row["site"]) for row in response.data], [("cement", self.site.pk), ("overtime", self.site.pk)])
+        self.assertTrue(all(row["id"] for row in response.data))
+        self.assertEqual(
+            sorted(SiteCost.objects.filter(site=self.site).values_list('title', 'amount', 'type')),
+            [('cement', 1200, 'st'), ('overtime', 300, 'ot')],
+        )
+
+        response = self.client.post(f'/api/v1/sites/{self.site.pk}/cash-records/', [{"title": "advance", "amount": 5000}], format='json')
+        self.assertEqual((response.status_code, SiteCash.objects.get().title), (201, 'advance'))
+
+    def test_errors_per_row_write_nothing(self):
+        rows = [
+            {"title": "cement", "amount": 1200},
+            {"date": (localdate() - timedelta(days=5)).isoformat(), "title": "sand", "amount": 100},
+            {"title": "rod", "amount": -1},
+        ]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual((response.data[0], set(response.data[1]), set(response.data[2])), ({}, {"date"}, {"amount"}))
+        self.assertFalse(SiteCost.objects.exists())
+
+    def test_single_object(self):
+        response = self.client.post(self.url, {"title": "cement", "amount": 1200}, format='json')
+        self.assertEqual((response.status_code, response.data["title"]), (201, "cement"))
+        self.assertEqual(SiteCost.objects.get().site, self.site)
+
+
+class SiteRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site = Site.objects.create(name='Mirpur', description='-', location='Dhaka', start_at=date(2025, 1, 1))
+        # Sunday 30 March, Monday 31 March, Tuesday 1 April 2025
+        SiteCost.objects.create(site=cls.site, date=date(2025, 3, 30), title='cement', amount=100, type='st')
+        SiteCost.objects.create(site=cls.site, date=date(2025, 3, 31), title='overtime', amount=20, type='ot')
+        SiteCost.objects.create(site=cls.site, date=date(2025, 4, 1), title='sand', amount=5, type='st')
+        SiteCash.objects.create(site=cls.site, date=date(2025, 3, 31), title='advance', amount=1000)
+        SiteBill.objects.create(site=cls.site, date=date(2025, 4, 1), title='first bill', amount=3000)
+
+    def test_month_and_week_boundaries(self):
+        self.assertEqual(get_site_rollup(self.site.pk, 'month'), {
+            "site": self.site.pk, "period": "month", "periods": [date(2025, 3, 1), date(2025, 4, 1)],
+            "st": [100, 5], "ot": [20, 0], "cash": [1000, 0], "bill": [0, 3000],
+        })
+        weeks = get_site_rollup(self.site.pk, 'week')
+        self.assertEqual(weeks["periods"], [date(2025, 3, 24), date(2025, 3, 31)])
+        self.assertEqual((weeks["st"], weeks["ot"], weeks["bill"]), ([100, 5], [0, 20], [0, 3000]))
+
+    def test_refresh_stores_closed_periods(self):
+        self.assertEqual(refresh_site_rollups(self.site.pk, 'month'), 2)
+        SiteLedgerRollup.objects.filter(period_start=date(2025, 3, 1)).update(st=999)
+        self.assertEqual(get_site_rollup(self.site.pk, 'month')["st"], [999, 5])
+        # a partly covered period is aggregated live
+        self.assertEqual(get_site_rollup(self.site.pk, 'month', date_after=date(2025, 3, 31))["st"], [0, 5])
+        self.assertEqual(get_site_rollup(self.site.pk, 'month', date_before=date(2025, 3, 30))["st"], [100])
+
+    def test_refresh_skips_the_current_period(self):
+        SiteCost.objects.create(site=self.site, title='today', amount=7)
+        refresh_site_rollups(self.site.pk, 'month')
+        self.assertFalse(SiteLedgerRollup.objects.filter(period_start__gte=localdate().replace(day=1)).exists())
+
+    def test_writes_drop_their_periods(self):
+        refresh_site_rollups(self.site.pk, 'month')
+        refresh_site_rollups(self.site.pk, 'week')
+        SiteCost.objects.create(site=self.site, date=date(2025, 4, 2), title='rod', amount=50)
+        self.assertEqual(
+            sorted(SiteLedgerRollup.objects.values_list('period', 'period_start')),
+            [('month', date(2025, 3, 1)), ('week', date(2025, 3, 24))],
+        )
+        SiteCost.objects.get(title='cement').delete()
+        self.assertFalse(SiteLedgerRollup.objects.exists())
+        self.assertEqual(get_site_rollup(self.site.pk, 'month')["st"], [0, 55])
+
+    def test_list_create_drops_its_periods(self):
+        SiteLedgerRollup.objects.create(site=self.site, period='month', period_start=localdate().replace(day=1), st=1)
+        manager = CustomUser.objects.create(username='manager', user_type='site_manager', current_site=self.site)
+        client = APIClient()
+        client.force_authenticate(manager)
+        response = client.post(f'/api/v1/sites/{self.site.pk}/cost-records/', [{"title": "cement", "amount": 1}], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(SiteLedgerRollup.objects.exists())
+
+    def test_invalidation_during_refresh_stores_nothing(self):
+        live_rollup = site_rollup.live_rollup
+
+        def rollup_then_write(*args, **kwargs):
+            rows = live_rollup(*args, **kwargs)
+            SiteCost.objects.create(site=self.site, date=date(2025, 3, 2), title='late', amount=1)
+            return rows
+
+        with mock.patch.object(site_rollup, 'live_rollup', rollup_then_write):
+            self.assertEqual(refresh_site_rollups(self.site.pk, 'month'), 0)
+        self.assertFalse(SiteLedgerRollup.objects.exists())
+        self.assertEqual(refresh_site_rollups(self.site.pk, 'month'), 2)
+        self.assertEqual(SiteLedgerRollup.objects.get(period_start=date(2025, 3, 1)).st, 101)
+
+    def test_concurrent_refreshes_both_store(self):
+        live_rollup = site_rollup.live_rollup
+
+        def rollup_then_refresh(*args, **kwargs):
+            rows = live_rollup(*args, **kwargs)
+            with mock.patch.object(site_rollup, 'live_rollup', live_rollup):
+                self.assertEqual(refresh_site_rollups(self.site.pk, 'week'), 2)
+            return rows
+
+        with mock.patch.object(site_rollup, 'live_rollup', rollup_then_refresh):
+            self.assertEqual(refresh_site_rollups(self.site.pk, 'month'), 2)
+        self.assertEqual(SiteLedgerRollup.objects.count(), 4)
+
+
+class LedgerTotalsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site = Site.objects.create(name='Mirpur', description='-', location='Dhaka', start_at=date(2025, 1, 1))
+        other = Site.objects.create(name='Uttara', description='-', location='Dhaka', start_at=date(2025, 1, 1))
+        for day, amount, cost_type in [(1, 100, 'st'), (2, 20, 'ot'), (3, 5, 'st'), (4, 40, 'ot'), (5, 7, 'st')]:
+            SiteCost.objects.create(site=cls.site, date=date(2025, 3, day), title=f'cost {day}', amount=amount, type=cost_type)
+        SiteCost.objects.create(site=other, date=date(2025, 3, 1), title='other site', amount=1000)
+        cls.viewer = CustomUser.objects.create(username='viewer', user_type='viewer')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+        self.url = f'/api/v1/sites/{self.site.pk}/cost-records/'
+
+    def test_page_with_totals_of_the_filtered_rows(self):
+        response = self.client.get(self.url, {"page_size": 2, "page": 2, "date_after": "2025-03-02"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 4)
+        self.assertEqual(response.data["totals"], {"total": 72, "st": 12, "ot": 60})
+        self.assertEqual([row["title"] for row in response.data["results"]], ["cost 4", "cost 5"])
+        self.assertIsNone(response.data["next"])
+
+        response = self.client.get(self.url, {"page_size": 2, "date_after": "2026-01-01"})
+        self.assertEqual((response.data["count"], response.data["totals"]), (0, {"total": 0, "st": 0, "ot": 0}))
+
+    def test_count_and_totals_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {"page_size": 2})
+        aggregates = [query["sql"] for query in queries if "SUM(" in query["sql"] or "COUNT(" in query["sql"]]
+        self.assertEqual(len(aggregates), 1)
+        self.assertIn("COUNT(", aggregates[0])
+
+    def test_plain_list_without_page_size(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 5)
+        self.assertFalse([query for query in queries if "SUM(" in query["sql"]])
+        self.assertEqual(self.client.get(self.url, {"page_size": 2, "page": 9}).status_code, 404)
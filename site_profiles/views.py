@@ -1,4 +1,8 @@
 from datetime import datetime
+from django.db import transaction
+from django.db.models import Sum, Q, Value
+from django.db.models.functions import Coalesce
+from django.shortcuts import get_object_or_404
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
@@ -11,9 +15,15 @@ from site_profiles.models import Site, SiteCost, SiteCash, SiteBill
 from site_profiles.serializers import SiteSerializerList, SiteSerializerDetails, SiteCostSerializer, SiteCostUpdatePermissionSerializer, SiteCashSerializer, SiteCashUpdatePermissionSerializer, SiteBillSerializer
 from site_profiles.permissions import SiteRecordAccessPermission, SiteBillAccessPermission, SiteProfileAccessPermissions, DateBasedSiteSummaryPermission, TotalSiteSummaryPermission
 from api.filters import SiteCostFilterClass, SiteCashFilterClass, SiteBillFilterClass
-from site_profiles.services.site_summary import get_date_based_site_summary, get_total_site_summary
+from api.pagination import LedgerPagination
+from api.values_reader import ValuesListMixin
+from api.conditional_get import ConditionalGetMixin
+from api.table_versions import bump_versions
+from users.models import CustomUser
+from site_profiles.services.site_summary import get_date_based_site_summary, get_total_site_summary, summary_dependencies
+from site_profiles.services.site_rollup import get_site_rollup, invalidate_rollups, PERIODS
 
-class SiteViewSet(ModelViewSet):
+class SiteViewSet(ConditionalGetMixin, ModelViewSet):
     permission_classes = [IsAuthenticated, SiteProfileAccessPermissions]
     queryset = Site.objects.all()
     
@@ -22,8 +32,17 @@ class SiteViewSet(ModelViewSet):
             return SiteSerializerList
         return SiteSerializerDetails
 
-class DateBasedSiteSummaryView(APIView):
+    def etag_dependencies(self):
+        if self.action == 'list':
+            return [(Site, None)]
+        # details carry the site manager
+        return [(Site, self.kwargs.get('pk')), (CustomUser, None)]
+
+class DateBasedSiteSummaryView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated, DateBasedSiteSummaryPermission]
+    def etag_dependencies(self):
+        return summary_dependencies(self.kwargs['site_id'])
+
     def get(self, request, site_id, date):
         user_type = request.user.user_type
         try:
@@ -34,16 +53,87 @@ class DateBasedSiteSummaryView(APIView):
         date_based_site_summary = get_date_based_site_summary(site_id, parsed_date, user_type)
         return Response(date_based_site_summary, status=status.HTTP_200_OK)
 
-class TotalSiteSummaryView(APIView):
+class TotalSiteSummaryView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated, TotalSiteSummaryPermission]
+    def etag_dependencies(self):
+        return summary_dependencies(self.kwargs['site_id'])
+
     def get(self, request, site_id):
         date_based_site_summary = get_total_site_summary(site_id)
         return Response(date_based_site_summary, status=status.HTTP_200_OK)
 
+class SiteLedgerRollupView(APIView):
+    permission_classes = [IsAuthenticated, TotalSiteSummaryPermission]
+    def get(self, request, site_id):
+        # ?period=month|week&date_after=YYYY-MM-DD&date_before=YYYY-MM-DD
+        period = request.query_params.get('period', 'month')
+        if period not in PERIODS:
+            return Response({"error": "period must be month or week."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            date_after, date_before = (
+                datetime.strptime(value, "%Y-%m-%d").date() if value else None
+                for value in (request.query_params.get('date_after'), request.query_params.get('date_before'))
+            )
+        except ValueError:
+            return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rollup = get_site_rollup(site_id, period, date_after, date_before)
+        return Response(rollup, status=status.HTTP_200_OK)
+
+
+class LedgerTotalsMixin(ConditionalGetMixin, ValuesListMixin):
+    # With ?page_size= the list comes back as a page plus "totals", aggregated over the
+    # whole filtered queryset, so clients can show totals without downloading every row.
+    pagination_class = LedgerPagination
+    ledger_totals = {
+        "total": Coalesce(Sum("amount"), Value(0)),
+    }
+    ledger_model = None
+
+    def etag_dependencies(self):
+        return [(self.ledger_model, self.kwargs.get('site_pk'))]
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        reader = self.values_reader()
+        rows = queryset if reader is None else reader.values(queryset)
+        page, totals = self.paginator.paginate_with_totals(rows, queryset, self.ledger_totals, request, view=self)
+        if page is None:
+            return Response(self.represent_rows(reader, rows))
+        return self.paginator.get_paginated_response(self.represent_rows(reader, page), totals)
+
+
+class SiteRecordBulkCreateMixin:
+    # POST accepts one record or a list of records. A list is validated as a whole,
+    # the site is resolved once and every row goes in with a single bulk_create.
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        site = get_object_or_404(Site, pk=self.kwargs.get('site_pk'))
+
+        model = serializer.child.Meta.model
+        records = [model(site=site, **item) for item in serializer.validated_data]
+        with transaction.atomic():
+            model.objects.bulk_create(records)
+            # bulk_create skips post_save, so drop the touched rollup periods and bump the version here
+            invalidate_rollups(site.pk, {record.date for record in records})
+            bump_versions(model, [site.pk])
+
+        return Response(self.get_serializer(records, many=True).data, status=status.HTTP_201_CREATED)
+
 
-class SiteCostViewSet(ModelViewSet):
+class SiteCostViewSet(LedgerTotalsMixin, SiteRecordBulkCreateMixin, ModelViewSet):
     permission_classes = [IsAuthenticated,  SiteRecordAccessPermission]
     filterset_class = SiteCostFilterClass
+    ledger_model = SiteCost
+    ledger_totals = {
+        "total": Coalesce(Sum("amount"), Value(0)),
+        "st": Coalesce(Sum("amount", filter=Q(type="st")), Value(0)),
+        "ot": Coalesce(Sum("amount", filter=Q(type="ot")), Value(0)),
+    }
 
     def get_serializer_class(self):
         if self.request.method == 'PATCH':
@@ -65,9 +155,10 @@ class SiteCostViewSet(ModelViewSet):
         serializer.save(site=site)
         
         
-class SiteCashViewSet(ModelViewSet):
+class SiteCashViewSet(LedgerTotalsMixin, SiteRecordBulkCreateMixin, ModelViewSet):
     permission_classes = [IsAuthenticated,  SiteRecordAccessPermission]
     filterset_class = SiteCashFilterClass
+    ledger_model = SiteCash
 
     def get_serializer_class(self):
         if self.request.method == 'PATCH':
@@ -89,10 +180,11 @@ class SiteCashViewSet(ModelViewSet):
         serializer.save(site=site)
     
     
-class SiteBillViewSet(ModelViewSet):
+class SiteBillViewSet(LedgerTotalsMixin, ModelViewSet):
     permission_classes = [IsAuthenticated, SiteBillAccessPermission]
     filterset_class = SiteBillFilterClass
     serializer_class = SiteBillSerializer
+    ledger_model = SiteBill
         
     def get_queryset(self):
         site_id = self.kwargs.get('site_pk')
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from users.models import CustomUser, Promotion
+from users.models import CustomUser, Promotion, ProfileImageTask, OutboxEmail
 
 # Register Promotion model
 @admin.register(Promotion)
@@ -8,6 +8,18 @@ class PromotionAdmin(admin.ModelAdmin):
     list_display = ['created_at', 'date', 'employee', 'current_salary']
     list_filter = ['created_at', 'employee']
 
+@admin.register(ProfileImageTask)
+class ProfileImageTaskAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'action', 'employee', 'status', 'attempts']
+    list_filter = ['action', 'status']
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'recipient', 'subject', 'status', 'attempts', 'sent_at']
+    list_filter = ['status']
+    # pending bodies can hold a live password reset link
+    exclude = ['body']
+
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
     """Custom User Admin with additional fields and password encryption"""
@@ -0,0 +1,33 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from users.services.bulk_import import import_users, parse_csv_rows
+
+
+class Command(BaseCommand):
+    help = "Create users (with their first promotion) from a CSV or JSON file. Nothing is written if any row is invalid."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json'], help="Defaults to the file extension.")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"{path} not found")
+
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        text = path.read_text(encoding='utf-8-sig')
+        if file_format == 'csv':
+            rows = parse_csv_rows(text)
+        elif file_format == 'json':
+            rows = json.loads(text)
+        else:
+            raise CommandError("Unknown format, use --format csv|json")
+
+        result = import_users(rows)
+        for row_error in result["errors"]:
+            self.stderr.write(f"row {row_error['row']}: {json.dumps(row_error['errors'], ensure_ascii=False)}")
+        if result["errors"]:
+            raise CommandError(f"{len(result['errors'])} invalid row(s), nothing imported")
+        self.stdout.write(self.style.SUCCESS(f"created {result['created']} user(s)"))
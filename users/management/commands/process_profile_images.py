@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from users.services.profile_images import run_pending_tasks
+
+
+class Command(BaseCommand):
+    help = "Resize queued profile image uploads into thumbnails and delete replaced image files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--loop', action='store_true', help="Keep polling the queue instead of exiting when it is empty.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep between polls in --loop mode.")
+
+    def handle(self, *args, **options):
+        while True:
+            handled = run_pending_tasks(batch_size=options['batch_size'])
+            if handled:
+                self.stdout.write(f"handled {handled} profile image task(s)")
+            if not options['loop']:
+                break
+            if handled < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from users.services.email_outbox import deliver_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails in batches over one reused SMTP connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help="Keep polling the outbox instead of exiting when it is empty.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep between polls in --loop mode.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = deliver_pending(batch_size=options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"sent {sent}, failed {failed}")
+            if not options['loop']:
+                break
+            if sent + failed < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.3 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_customuser_profile_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_image_medium',
+            field=models.ImageField(blank=True, null=True, upload_to='profile_images/medium/'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_image_small',
+            field=models.ImageField(blank=True, null=True, upload_to='profile_images/small/'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_image_status',
+            field=models.CharField(blank=True, choices=[('', 'No Image'), ('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ProfileImageTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('process', 'Process Upload'), ('delete', 'Delete File')], max_length=10)),
+                ('file_name', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profile_image_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='profile_image_task_queue')],
+            },
+        ),
+    ]
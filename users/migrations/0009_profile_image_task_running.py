@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_customuser_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profileimagetask',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+    ]
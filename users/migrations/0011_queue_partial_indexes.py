@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_outbox_email_sending'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='outboxemail',
+            name='outbox_email_queue',
+        ),
+        migrations.RemoveIndex(
+            model_name='profileimagetask',
+            name='profile_image_task_queue',
+        ),
+        migrations.AddIndex(
+            model_name='outboxemail',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'sending'])), fields=['next_attempt_at'], name='outbox_email_queue'),
+        ),
+        migrations.AddIndex(
+            model_name='profileimagetask',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'running'])), fields=['attempts', 'created_at'], name='profile_image_task_queue'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator
+from django.utils import timezone
 
 class CustomUser(AbstractUser):
     USER_TYPE_CHOICES = [
@@ -15,12 +16,24 @@ class CustomUser(AbstractUser):
         ('RAJMISTRI', 'রাজ মিস্ত্রি'),
         ('HELPER', 'হেল্পার'),
     ]
+    PROFILE_IMAGE_STATUS_CHOICES = [
+        ('', 'No Image'),
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
     user_type = models.CharField(max_length=20, choices=USER_TYPE_CHOICES, default= 'employee')
     designation = models.CharField(max_length=20, choices=DESIGNATION_CHOICES, default= 'HELPER')
     address = models.TextField(max_length=200, blank=True, null=True)
     current_site = models.ForeignKey('site_profiles.Site', on_delete=models.SET_NULL, null=True, related_name='employees')    
     current_salary = models.PositiveIntegerField(default=0, validators=[MaxValueValidator(5000)])
     profile_image = models.ImageField(upload_to="profile_images/", null=True, blank=True)
+    # thumbnails are generated by the profile image worker from the uploaded original
+    profile_image_medium = models.ImageField(upload_to="profile_images/medium/", null=True, blank=True)
+    profile_image_small = models.ImageField(upload_to="profile_images/small/", null=True, blank=True)
+    profile_image_status = models.CharField(max_length=10, choices=PROFILE_IMAGE_STATUS_CHOICES, blank=True, default='')
+    # delta sync cursor (api/delta_sync.py); writes with update_fields / update() must set it too
+    updated_at = models.DateTimeField(auto_now=True)
 
     
     @property
@@ -47,4 +60,69 @@ class Promotion(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.employee.first_name} - {self.date}"
\ No newline at end of file
+        return f"{self.employee.first_name} - {self.date}"
+
+
+class ProfileImageTask(models.Model):
+    """
+    Queue of profile image work handled by `manage.py process_profile_images`, outside the request.
+    """
+    ACTION_CHOICES = [
+        ('process', 'Process Upload'),
+        ('delete', 'Delete File'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    employee = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='profile_image_tasks')
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # staged upload name for "process", stored media name for "delete"
+    file_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # the claim query's order; done / failed tasks pile up and are left out
+            models.Index(fields=['attempts', 'created_at'], name='profile_image_task_queue', condition=models.Q(status__in=['pending', 'running'])),
+        ]
+
+    def __str__(self):
+        return f"{self.action} - {self.file_name} ({self.status})"
+
+
+class OutboxEmail(models.Model):
+    """
+    Transactional email written in the request and delivered by `manage.py send_outbox_emails`.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)  # while sending: the claim deadline
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # sent / failed emails pile up and are left out
+            models.Index(fields=['next_attempt_at'], name='outbox_email_queue', condition=models.Q(status__in=['pending', 'sending'])),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} - {self.subject} ({self.status})"
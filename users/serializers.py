@@ -1,24 +1,32 @@
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 from users.models import CustomUser, Promotion
-from daily_records.models import WorkSession, DailyRecord
+from daily_records.models import DailyRecord
 from django.utils.timezone import localtime
 from users.exceptions import ForbiddenActiveStatusChange
+from users.services.profile_images import PROFILE_IMAGE_FIELDS, enqueue_profile_image
+from users.services.promotion_timeline import last_session_end_date, last_session_end_dates, last_promotion_date, previous_promotion_date, next_promotion_date
+from api.batch_loading import BatchField, BatchListSerializer
+from api.sparse_fields import SparseFieldsSerializerMixin
 
 class CustomUserIDsSerializer(serializers.ModelSerializer):
+    # CustomUser.last_session_end_date, loaded for the whole list in one query
+    last_session_end_date = BatchField(last_session_end_dates)
+
     class Meta:
         model = CustomUser
         fields = ['id', 'first_name', 'last_name', 'last_session_end_date']
+        list_serializer_class = BatchListSerializer
 
 class CustomUserGetSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
-        fields = ['id', 'first_name', 'last_name', 'current_site', 'designation']
+        fields = ['id', 'first_name', 'last_name', 'current_site', 'designation', 'profile_image_small']
 
-class CustomUserGetDetailSerializer(serializers.ModelSerializer):
+class CustomUserGetDetailSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
-        fields = '__all__'
+        exclude = ['password']
 
 class CustomUserCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -36,10 +44,42 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
         user.save()
         return user
                
+class CustomUserImportSerializer(serializers.ModelSerializer):
+    # username uniqueness and site existence are checked once for the whole batch,
+    # see users/services/bulk_import.py
+    current_site = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = CustomUser
+        fields = ['first_name', 'last_name', 'username', 'current_site', 'address', 'password', 'designation', 'current_salary']
+        extra_kwargs = {
+            'password': {'write_only': True},
+            'username': {'validators': [CustomUser.username_validator]},
+        }
+
 class CustomUserUpdateBioSerializer(serializers.ModelSerializer):
+    # the upload is only staged here; the image worker resizes and stores it later, so the response
+    # has the image stored so far and profile_image_status 'pending' until the new one is ready
+    profile_image = serializers.ImageField(required=False, allow_null=True)
+
     class Meta:
         model = CustomUser
-        fields = ['first_name', 'last_name', 'username','email', 'address', 'designation', 'current_salary', 'profile_image']
+        fields = ['first_name', 'last_name', 'username','email', 'address', 'designation', 'current_salary', 'profile_image', 'profile_image_status']
+        read_only_fields = ['profile_image_status']
+
+    def update(self, instance, validated_data):
+        clear_image = 'profile_image' in validated_data and validated_data['profile_image'] is None
+        upload = validated_data.pop('profile_image', None)
+
+        if clear_image:
+            for field_name in PROFILE_IMAGE_FIELDS:
+                setattr(instance, field_name, None)
+            instance.profile_image_status = ''
+
+        instance = super().update(instance, validated_data)
+        if upload:
+            enqueue_profile_image(instance, upload)
+        return instance
 
 class UpdateCurrentSiteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -112,6 +152,21 @@ class UserActivationSerializer(serializers.ModelSerializer):
         return instance
     
 
+class SalaryRevisionSerializer(serializers.Serializer):
+    site = serializers.IntegerField(required=False)
+    designation = serializers.ChoiceField(choices=CustomUser.DESIGNATION_CHOICES, required=False)
+    date = serializers.DateField()
+    mode = serializers.ChoiceField(choices=['absolute', 'percentage'])
+    # a Decimal: finite (no "nan" / "inf") and bounded
+    value = serializers.DecimalField(max_digits=7, decimal_places=2)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if 'site' not in attrs and 'designation' not in attrs:
+            raise serializers.ValidationError("সাইট অথবা পদবি — অন্তত একটি দিতে হবে।")
+        return attrs
+
+
 class PromotionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Promotion
@@ -136,8 +191,8 @@ class PromotionCreateSerializer(serializers.ModelSerializer):
     def validate_date(self, value):
         employee = self._get_employee()
 
-        promos = Promotion.objects.filter(employee=employee).order_by('date')
-        if not promos.exists():
+        last_promo_date = last_promotion_date(employee.pk)
+        if last_promo_date is None:
             # if has no existing promos
             joined = employee.date_joined
             if hasattr(joined, "date"):
@@ -147,9 +202,8 @@ class PromotionCreateSerializer(serializers.ModelSerializer):
             if value != joined_date:
                 raise serializers.ValidationError(f"প্রথম প্রোমোশনের তারিখ অবশ্যই যোগদানের তারিখ ({joined_date}) এর সমান হতে হবে।")
         else:
-            last_promo_date = promos.last().date
-            last_session = WorkSession.objects.filter(employee=employee).order_by('end_date').last()
-            check_date = max(last_promo_date, last_session.end_date) if last_session else last_promo_date
+            last_end_date = last_session_end_date(employee.pk)
+            check_date = max(last_promo_date, last_end_date) if last_end_date else last_promo_date
             if value <= check_date:
                 raise serializers.ValidationError(
                     f"নতুন প্রোমোশনের তারিখ অবশ্যই ({check_date}) এর পরে হতে হবে।"
@@ -185,36 +239,35 @@ class PromotionUpdateSerializer(serializers.ModelSerializer):
         employee = self._get_employee()
 
         # Step 1: If entry is restricted
-        work_sessions = list(WorkSession.objects.filter(employee=employee).order_by('end_date'))
-        if work_sessions and self.instance.date <= work_sessions[-1].end_date:
+        last_end_date = last_session_end_date(employee.pk)
+        if last_end_date and self.instance.date <= last_end_date:
             raise serializers.ValidationError(
                 "এই পদোন্নতি entry তে ইতিমধ্যেই কাজের সেশন রয়েছে — কোনো field update করা যাবে না।"
             )
 
         # Step 2: If entry is not restricted, proceed with date validation (if date is being changed)
         new_date = attrs.get('date')
-        if new_date and new_date != self.instance.date:        
-            promos = list(Promotion.objects.filter(employee=employee).order_by('date'))
-            
+        if new_date and new_date != self.instance.date:
+            prev_date = previous_promotion_date(employee.pk, self.instance.date)
+            next_date = next_promotion_date(employee.pk, self.instance.date)
+
             # Case 1: First promotion → date cannot be changed
-            if self.instance == promos[0]:
+            if prev_date is None:
                 raise serializers.ValidationError({"date": "প্রথম পদোন্নতির তারিখ পরিবর্তন করা যাবে না।"})
 
+            check_date = max(last_end_date, prev_date) if last_end_date else prev_date
+
             # Case 2: Last promotion
-            elif self.instance == promos[-1]:
-                check_date = max(work_sessions[-1].end_date, promos[-2].date) if work_sessions else promos[-2].date
+            if next_date is None:
                 if new_date <= check_date:
                     raise serializers.ValidationError(
                         {"date": f"নতুন তারিখ অবশ্যই ({check_date}) এর পরে হতে হবে।"}
                     )
 
             # Case 3: Middle promotion → must be between previous and next promotion dates
-            else:
-                index = promos.index(self.instance)
-                check_date = max(work_sessions[-1].end_date, promos[index - 1].date) if work_sessions else promos[-1].date
-                if not (check_date < new_date < promos[index + 1].date):
-                    raise serializers.ValidationError(
-                        {"date": f"নতুন তারিখ অবশ্যই ({check_date} এবং {promos[index + 1].date}) এর মধ্যে হতে হবে।"}
-                    )
+            elif not (check_date < new_date < next_date):
+                raise serializers.ValidationError(
+                    {"date": f"নতুন তারিখ অবশ্যই ({check_date} এবং {next_date}) এর মধ্যে হতে হবে।"}
+                )
 
         return attrs
\ No newline at end of file
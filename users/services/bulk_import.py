@@ -0,0 +1,92 @@
+import csv
+import io
+from collections import Counter
+from django.db import transaction
+from django.utils import timezone
+from site_profiles.models import Site
+from users.models import CustomUser, Promotion
+from users.serializers import CustomUserImportSerializer
+from users.services.password_hashing import hash_passwords
+from api.table_versions import bump_versions
+
+
+def parse_csv_rows(text):
+    # blank cells mean "not provided", so serializer defaults apply
+    reader = csv.DictReader(io.StringIO(text))
+    return [
+        {key.strip(): value.strip() for key, value in row.items() if key and value not in (None, '')}
+        for row in reader
+    ]
+
+
+def _add_error(errors, index, field, message):
+    errors.setdefault(index, {}).setdefault(field, []).append(message)
+
+
+def validate_rows(rows):
+    """
+    Validate every row before anything is written.
+    Returns (validated_rows, errors) where errors maps row index -> {field: [messages]}.
+    """
+    errors = {}
+    validated = []
+    for index, row in enumerate(rows):
+        serializer = CustomUserImportSerializer(data=row)
+        if serializer.is_valid():
+            validated.append(serializer.validated_data)
+        else:
+            errors[index] = serializer.errors
+            validated.append(None)
+
+    # batch level checks: one query each instead of one per row
+    usernames = [row['username'] for row in validated if row]
+    seen = Counter(usernames)
+    taken = set(CustomUser.objects.filter(username__in=usernames).values_list('username', flat=True))
+    site_ids = {row['current_site'] for row in validated if row and row.get('current_site')}
+    existing_sites = set(Site.objects.filter(pk__in=site_ids).values_list('pk', flat=True))
+
+    for index, row in enumerate(validated):
+        if not row:
+            continue
+        if row['username'] in taken:
+            _add_error(errors, index, 'username', 'এই ইউজারনেম ইতিমধ্যে ব্যবহৃত হয়েছে।')
+        elif seen[row['username']] > 1:
+            _add_error(errors, index, 'username', 'ফাইলে একই ইউজারনেম একাধিকবার আছে।')
+        site_id = row.get('current_site')
+        if site_id and site_id not in existing_sites:
+            _add_error(errors, index, 'current_site', f'সাইট ({site_id}) পাওয়া যায়নি।')
+
+    return validated, errors
+
+
+def import_users(rows):
+    """
+    Create users (and their first Promotion) from already parsed rows.
+    All rows are validated up front; if any row fails nothing is written.
+    Returns {"created": n, "errors": [{"row": 1-based index, "errors": {...}}]}.
+    """
+    validated, errors = validate_rows(rows)
+    if errors:
+        return {
+            "created": 0,
+            "errors": [{"row": index + 1, "errors": row_errors} for index, row_errors in sorted(errors.items())],
+        }
+
+    hashed = hash_passwords(row.pop('password') for row in validated)
+    joined = timezone.now()
+    users = []
+    for row, password in zip(validated, hashed):
+        site_id = row.pop('current_site', None)
+        users.append(CustomUser(password=password, current_site_id=site_id, date_joined=joined, **row))
+
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(users)
+        # first promotion must be on the joining date, see PromotionCreateSerializer.validate_date
+        Promotion.objects.bulk_create([
+            Promotion(employee=user, date=timezone.localtime(joined).date(), current_salary=user.current_salary)
+            for user in users
+        ])
+        bump_versions(CustomUser, [None])
+        bump_versions(Promotion, [None])
+
+    return {"created": len(users), "errors": []}
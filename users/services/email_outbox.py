@@ -0,0 +1,111 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from users.models import OutboxEmail
+
+
+def queue_email(recipient, subject, body, from_email=None):
+    # one INSERT; delivery happens in the outbox worker
+    return OutboxEmail.objects.create(
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def retry_delay(attempts):
+    # exponential backoff: base, 2*base, 4*base ... capped at the max
+    delay = settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS))
+
+
+# bodies can hold live links (password reset tokens), so they are cleared once an email is sent
+# or has failed for good; only the metadata stays for the admin
+OUTBOX_UPDATE_FIELDS = ['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at', 'body']
+
+
+def _mark_failed_attempt(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = 'failed'
+        email.body = ''
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+
+def _claim_batch(batch_size, now):
+    # short transaction: lock due emails with SKIP LOCKED and mark them sending until a deadline; an
+    # email whose worker died before recording the result is due again after EMAIL_OUTBOX_CLAIM_SECONDS
+    deadline = now + timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_SECONDS)
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(status='sending', next_attempt_at=deadline)
+    for email in batch:
+        email.status, email.next_attempt_at = 'sending', deadline
+    return batch, deadline
+
+
+def _record_result(email, deadline):
+    # a worker that took the email over after the claim expired records it instead
+    OutboxEmail.objects.filter(pk=email.pk, status='sending', next_attempt_at=deadline).update(
+        **{field: getattr(email, field) for field in OUTBOX_UPDATE_FIELDS}
+    )
+
+
+def deliver_pending(batch_size=50):
+    """
+    Send up to `batch_size` due emails over a single SMTP connection. The batch is claimed in a
+    short transaction and sent outside it, and each result is recorded as soon as it is known, so
+    a crash half way only sends the unrecorded emails again, and no lock is held during the SMTP
+    conversation. Failed sends are rescheduled with backoff until EMAIL_OUTBOX_MAX_ATTEMPTS is
+    reached. Returns (sent, failed) counts for this batch.
+    """
+    now = timezone.now()
+    sent = failed = 0
+
+    batch, deadline = _claim_batch(batch_size, now)
+    if not batch:
+        return sent, failed
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # server unreachable -> every email in the batch waits for the next round
+        for email in batch:
+            _mark_failed_attempt(email, e, now)
+            _record_result(email, deadline)
+        return sent, len(batch)
+
+    try:
+        for email in batch:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=[email.recipient],
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as e:
+                _mark_failed_attempt(email, e, now)
+                failed += 1
+            else:
+                email.status = 'sent'
+                email.sent_at = timezone.now()
+                email.body = ''
+                sent += 1
+            _record_result(email, deadline)
+    finally:
+        connection.close()
+    return sent, failed
@@ -0,0 +1,25 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.contrib.auth.hashers import make_password
+
+# below this many passwords the pool start-up costs more than it saves
+POOL_MIN_PASSWORDS = 4
+
+
+def hash_passwords(passwords, max_workers=None):
+    """
+    Hash passwords with the configured hasher (PBKDF2 by default), spread across CPU cores.
+    Output order matches input order.
+    """
+    passwords = list(passwords)
+    workers = min(max_workers or os.cpu_count() or 1, len(passwords))
+    if len(passwords) < POOL_MIN_PASSWORDS or workers < 2:
+        return [make_password(password) for password in passwords]
+
+    # spawn, not fork: gunicorn workers may hold threads and DB sockets that must not leak into children
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
@@ -0,0 +1,147 @@
+from datetime import timedelta
+from io import BytesIO
+from pathlib import Path
+from uuid import uuid4
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage, storages
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+from users.models import CustomUser, ProfileImageTask
+from api.table_versions import bump_versions
+
+PROFILE_IMAGE_FIELDS = list(settings.PROFILE_IMAGE_SIZES)
+
+
+def enqueue_profile_image(user, upload):
+    """
+    Stage the raw upload on local disk and queue it for the image worker.
+    The request only pays for a local file write; resizing and the remote upload happen later.
+    """
+    staging = storages["profile_uploads"]
+    suffix = Path(upload.name).suffix.lower()
+    staged_name = staging.save(f"{user.pk}/{uuid4().hex}{suffix}", upload)
+
+    with transaction.atomic():
+        ProfileImageTask.objects.create(employee=user, action='process', file_name=staged_name)
+        user.profile_image_status = 'pending'
+        user.save(update_fields=['profile_image_status', 'updated_at'])
+    return staged_name
+
+
+def enqueue_file_deletes(file_names, employee=None):
+    tasks = [
+        ProfileImageTask(employee=employee, action='delete', file_name=name)
+        for name in file_names if name
+    ]
+    ProfileImageTask.objects.bulk_create(tasks)
+
+
+def render_thumbnails(source):
+    # returns {field_name: jpeg bytes} for every configured size
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        rendered = {}
+        for field_name, size in settings.PROFILE_IMAGE_SIZES.items():
+            thumb = image.copy()
+            thumb.thumbnail((size, size), Image.Resampling.LANCZOS)
+            buffer = BytesIO()
+            thumb.save(buffer, format='JPEG', quality=85, optimize=True)
+            rendered[field_name] = buffer.getvalue()
+    return rendered
+
+
+def _process_upload(task):
+    staging = storages["profile_uploads"]
+    user = task.employee
+
+    # user was removed or uploaded again before we got here -> this upload is stale
+    newer_upload = user and ProfileImageTask.objects.filter(
+        employee=user, action='process', created_at__gt=task.created_at
+    ).exists()
+    if user is None or newer_upload:
+        staging.delete(task.file_name)
+        return
+
+    with staging.open(task.file_name, 'rb') as source:
+        rendered = render_thumbnails(source)
+
+    # the remote uploads run outside any transaction (see run_pending_tasks)
+    base_name = f"{user.pk}_{uuid4().hex[:8]}.jpg"
+    for field_name, content in rendered.items():
+        getattr(user, field_name).save(base_name, ContentFile(content), save=False)
+    user.profile_image_status = 'ready'
+    with transaction.atomic():
+        # pre_save/post_save signals queue the replaced files for deletion
+        user.save(update_fields=PROFILE_IMAGE_FIELDS + ['profile_image_status', 'updated_at'])
+    staging.delete(task.file_name)
+
+
+def _delete_file(task):
+    default_storage.delete(task.file_name)
+
+
+TASK_HANDLERS = {
+    'process': _process_upload,
+    'delete': _delete_file,
+}
+
+
+def _claim_task():
+    # short transaction: lock one due task with SKIP LOCKED and mark it running; a running task
+    # whose worker died is due again after PROFILE_IMAGE_CLAIM_SECONDS
+    stale = timezone.now() - timedelta(seconds=settings.PROFILE_IMAGE_CLAIM_SECONDS)
+    with transaction.atomic():
+        task = (
+            ProfileImageTask.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('employee')
+            .filter(Q(status='pending') | Q(status='running', updated_at__lt=stale))
+            # fresh tasks first so a failing file doesn't starve the queue
+            .order_by('attempts', 'created_at')
+            .first()
+        )
+        if task is not None:
+            task.status = 'running'
+            task.save(update_fields=['status', 'updated_at'])
+    return task
+
+
+def _record_result(task, error=None):
+    claimed_at = task.updated_at
+    if error is None:
+        task.status = 'done'
+    else:
+        task.attempts += 1
+        task.last_error = str(error)
+        task.status = 'failed' if task.attempts >= settings.PROFILE_IMAGE_MAX_ATTEMPTS else 'pending'
+    with transaction.atomic():
+        # a worker that took over the task after the claim expired records it instead
+        updated = ProfileImageTask.objects.filter(pk=task.pk, status='running', updated_at=claimed_at).update(
+            status=task.status, attempts=task.attempts, last_error=task.last_error, updated_at=timezone.now(),
+        )
+        if updated and task.status == 'failed' and task.action == 'process' and task.employee_id:
+            CustomUser.objects.filter(pk=task.employee_id).update(profile_image_status='failed', updated_at=timezone.now())
+            bump_versions(CustomUser, [None])
+
+
+def run_pending_tasks(batch_size=20):
+    """
+    Handle up to `batch_size` pending tasks. Each task is claimed in a short transaction, handled
+    outside it (the remote uploads hold no lock or connection), then its result is recorded.
+    Several workers can run side by side without picking the same task. Returns the number handled.
+    """
+    handled = 0
+    while handled < batch_size:
+        task = _claim_task()
+        if task is None:
+            break
+        try:
+            TASK_HANDLERS[task.action](task)
+        except Exception as e:
+            _record_result(task, e)
+        else:
+            _record_result(task)
+        handled += 1
+    return handled
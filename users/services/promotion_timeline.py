@@ -0,0 +1,51 @@
+from datetime import timedelta
+from django.db.models import Max
+from users.models import Promotion
+from daily_records.models import WorkSession
+
+# Each helper is a single indexed lookup: promotions use the (employee, date) unique index and
+# sessions the (employee, end_date) index, so no employee history is loaded into Python.
+
+
+def last_session_end_date(employee_id):
+    return WorkSession.objects.filter(employee_id=employee_id).aggregate(last=Max('end_date'))['last']
+
+
+def last_session_end_dates(employee_ids):
+    # {employee_id: end date} for a page of employees, one grouped query (employees without sessions are left out)
+    rows = (
+        WorkSession.objects.filter(employee_id__in=employee_ids)
+        .order_by().values('employee_id').annotate(last=Max('end_date'))
+    )
+    return {row['employee_id']: row['last'] for row in rows}
+
+
+def last_promotion_date(employee_id):
+    return Promotion.objects.filter(employee_id=employee_id).order_by('-date').values_list('date', flat=True).first()
+
+
+def previous_promotion_date(employee_id, date):
+    return (
+        Promotion.objects.filter(employee_id=employee_id, date__lt=date)
+        .order_by('-date').values_list('date', flat=True).first()
+    )
+
+
+def next_promotion_date(employee_id, date):
+    return (
+        Promotion.objects.filter(employee_id=employee_id, date__gt=date)
+        .order_by('date').values_list('date', flat=True).first()
+    )
+
+
+def build_salary_timeline(promotions):
+    """
+    Turn (date, salary) pairs ordered by date into salary intervals.
+    The last interval is open ended (end=None).
+    """
+    promotions = list(promotions)
+    intervals = []
+    for index, (start, salary) in enumerate(promotions):
+        end = promotions[index + 1][0] - timedelta(days=1) if index + 1 < len(promotions) else None
+        intervals.append({"start": start, "end": end, "salary": salary})
+    return intervals
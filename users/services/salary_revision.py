@@ -0,0 +1,72 @@
+from django.db import models, transaction
+from django.utils import timezone
+from django.db.models import Case, When, Value, Max, OuterRef, Subquery
+from users.models import CustomUser, Promotion
+from daily_records.models import WorkSession
+from api.table_versions import bump_versions
+
+MAX_SALARY = 5000
+
+
+def revised_salary(current_salary, mode, value):
+    # "absolute" adds a fixed amount, "percentage" raises by value percent; both round to whole taka
+    if mode == 'percentage':
+        return round(current_salary * (1 + value / 100))
+    return round(current_salary + value)
+
+
+def _revision_candidates(employees):
+    # last promotion date and last session end for every employee in one query
+    last_promotion = Promotion.objects.filter(employee=OuterRef('pk')).order_by('-date').values('date')[:1]
+    last_session_end = (
+        WorkSession.objects.filter(employee=OuterRef('pk'))
+        .values('employee').annotate(last=Max('end_date')).values('last')
+    )
+    return employees.annotate(
+        last_promotion_date=Subquery(last_promotion),
+        last_session_end=Subquery(last_session_end),
+    ).values('id', 'first_name', 'current_salary', 'last_promotion_date', 'last_session_end')
+
+
+def revise_salaries(employees, date, mode, value, dry_run=False):
+    """
+    Give every employee in the queryset a new Promotion on `date` with the revised salary.
+    Nothing is written if any employee fails validation.
+    """
+    changes, errors = [], []
+    for row in _revision_candidates(employees):
+        new_salary = revised_salary(row['current_salary'], mode, value)
+        last_promotion_date = row['last_promotion_date']
+        last_end_date = row['last_session_end']
+
+        if last_promotion_date is None:
+            errors.append({"employee": row['id'], "detail": f"{row['first_name']} -এর কোনো প্রাথমিক প্রোমোশন নেই।"})
+            continue
+        check_date = max(last_promotion_date, last_end_date) if last_end_date else last_promotion_date
+        if date <= check_date:
+            errors.append({"employee": row['id'], "detail": f"{row['first_name']} -এর নতুন প্রোমোশনের তারিখ অবশ্যই ({check_date}) এর পরে হতে হবে।"})
+            continue
+        if not 0 <= new_salary <= MAX_SALARY:
+            errors.append({"employee": row['id'], "detail": f"{row['first_name']} -এর নতুন বেতন ({new_salary}) 0 থেকে {MAX_SALARY} এর মধ্যে হতে হবে।"})
+            continue
+        changes.append({"employee": row['id'], "old_salary": row['current_salary'], "new_salary": new_salary})
+
+    if errors or dry_run or not changes:
+        return {"updated": 0, "changes": changes, "errors": errors}
+
+    with transaction.atomic():
+        Promotion.objects.bulk_create([
+            Promotion(employee_id=change['employee'], date=date, current_salary=change['new_salary'])
+            for change in changes
+        ])
+        CustomUser.objects.filter(pk__in=[change['employee'] for change in changes]).update(
+            current_salary=Case(
+                *[When(pk=change['employee'], then=Value(change['new_salary'])) for change in changes],
+                default='current_salary',
+                output_field=models.PositiveIntegerField(),
+            ),
+            updated_at=timezone.now(),
+        )
+        bump_versions(Promotion, [None])
+        bump_versions(CustomUser, [None])
+    return {"updated": len(changes), "changes": changes, "errors": []}
@@ -1,25 +1,37 @@
-from django.db.models.signals import pre_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from .models import CustomUser
+from .services.profile_images import PROFILE_IMAGE_FIELDS, enqueue_file_deletes
 
 
+# File deletes are remote calls on Cloudinary, so they're queued for the image worker
+# instead of running inside the request.
 @receiver(pre_save, sender=CustomUser)
-def delete_old_profile_image(sender, instance, **kwargs):    
+def collect_replaced_profile_images(sender, instance, **kwargs):
+    instance._replaced_profile_images = []
+    instance._previous_site_id = None
     if not instance.pk:
         return
-    try:
-        old_instance = CustomUser.objects.get(pk=instance.pk)
-    except CustomUser.DoesNotExist:
+    # the site too, from the same query: moving a user writes a sync tombstone (api/signals.py)
+    old_names = CustomUser.objects.filter(pk=instance.pk).values(*PROFILE_IMAGE_FIELDS, 'current_site').first()
+    if not old_names:
         return
+    instance._previous_site_id = old_names['current_site']
 
-    old_image = old_instance.profile_image
-    new_image = instance.profile_image
-        
-    if old_image and old_image != new_image:
-        old_image.delete(save=False)
+    for field_name in PROFILE_IMAGE_FIELDS:
+        old_name = old_names[field_name]
+        if old_name and old_name != getattr(instance, field_name).name:
+            instance._replaced_profile_images.append(old_name)
+
+
+@receiver(post_save, sender=CustomUser)
+def delete_replaced_profile_images(sender, instance, **kwargs):
+    replaced = getattr(instance, '_replaced_profile_images', [])
+    if replaced:
+        enqueue_file_deletes(replaced, employee=instance)
+        instance._replaced_profile_images = []
 
             
 @receiver(post_delete, sender=CustomUser)
-def delete_profile_image_on_delete(sender, instance, **kwargs):
-    if instance.profile_image:
-        instance.profile_image.delete()
+def delete_profile_images_on_delete(sender, instance, **kwargs):
+    enqueue_file_deletes([getattr(instance, field_name).name for field_name in PROFILE_IMAGE_FIELDS])
@@ -1,3 +1,392 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO
+from smtplib import SMTPException
+from unittest import mock
+from django.conf import settings
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import storages
+from django.contrib.auth.hashers import check_password
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from daily_records.models import WorkSession
+from site_profiles.models import Site
+from users.models import CustomUser, ProfileImageTask, OutboxEmail, Promotion
+from users.services.bulk_import import import_users, parse_csv_rows
+from users.services.email_outbox import deliver_pending, queue_email
+from users.services.promotion_timeline import (
+    build_salary_timeline, last_promotion_date, last_session_end_date, last_session_end_dates, next_promotion_date,
+    previous_promotion_date,
+)
+from users.services.password_hashing import hash_passwords
+from users.services.profile_images import enqueue_profile_image, run_pending_tasks
 
-# Create your tests here.
+
+def image_upload(name='face.png', size=(800, 600)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'orange').save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ProfileImageTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        storage_settings = override_settings(MEDIA_ROOT=media_root, STORAGES={
+            **settings.STORAGES,
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage", "OPTIONS": {"location": media_root}},
+            "profile_uploads": {"BACKEND": "django.core.files.storage.FileSystemStorage", "OPTIONS": {"location": f"{media_root}/profile_uploads"}},
+        })
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+        self.user = CustomUser.objects.create(username='worker', user_type='employee')
+
+    def test_enqueue_then_process(self):
+        staged_name = enqueue_profile_image(self.user, image_upload())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_image_status, 'pending')
+        task = ProfileImageTask.objects.get()
+        self.assertEqual((task.action, task.status), ('process', 'pending'))
+
+        self.assertEqual(run_pending_tasks(), 1)
+        task.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(task.status, 'done')
+        self.assertEqual(self.user.profile_image_status, 'ready')
+        with Image.open(self.user.profile_image_small.path) as small:
+            self.assertEqual(small.size, (64, 48))
+        self.assertFalse(storages["profile_uploads"].exists(staged_name))
+        self.assertEqual(run_pending_tasks(), 0)
+
+    @override_settings(PROFILE_IMAGE_MAX_ATTEMPTS=2)
+    def test_broken_upload_is_retried_then_fails(self):
+        enqueue_profile_image(self.user, SimpleUploadedFile('face.png', b'not an image'))
+        task = ProfileImageTask.objects.get()
+
+        # one task per batch, or the batch retries it right away
+        run_pending_tasks(batch_size=1)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), ('pending', 1))
+        self.assertTrue(task.last_error)
+
+        run_pending_tasks(batch_size=1)
+        task.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), ('failed', 2))
+        self.assertEqual(self.user.profile_image_status, 'failed')
+        self.assertEqual(run_pending_tasks(), 0)
+
+    @override_settings(PROFILE_IMAGE_CLAIM_SECONDS=60)
+    def test_expired_claim_is_picked_up_again(self):
+        enqueue_profile_image(self.user, image_upload())
+        ProfileImageTask.objects.update(status='running', updated_at=timezone.now())
+        self.assertEqual(run_pending_tasks(), 0)
+
+        ProfileImageTask.objects.update(updated_at=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(run_pending_tasks(), 1)
+        self.assertEqual(ProfileImageTask.objects.get().status, 'done')
+
+    def test_put_response_has_the_image_status(self):
+        manager = CustomUser.objects.create(username='manager', user_type='main_manager')
+        client = APIClient()
+        client.force_authenticate(manager)
+        response = client.put(f'/api/v1/users/{self.user.pk}/', {
+            'username': 'worker', 'first_name': 'Rahim', 'last_name': 'Uddin', 'profile_image': image_upload(),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['profile_image_status'], 'pending')
+        self.assertIsNone(response.data['profile_image'])
+
+        run_pending_tasks()
+        response = client.put(f'/api/v1/users/{self.user.pk}/', {'username': 'worker'}, format='multipart')
+        self.assertTrue(response.data['profile_image'].endswith('.jpg'))
+
+
+@override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_BASE_SECONDS=30)
+class EmailOutboxTests(TestCase):
+
+    def test_queue_then_deliver(self):
+        email = queue_email('worker@example.com', 'Hello', 'body text')
+        self.assertEqual((email.status, email.from_email), ('pending', settings.DEFAULT_FROM_EMAIL))
+        self.assertEqual(mail.outbox, [])
+
+        self.assertEqual(deliver_pending(), (1, 0))
+        self.assertEqual([(m.to, m.subject, m.body) for m in mail.outbox], [(['worker@example.com'], 'Hello', 'body text')])
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'sent')
+        self.assertIsNotNone(email.sent_at)
+        self.assertEqual(email.body, '')
+        self.assertEqual(deliver_pending(), (0, 0))
+
+    def test_failed_send_is_retried_with_backoff_then_fails(self):
+        email = queue_email('worker@example.com', 'Hello', 'body text')
+        with mock.patch('users.services.email_outbox.EmailMessage.send', side_effect=SMTPException('mailbox full')):
+            self.assertEqual(deliver_pending(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts, email.last_error), ('pending', 1, 'mailbox full'))
+            self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=25))
+            # not due yet
+            self.assertEqual(deliver_pending(), (0, 0))
+
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(deliver_pending(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.body), ('failed', 2, ''))
+        self.assertEqual(deliver_pending(), (0, 0))
+
+    def test_claimed_outside_the_send(self):
+        queue_email('worker@example.com', 'Hello', 'body text')
+
+        def send(messages):
+            email = OutboxEmail.objects.get()
+            self.assertEqual(email.status, 'sending')
+            self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=500))
+            return 1
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=send):
+            self.assertEqual(deliver_pending(), (1, 0))
+        self.assertEqual(OutboxEmail.objects.get().status, 'sent')
+
+    def test_crash_resends_only_unrecorded_emails(self):
+        first = queue_email('first@example.com', 'Hello', 'body text')
+        second = queue_email('second@example.com', 'Hello', 'body text')
+        send = EmailMessage.send
+
+        def crash_on_second(message, *args, **kwargs):
+            if message.to == ['second@example.com']:
+                raise KeyboardInterrupt()
+            return send(message, *args, **kwargs)
+
+        with mock.patch('users.services.email_outbox.EmailMessage.send', crash_on_second), self.assertRaises(KeyboardInterrupt):
+            deliver_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('sent', 'sending'))
+        # claimed until the deadline, then due again
+        self.assertEqual(deliver_pending(), (0, 0))
+        OutboxEmail.objects.filter(pk=second.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_pending(), (1, 0))
+        self.assertEqual([m.to for m in mail.outbox], [['first@example.com'], ['second@example.com']])
+
+
+class ResetPasswordTests(TestCase):
+
+    def test_reset_link_is_queued(self):
+        user = CustomUser.objects.create(username='worker', email='worker@example.com')
+        response = self.client.post('/api/v1/reset-password/', {'email': 'worker@example.com'})
+        self.assertEqual((response.status_code, response.data), (200, {"code": "reset_link_sent"}))
+        self.assertEqual(mail.outbox, [])
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.recipient, 'worker@example.com')
+        self.assertIn(f"{settings.FRONTEND_URL}/reset-password/", email.body)
+
+        deliver_pending()
+        link = mail.outbox[0].body.split(f"{settings.FRONTEND_URL}/reset-password/")[1].split()[0]
+        uid, token = link.strip('/').split('/')
+        response = self.client.post(f'/api/v1/reset-password-confirm/{uid}/{token}/', {'password': 'n3w-Passw0rd'})
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.check_password('n3w-Passw0rd'))
+
+    def test_unknown_and_duplicate_emails(self):
+        self.assertEqual(self.client.post('/api/v1/reset-password/', {'email': 'nobody@example.com'}).status_code, 404)
+        CustomUser.objects.create(username='a', email='same@example.com')
+        CustomUser.objects.create(username='b', email='same@example.com')
+        self.assertEqual(self.client.post('/api/v1/reset-password/', {'email': 'same@example.com'}).data, {"code": "multiple_users_found"})
+        self.assertFalse(OutboxEmail.objects.exists())
+
+
+class BulkImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site = Site.objects.create(name='Mirpur', description='-', location='Dhaka')
+        CustomUser.objects.create(username='taken')
+
+    def test_import_writes_users_and_first_promotions(self):
+        rows = parse_csv_rows(
+            "username,first_name,password,current_site,current_salary\n"
+            f"rahim,Rahim,pass-1,{self.site.pk},700\n"
+            "karim,,pass-2,,500\n"
+        )
+        self.assertEqual(rows[1], {"username": "karim", "password": "pass-2", "current_salary": "500"})
+        self.assertEqual(import_users(rows), {"created": 2, "errors": []})
+
+        rahim = CustomUser.objects.get(username='rahim')
+        self.assertEqual((rahim.first_name, rahim.current_site, rahim.current_salary), ('Rahim', self.site, 700))
+        self.assertTrue(rahim.check_password('pass-1'))
+        promotion = Promotion.objects.get(employee=rahim)
+        self.assertEqual((promotion.date, promotion.current_salary), (timezone.localtime(rahim.date_joined).date(), 700))
+        self.assertIsNone(CustomUser.objects.get(username='karim').current_site)
+
+    def test_any_invalid_row_writes_nothing(self):
+        rows = [
+            {"username": "new", "password": "x"},
+            {"username": "taken", "password": "x"},
+            {"username": "twice", "password": "x"},
+            {"username": "twice", "password": "x", "current_site": 999999},
+            {"username": "bad name!", "password": "x"},
+        ]
+        result = import_users(rows)
+        self.assertEqual(result["created"], 0)
+        errors = {row_error["row"]: row_error["errors"] for row_error in result["errors"]}
+        self.assertEqual(sorted(errors), [2, 3, 4, 5])
+        self.assertEqual(set(errors[4]), {"username", "current_site"})
+        self.assertIn("username", errors[5])
+        self.assertFalse(CustomUser.objects.filter(username='new').exists())
+
+
+class PasswordHashingTests(SimpleTestCase):
+
+    def test_pool_keeps_the_order(self):
+        passwords = [f"password-{index}" for index in range(6)]
+        hashed = hash_passwords(passwords, max_workers=2)
+        self.assertEqual(len(hashed), len(passwords))
+        for password, encoded in zip(passwords, hashed):
+            self.assertTrue(check_password(password, encoded))
+
+    def test_small_batches_hash_serially(self):
+        with mock.patch('users.services.password_hashing.ProcessPoolExecutor') as pool:
+            hashed = hash_passwords(['a', 'b'])
+        pool.assert_not_called()
+        self.assertTrue(check_password('b', hashed[1]))
+
+
+class PromotionTimelineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = CustomUser.objects.create(username='worker')
+        cls.other = CustomUser.objects.create(username='other')
+        for day, salary in [(date(2025, 1, 1), 500), (date(2025, 4, 1), 600), (date(2025, 7, 1), 700)]:
+            Promotion.objects.create(employee=cls.employee, date=day, current_salary=salary)
+        Promotion.objects.create(employee=cls.other, date=date(2025, 12, 1), current_salary=900)
+        for start, end in [(date(2025, 1, 1), date(2025, 2, 28)), (date(2025, 3, 1), date(2025, 5, 15))]:
+            session = WorkSession.objects.create(employee=cls.employee, start_date=start, end_date=end)
+            # one session per employee and created_date
+            WorkSession.objects.filter(pk=session.pk).update(created_date=end)
+
+    def test_neighbours(self):
+        self.assertEqual(last_promotion_date(self.employee.pk), date(2025, 7, 1))
+        self.assertEqual(previous_promotion_date(self.employee.pk, date(2025, 4, 1)), date(2025, 1, 1))
+        self.assertEqual(next_promotion_date(self.employee.pk, date(2025, 4, 1)), date(2025, 7, 1))
+        self.assertIsNone(previous_promotion_date(self.employee.pk, date(2025, 1, 1)))
+        self.assertIsNone(next_promotion_date(self.employee.pk, date(2025, 7, 1)))
+
+    def test_last_session_end_dates(self):
+        self.assertEqual(last_session_end_date(self.employee.pk), date(2025, 5, 15))
+        self.assertIsNone(last_session_end_date(self.other.pk))
+        self.assertEqual(last_session_end_dates([self.employee.pk, self.other.pk]), {self.employee.pk: date(2025, 5, 15)})
+
+    def test_salary_timeline(self):
+        self.assertEqual(build_salary_timeline([]), [])
+        promotions = Promotion.objects.filter(employee=self.employee).order_by('date').values_list('date', 'current_salary')
+        self.assertEqual(build_salary_timeline(promotions), [
+            {"start": date(2025, 1, 1), "end": date(2025, 3, 31), "salary": 500},
+            {"start": date(2025, 4, 1), "end": date(2025, 6, 30), "salary": 600},
+            {"start": date(2025, 7, 1), "end": None, "salary": 700},
+        ])
+
+    def test_promotion_rules(self):
+        viewer = CustomUser.objects.create(username='viewer', user_type='viewer')
+        manager = CustomUser.objects.create(username='manager', user_type='site_manager')
+        client = APIClient()
+        client.force_authenticate(manager)
+        url = f'/api/v1/users/{self.employee.pk}/promotions/'
+        # after the last promotion and the last session
+        self.assertEqual(client.post(url, {"date": "2025-07-01", "current_salary": 800}).status_code, 400)
+        self.assertEqual(client.post(url, {"date": "2025-07-02", "current_salary": 800}).status_code, 201)
+        first, middle = Promotion.objects.filter(employee=self.employee).order_by('date')[:2]
+        # inside a session / the first promotion
+        self.assertEqual(client.delete(f'{url}{middle.pk}/').status_code, 400)
+        self.assertEqual(client.delete(f'{url}{first.pk}/').status_code, 400)
+        self.assertEqual(client.delete(f'{url}{Promotion.objects.get(date=date(2025, 7, 2)).pk}/').status_code, 204)
+
+        client.force_authenticate(viewer)
+        response = client.get(f'{url}timeline/')
+        self.assertEqual(response.data["employee"], self.employee.pk)
+        self.assertEqual(response.data["intervals"][-1], {"start": date(2025, 7, 1), "end": None, "salary": 700})
+
+    def test_non_numeric_employee_is_not_found(self):
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create(username='manager', user_type='site_manager'))
+        for url in ['/api/v1/users/abc/promotions/timeline/', '/api/v1/users/abc/promotions/', '/api/v1/users/1x/promotions/1/']:
+            with self.subTest(url=url):
+                self.assertEqual(client.get(url).status_code, 404)
+        self.assertEqual(client.post('/api/v1/users/abc/promotions/', {"date": "2025-07-02", "current_salary": 800}).status_code, 404)
+        self.assertEqual(APIClient().get('/api/v1/users/abc/promotions/timeline/').status_code, 401)
+
+
+class SalaryRevisionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.site = Site.objects.create(name='Mirpur', description='-', location='Dhaka')
+        cls.manager = CustomUser.objects.create(username='manager', user_type='site_manager', current_site=cls.site)
+        cls.workers = []
+        for username, salary in [('rahim', 500), ('karim', 800)]:
+            worker = CustomUser.objects.create(username=username, current_site=cls.site, designation='MISTRI', current_salary=salary)
+            Promotion.objects.create(employee=worker, date=date(2025, 1, 1), current_salary=salary)
+            cls.workers.append(worker)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def _revise(self, **data):
+        return self.client.post('/api/v1/users/salary-revision/', {"site": self.site.pk, "designation": "MISTRI", "mode": "percentage", "value": 10, **data})
+
+    def test_dry_run_writes_nothing(self):
+        response = self._revise(date="2025-07-01", dry_run=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 0)
+        self.assertEqual(sorted((c["old_salary"], c["new_salary"]) for c in response.data["changes"]), [(500, 550), (800, 880)])
+        self.assertEqual(Promotion.objects.count(), 2)
+
+    def test_revision_writes_promotions_and_salaries(self):
+        response = self._revise(date="2025-07-01", mode="absolute", value=100)
+        self.assertEqual((response.status_code, response.data["updated"]), (200, 2))
+        self.assertEqual(
+            sorted(CustomUser.objects.filter(designation='MISTRI').values_list('current_salary', flat=True)), [600, 900],
+        )
+        self.assertEqual(
+            sorted(Promotion.objects.filter(date=date(2025, 7, 1)).values_list('employee__username', 'current_salary')),
+            [('karim', 900), ('rahim', 600)],
+        )
+
+    def test_any_invalid_employee_writes_nothing(self):
+        rahim, karim = self.workers
+        WorkSession.objects.create(employee=rahim, start_date=date(2025, 1, 1), end_date=date(2025, 6, 30))
+        response = self._revise(date="2025-06-15", value=600)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(error["employee"] for error in response.data["errors"]), [rahim.pk, karim.pk])
+        self.assertEqual(Promotion.objects.count(), 2)
+
+        # first promotion missing
+        Promotion.objects.filter(employee=karim).delete()
+        response = self._revise(date="2025-07-01")
+        self.assertEqual([error["employee"] for error in response.data["errors"]], [karim.pk])
+
+    def test_request_validation(self):
+        self.assertEqual(self.client.post('/api/v1/users/salary-revision/', {"date": "2025-07-01", "mode": "absolute", "value": 1}).status_code, 400)
+        self.assertEqual(self._revise(date="2025-07-01", mode="double").status_code, 400)
+        for value in ["nan", "inf", "-inf", "1e9"]:
+            with self.subTest(value=value):
+                response = self._revise(date="2025-07-01", value=value)
+                self.assertEqual((response.status_code, set(response.data)), (400, {"value"}))
+        changes = self._revise(date="2025-07-01", value="12.5", dry_run=True).data["changes"]
+        self.assertEqual(sorted(change["new_salary"] for change in changes), [562, 900])
+
+    def test_site_managers_only(self):
+        for user_type in ['main_manager', 'viewer', 'employee']:
+            with self.subTest(user_type=user_type):
+                self.client.force_authenticate(CustomUser.objects.create(username=user_type, user_type=user_type))
+                self.assertEqual(self._revise(date="2025-07-01").status_code, 403)
+        self.assertEqual(Promotion.objects.count(), 2)
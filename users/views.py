@@ -1,5 +1,5 @@
-from django.core.mail import send_mail
 from django.conf import settings
+from django.http import Http404
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_decode
 from django.utils.encoding import force_str
@@ -13,11 +13,17 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 from users.models import CustomUser, Promotion
-from daily_records.models import WorkSession
-from users.serializers import PromotionSerializer, PromotionCreateSerializer,PromotionUpdateSerializer, CustomUserGetSerializer, CustomUserCreateSerializer, CustomUserIDsSerializer, CustomUserUpdateBioSerializer, UpdateUserTypeSerializer, UpdateCurrentSiteSerializer, CustomUserGetDetailSerializer, UserActivationSerializer
+from users.serializers import PromotionSerializer, PromotionCreateSerializer,PromotionUpdateSerializer, CustomUserGetSerializer, CustomUserCreateSerializer, CustomUserIDsSerializer, CustomUserUpdateBioSerializer, UpdateUserTypeSerializer, UpdateCurrentSiteSerializer, CustomUserGetDetailSerializer, UserActivationSerializer, SalaryRevisionSerializer
 from users.permissions import PromotionPermission, CustomUserPermission
+from users.services.email_outbox import queue_email
+from users.services.bulk_import import import_users, parse_csv_rows
+from users.services.salary_revision import revise_salaries
+from users.services.promotion_timeline import last_session_end_date, previous_promotion_date, build_salary_timeline
+from api.sparse_fields import SparseFieldsViewMixin
+from api.conditional_get import ConditionalGetMixin
+from daily_records.models import WorkSession
 
-class CustomUserViewSet(ModelViewSet):
+class CustomUserViewSet(ConditionalGetMixin, SparseFieldsViewMixin, ModelViewSet):
     http_method_names=['get', 'post', 'patch', 'put']
     permission_classes = [IsAuthenticated, CustomUserPermission]
     filterset_fields = ['current_site', 'designation', 'is_active']
@@ -37,6 +43,12 @@ class CustomUserViewSet(ModelViewSet):
             return CustomUser.objects.filter(id = user.id)
         
         return CustomUser.objects.none()
+
+    def etag_dependencies(self):
+        if self.action == 'ids':
+            # last_session_end_date
+            return [(CustomUser, None), (WorkSession, None)]
+        return [(CustomUser, None)]
         
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -69,6 +81,46 @@ class CustomUserViewSet(ModelViewSet):
         filtered_qs = self.filter_queryset(base_qs)
         serializer = CustomUserIDsSerializer(filtered_qs, many=True)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='bulk-import')
+    def bulk_import(self, request):
+        # accepts a JSON list of users or a CSV upload in the "file" field
+        upload = request.FILES.get('file')
+        if upload:
+            try:
+                rows = parse_csv_rows(upload.read().decode('utf-8-sig'))
+            except UnicodeDecodeError:
+                return Response({"code": "invalid_csv_encoding"}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            rows = request.data
+
+        if not isinstance(rows, list) or not rows:
+            return Response({"code": "no_rows"}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = import_users(rows)
+        if result["errors"]:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+    
+
+    # writes Promotion rows, so it takes the promotion endpoints' rule (site managers only)
+    @action(detail=False, methods=['post'], url_path='salary-revision', permission_classes=[IsAuthenticated, PromotionPermission])
+    def salary_revision(self, request):
+        # annual raise for a site and/or designation: one Promotion per employee, same effective date
+        serializer = SalaryRevisionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        employees = self.get_queryset().filter(is_active=True)
+        if 'site' in data:
+            employees = employees.filter(current_site_id=data['site'])
+        if 'designation' in data:
+            employees = employees.filter(designation=data['designation'])
+
+        result = revise_salaries(employees, data['date'], data['mode'], data['value'], dry_run=data['dry_run'])
+        if result["errors"]:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
     
     
 class ChangePasswordView(APIView):
@@ -97,23 +149,25 @@ class ResetPasswordView(APIView):
         if not email:
             return Response({"code": "missing_email"}, status=status.HTTP_400_BAD_REQUEST)
 
-        users = CustomUser.objects.filter(email=email)
+        # two rows are enough to tell "none", "one" and "many" apart in a single query
+        users = list(CustomUser.objects.filter(email=email)[:2])
 
-        if not users.exists():
+        if not users:
             return Response({"code": "user_not_found"}, status=status.HTTP_404_NOT_FOUND)
 
-        if users.count() > 1:
+        if len(users) > 1:
             return Response({"code": "multiple_users_found"}, status=status.HTTP_400_BAD_REQUEST)
 
-        user = users.first()
+        user = users[0]
         uid = urlsafe_base64_encode(force_bytes(user.pk))
         token = default_token_generator.make_token(user)
         reset_link = f"{settings.FRONTEND_URL}/reset-password/{uid}/{token}/"
 
-        try:
-            send_mail(
-                subject = "🔐 Reset Your Password – Fatema Construction",
-                message = f"""
+        # queued in the outbox; `send_outbox_emails` delivers it outside the request
+        queue_email(
+            recipient=email,
+            subject = "🔐 Reset Your Password – Fatema Construction",
+            body = f"""
             Hello,
             To reset your password, please click the link below:
             {reset_link}
@@ -122,14 +176,7 @@ class ResetPasswordView(APIView):
             © Fatema Construction. All rights reserved.
             Developed by Achib Hossen
                 """,
-
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email],
-                fail_silently=settings.FAIL_SILENTLY
-            )
-        except Exception as e:
-            print(f"Email sending failed for {email}: {str(e)}")
-            return Response({"code": "email_send_failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        )
 
         return Response({"code": "reset_link_sent"}, status=status.HTTP_200_OK)
 
@@ -157,6 +204,14 @@ class ResetPasswordConfirmView(APIView):
     
 class PromotionViewSet(ModelViewSet):
     permission_classes = [IsAuthenticated, PromotionPermission]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # the nested router takes any [^/.]+ as user_pk; anything but an employee id is a 404
+        try:
+            self.kwargs['user_pk'] = int(self.kwargs.get('user_pk'))
+        except (TypeError, ValueError):
+            raise Http404
     
     def get_queryset(self):
         user = self.request.user
@@ -183,21 +238,26 @@ class PromotionViewSet(ModelViewSet):
         return PromotionSerializer
     
     
+    @action(detail=False, methods=['get'], url_path='timeline')
+    def timeline(self, request, *args, **kwargs):
+        # salary intervals for payroll clients: [{"start", "end", "salary"}], end=None is the current salary
+        promotions = self.get_queryset().order_by('date').values_list('date', 'current_salary')
+        return Response({
+            "employee": self.kwargs['user_pk'],
+            "intervals": build_salary_timeline(promotions),
+        })
+
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        employee = instance.employee
-
-        # Get promotions for this employee ordered by date (ascending)
-        promos = list(Promotion.objects.filter(employee=employee).order_by('date'))
 
         # 1) First promotion cannot be deleted
-        if promos and instance == promos[0]:
+        if previous_promotion_date(instance.employee_id, instance.date) is None:
             raise ValidationError({"detail": "প্রথম পদোন্নতি মুছে ফেলা যাবে না।"})
 
         # 2) If there are work sessions and the last session's end_date
         #    is >= this promotion date, prevent deletion.
-        work_sessions = list(WorkSession.objects.filter(employee=employee).order_by('end_date'))
-        if work_sessions and instance.date <= work_sessions[-1].end_date:
+        last_end_date = last_session_end_date(instance.employee_id)
+        if last_end_date and instance.date <= last_end_date:
             raise ValidationError({
                 "detail": "এই প্রোমোশনের পরে/সময়ে কাজের সেশন তৈরি হয়েছে — মুছে ফেলা যাবে না।"
             })